@@ -0,0 +1,192 @@
+# app/assets.py
+# Archivos estáticos con huella de contenido.
+#
+#   python -m app.assets build        (en el build del deploy; no toca la base de datos)
+#   flask --app main assets build     (lo mismo desde la CLI de la app)
+#
+# El build copia static/ y app/static/ a static/dist/ como <nombre>.<hash>.<ext>, con
+# variantes .gz y .br (si Brotli está instalado) para CSS/JS/SVG, y escribe
+# static/dist/manifest.json {ruta lógica: ruta con hash}. Los íconos de img/ se reducen
+# al tamaño en que se muestran (ICON_PX, 2x para pantallas densas) y se guardan en WebP.
+#
+# En plantillas: {{ asset_url('style.css') }}. Con manifiesto da /assets/style.<hash>.css,
+# servido con Cache-Control immutable de un año y la variante comprimida que acepte el
+# cliente. Sin build (desarrollo) sirve el archivo fuente con ?v=<hash> y revalidación.
+import os, io, sys, gzip, json, hashlib, mimetypes
+import click
+from flask import Blueprint, request, send_file, abort, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:   # opcional: sin Brotli solo se generan las variantes .gz
+    brotli = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SOURCE_DIRS = [os.path.join(ROOT, "static"), os.path.join(ROOT, "app", "static")]
+BUILD_DIR = os.environ.get("ASSET_BUILD_DIR") or os.path.join(ROOT, "static", "dist")
+MANIFEST = "manifest.json"
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+ICON_DIR = "img/"
+ICON_PX = 128          # .module-card img mide 64x64 en style.css
+ICON_QUALITY = 82
+IMMUTABLE = "public, max-age=31536000, immutable"
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]   # orden de preferencia
+
+assets_bp = Blueprint("assets", __name__)
+
+# ---------- build ----------
+def _sources():
+    """(ruta lógica, ruta en disco) de los archivos fuente; el primero en SOURCE_DIRS gana."""
+    seen = {}
+    for base in SOURCE_DIRS:
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) != BUILD_DIR]
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(dirpath, name)
+                seen.setdefault(os.path.relpath(path, base).replace(os.sep, "/"), path)
+    return sorted(seen.items())
+
+def _icon(data):
+    from PIL import Image
+    im = Image.open(io.BytesIO(data))
+    im.thumbnail((ICON_PX, ICON_PX), Image.LANCZOS)
+    out = io.BytesIO()
+    im.save(out, "WEBP", quality=ICON_QUALITY, method=6)
+    return out.getvalue(), ".webp"
+
+def _hashed(logical, data, ext):
+    stem = logical.rsplit(".", 1)[0] if "." in os.path.basename(logical) else logical
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def build(echo=print):
+    """Genera static/dist/ y el manifiesto. Devuelve el manifiesto."""
+    manifest, total_in, total_out = {}, 0, 0
+    for logical, path in _sources():
+        with open(path, "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(logical)[1].lower()
+        if logical.startswith(ICON_DIR) and ext in (".png", ".jpg", ".jpeg"):
+            data, ext = _icon(data)
+        name = _hashed(logical, data, ext)
+        target = os.path.join(BUILD_DIR, name)
+        _write(target, data)
+        sizes = [len(data)]
+        if ext in COMPRESSIBLE:
+            variants = [(".gz", gzip.compress(data, 9, mtime=0))]
+            if brotli:
+                variants.append((".br", brotli.compress(data, quality=11)))
+            for suffix, packed in variants:
+                if len(packed) < len(data) * 0.9:
+                    _write(target + suffix, packed)
+                    sizes.append(len(packed))
+        manifest[logical] = name
+        total_in += os.path.getsize(path)
+        total_out += min(sizes)
+        echo(f"  {logical:28s} -> {name}  ({os.path.getsize(path)} -> {min(sizes)} B)")
+    _write(os.path.join(BUILD_DIR, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _prune(manifest)
+    echo(f"{len(manifest)} archivos: {total_in} B -> {total_out} B transferidos"
+         + ("" if brotli else "  (sin Brotli: solo .gz)"))
+    return manifest
+
+def _prune(manifest):
+    """Borra salidas de builds anteriores (las del build actual y el manifiesto se quedan)."""
+    keep = {MANIFEST} | {n + s for n in manifest.values() for s in ("", ".gz", ".br")}
+    for dirpath, _, filenames in os.walk(BUILD_DIR):
+        for name in filenames:
+            rel = os.path.relpath(os.path.join(dirpath, name), BUILD_DIR).replace(os.sep, "/")
+            if rel not in keep:
+                os.remove(os.path.join(dirpath, name))
+
+# ---------- runtime ----------
+_manifest = {"mtime": None, "map": {}}
+_source_hash = {}   # ruta -> (mtime, hash) para el modo sin build
+
+def _load_manifest():
+    path = os.path.join(BUILD_DIR, MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if mtime != _manifest["mtime"]:
+        with open(path) as f:
+            _manifest["map"] = json.load(f)
+        _manifest["mtime"] = mtime
+    return _manifest["map"]
+
+def _source_path(logical):
+    for base in SOURCE_DIRS:
+        path = safe_join(base, logical)
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+def _source_version(path):
+    mtime = os.path.getmtime(path)
+    cached = _source_hash.get(path)
+    if not cached or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached = _source_hash[path] = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+    return cached[1]
+
+def asset_url(logical):
+    """URL de un archivo estático por su ruta lógica ('style.css', 'js/upload.js', 'img/x.png')."""
+    built = _load_manifest().get(logical)
+    if built:
+        return url_for("assets.asset", filename=built)
+    path = _source_path(logical)
+    if not path:
+        raise FileNotFoundError(f"asset desconocido: {logical}")
+    return url_for("assets.asset", filename=logical, v=_source_version(path))
+
+@assets_bp.route("/assets/<path:filename>")
+def asset(filename):
+    path = safe_join(BUILD_DIR, filename)
+    if path and filename != MANIFEST and os.path.isfile(path):
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        encoding = next(((enc, path + suffix) for enc, suffix in ENCODINGS
+                         if enc in request.accept_encodings and os.path.isfile(path + suffix)), None)
+        if encoding:
+            rv = send_file(encoding[1], mimetype=mimetype, conditional=True)
+            rv.headers["Content-Encoding"] = encoding[0]
+        else:
+            rv = send_file(path, mimetype=mimetype, conditional=True)
+        rv.headers["Vary"] = "Accept-Encoding"
+        rv.headers["Cache-Control"] = IMMUTABLE
+        return rv
+    path = _source_path(filename)   # sin build: el fuente, revalidando con ETag
+    if not path:
+        abort(404)
+    rv = send_file(path, conditional=True)
+    rv.headers["Cache-Control"] = "no-cache"
+    return rv
+
+def init_app_assets(app):
+    app.register_blueprint(assets_bp)
+    app.add_template_global(asset_url)
+
+# ---------- CLI ----------
+@click.group("assets")
+def assets_cli():
+    """Archivos estáticos con huella (build del deploy)."""
+
+@assets_cli.command("build")
+def build_cmd():
+    """Genera static/dist/ (hash, .gz/.br, íconos reducidos) y el manifiesto."""
+    build(echo=click.echo)
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        sys.exit("uso: python -m app.assets build")
+    build()
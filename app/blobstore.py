@@ -0,0 +1,176 @@
+# app/blobstore.py
+# Almacén de blobs direccionado por contenido (sha256).
+# Las imágenes viven fuera de la BD; `fotos` solo guarda hash y tamaño.
+# Subir dos veces la misma imagen ocupa espacio una sola vez.
+#
+# Backend por BLOB_BACKEND (default "local"); el local usa BLOB_DIR:
+#   BLOB_DIR/ab/cd/abcd…(64 hex)
+import os, hashlib, tempfile, time
+from abc import ABC, abstractmethod
+from sqlalchemy import text
+
+BLOB_BACKEND = os.environ.get("BLOB_BACKEND", "local")
+BLOB_DIR     = os.environ.get("BLOB_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "blobs"))
+# No se borran blobs tocados hace menos de GC_GRACE s: cubre una subida que reutiliza
+# un hash existente y aún no hace commit de su fila (más que el timeout de gunicorn).
+GC_GRACE     = int(os.environ.get("BLOB_GC_GRACE", 120))
+
+class BlobStore(ABC):
+    """Interfaz de un backend. `path()` devuelve None si el backend no es de archivos;
+    `age()` infinito si no sabe cuándo se tocó un blob (la GC lo puede borrar ya)."""
+    @abstractmethod
+    def put(self, data): ...
+    @abstractmethod
+    def get(self, sha): ...
+    @abstractmethod
+    def exists(self, sha): ...
+    @abstractmethod
+    def delete(self, sha): ...
+    @abstractmethod
+    def iter_keys(self): ...
+    def path(self, sha): return None
+    def age(self, sha): return float("inf")
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root):
+        self.root = root
+        self.tmp = os.path.join(root, "tmp")
+        os.makedirs(self.tmp, exist_ok=True)
+
+    def _path(self, sha):
+        if len(sha) != 64 or not all(c in "0123456789abcdef" for c in sha):
+            raise ValueError(f"hash inválido: {sha!r}")
+        return os.path.join(self.root, sha[:2], sha[2:4], sha)
+
+    def put(self, data):
+        """Guarda `data`; devuelve (sha256, tamaño). Idempotente."""
+        sha = hashlib.sha256(data).hexdigest()
+        dest = self._path(sha)
+        if os.path.exists(dest):
+            os.utime(dest)   # la GC no debe borrarlo mientras se inserta la fila que lo usa
+            return sha, len(data)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # Escritura atómica: archivo temporal en el mismo FS + fsync + rename
+        fd, tmp = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, dest)
+        except BaseException:
+            try: os.remove(tmp)
+            except OSError: pass
+            raise
+        return sha, len(data)
+
+    def get(self, sha):
+        with open(self._path(sha), "rb") as f:
+            return f.read()
+
+    def exists(self, sha):
+        return os.path.exists(self._path(sha))
+
+    def delete(self, sha):
+        try:
+            os.remove(self._path(sha))
+        except FileNotFoundError:
+            pass
+
+    def path(self, sha):
+        # Para servir con send_file: gunicorn usa wsgi.file_wrapper (sendfile), sin copiar a Python
+        return self._path(sha)
+
+    def age(self, sha):
+        try:
+            return time.time() - os.path.getmtime(self._path(sha))
+        except FileNotFoundError:
+            return float("inf")
+
+    def iter_keys(self):
+        for d1 in os.listdir(self.root):
+            if len(d1) != 2:
+                continue
+            for d2 in os.listdir(os.path.join(self.root, d1)):
+                yield from os.listdir(os.path.join(self.root, d1, d2))
+
+BACKENDS = {"local": lambda: LocalBlobStore(BLOB_DIR)}
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = BACKENDS[BLOB_BACKEND]()
+    return _store
+
+# ---------- fotos ----------
+# variante -> (columna hash, columna tamaño, columna BYTEA heredada)
+FOTO_BLOBS = {
+    "original": ("original_sha256", "original_size", "original_png"),
+    "anotada":  ("anotada_sha256",  "anotada_size",  "anotada_png"),
+}
+
+def foto_bytes(db, fid, variant):
+    """Bytes de una variante; lee del almacén o de la columna BYTEA si la fila no se ha migrado."""
+    sha_col, _, legacy_col = FOTO_BLOBS[variant]
+    row = db.execute(text(f"SELECT {sha_col}, {legacy_col} IS NOT NULL FROM fotos WHERE id=:id"),
+                     {"id": fid}).first()
+    if not row:
+        return None
+    if row[1]:
+        return db.execute(text(f"SELECT {legacy_col} FROM fotos WHERE id=:id"), {"id": fid}).scalar()
+    return get_store().get(row[0]) if row[0] else None
+
+def is_referenced(db, sha):
+    return db.execute(text("""
+      SELECT 1 FROM fotos WHERE original_sha256=:s OR anotada_sha256=:s LIMIT 1
+    """), {"s": sha}).first() is not None
+
+def gc_blobs(db, shas):
+    """Borra del almacén los hashes que ya ninguna fila usa. Llamar DESPUÉS del commit."""
+    store, removed = get_store(), 0
+    for sha in {s for s in shas if s}:
+        if not is_referenced(db, sha) and store.age(sha) > GC_GRACE:
+            store.delete(sha)
+            removed += 1
+    return removed
+
+def gc_sweep(engine):
+    """Barrido completo: borra todo blob sin referencia (y con más de GC_GRACE de antigüedad)."""
+    store = get_store()
+    with engine.connect() as db:
+        used = set(db.execute(text("""
+          SELECT original_sha256 FROM fotos WHERE original_sha256 IS NOT NULL
+          UNION SELECT anotada_sha256 FROM fotos WHERE anotada_sha256 IS NOT NULL
+        """)).scalars())
+    removed = 0
+    for sha in list(store.iter_keys()):
+        if sha not in used and store.age(sha) > GC_GRACE:
+            store.delete(sha)
+            removed += 1
+    return removed
+
+def migrate_fotos(engine, batch=20):
+    """Mueve original_png/anotada_png al almacén y deja solo hash + tamaño. Devuelve filas migradas."""
+    store, done, last_id = get_store(), 0, 0
+    while True:
+        with engine.begin() as db:
+            ids = db.execute(text("""
+              SELECT id FROM fotos
+              WHERE id > :last AND (original_png IS NOT NULL OR anotada_png IS NOT NULL)
+              ORDER BY id LIMIT :n
+            """), {"last": last_id, "n": batch}).scalars().all()
+            if not ids:
+                return done
+            for fid in ids:
+                for variant, (sha_col, size_col, legacy_col) in FOTO_BLOBS.items():
+                    data = db.execute(text(f"SELECT {legacy_col} FROM fotos WHERE id=:id"), {"id": fid}).scalar()
+                    if data is None:
+                        continue
+                    sha, size = store.put(bytes(data))
+                    db.execute(text(f"""
+                      UPDATE fotos SET {sha_col}=:sha, {size_col}=:size, {legacy_col}=NULL WHERE id=:id
+                    """), {"sha": sha, "size": size, "id": fid})
+                done += 1
+            last_id = ids[-1]
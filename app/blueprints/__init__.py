@@ -1,8 +1,13 @@
 # app/blueprints/__init__.py
-from flask import Blueprint, render_template, session, redirect, url_for
+from flask import Blueprint, render_template, session, redirect, url_for, flash
+
+from app.profile import current_profile, display_name
 
 # Importa el BP de Medidas
 from .medidas import medidas_bp
+from .reportes import bp as reportes_bp
+from .cortes import bp as cortes_bp
+from .cotizaciones import bp as cotizaciones_bp
 
 # ---- Core (homepage + dashboard) ----
 core = Blueprint(
@@ -21,9 +26,26 @@ def index():
 
 @core.route("/dashboard", endpoint="dashboard")
 def dashboard():
-    return render_template("dashboard.html")
+    user_email = session.get("user_email")
+    if not user_email:
+        flash("Acceso no autorizado. Inicia sesión.", "warning")
+        return redirect(url_for("login"))
+
+    # Nombre desde el perfil cacheado en sesión (app/profile.py): sin consulta a `users`
+    modules = [
+        {"name": "Clientes",     "href": url_for("clientes"),     "img": "img/clientes.png"},
+        {"name": "Productos",    "href": url_for("productos"),    "img": "img/productos.png"},
+        {"name": "Pedidos",      "href": url_for("pedidos"),      "img": "img/pedidos.png"},
+        {"name": "Cotizaciones", "href": url_for("cotizaciones.index"), "img": "img/cotizaciones.png"},
+        {"name": "Inventario",   "href": url_for("inventario"),   "img": "img/inventario.png"},
+        {"name": "Reportes",     "href": url_for("reportes.index"), "img": "img/reportes.png"},
+    ]
+    return render_template("dashboard.html", user=display_name(current_profile(), user_email), modules=modules)
 
 # ---- Registro de blueprints ----
 def register_blueprints(app):
     app.register_blueprint(core)
     app.register_blueprint(medidas_bp)   # 👈 IMPORTANTE: registra Medidas
+    app.register_blueprint(reportes_bp, url_prefix="/reportes")
+    app.register_blueprint(cortes_bp, url_prefix="/cortes")
+    app.register_blueprint(cotizaciones_bp, url_prefix="/cotizaciones")
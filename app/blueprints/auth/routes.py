@@ -1,9 +1,10 @@
 # app/blueprints/auth/routes.py
 import re
-from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from werkzeug.security import generate_password_hash, check_password_hash
-from app.db import get_db
+from app.db import get_conn
+from app.repo import users
+from app.passwords import hash_password, verify_password, KdfBusy
+from app.profile import load_profile, invalidate_profile
 
 auth_bp = Blueprint("auth", __name__, template_folder="../../templates")
 
@@ -14,11 +15,17 @@ def login():
     if request.method == "POST":
         email    = request.form.get("email","").strip().lower()
         password = request.form.get("password","")
-        db = get_db()
-        row = db.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
-        ok = bool(row and check_password_hash(row["password_hash"], password))
+        row = users.by_email(get_conn(), email)
+        try:
+            ok, new_hash = verify_password(row["password_hash"], password) if row else (False, None)
+        except KdfBusy:
+            flash("Hay muchos inicios de sesión en este momento. Intenta de nuevo en unos segundos.", "warning")
+            return render_template("login.html"), 503, {"Retry-After": "5"}
         if ok:
+            if new_hash:
+                users.set_password_hash(get_conn(), email, new_hash)
             session["user_email"] = email
+            load_profile(email, row)
             flash("Has iniciado sesión.", "success")
             return redirect(url_for("core.dashboard"))
         flash("Correo o contraseña incorrectos.", "danger")
@@ -28,6 +35,7 @@ def login():
 @auth_bp.route("/logout")
 def logout():
     session.pop("user_email", None)
+    invalidate_profile()
     flash("Sesión cerrada.", "info")
     return redirect(url_for("auth.login"))
 
@@ -56,17 +64,18 @@ def register():
         if not accept:
             flash("Debes aceptar las políticas para continuar.", "warning"); return redirect(url_for("auth.register"))
 
-        db = get_db()
-        if db.execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone():
+        email_taken, phone_taken = users.taken(get_conn(), email, phone)
+        if email_taken:
             flash("Ese correo ya está registrado.", "danger"); return redirect(url_for("auth.register"))
-        if phone and db.execute("SELECT 1 FROM users WHERE phone = ?", (phone,)).fetchone():
+        if phone_taken:
             flash("Ese teléfono ya está registrado.", "danger"); return redirect(url_for("auth.register"))
 
-        pw_hash = generate_password_hash(password)
-        db.execute("""INSERT INTO users (email,password_hash,first_name,last_name,address,phone,company,created_at)
-                      VALUES (?,?,?,?,?,?,?,?)""",
-                   (email, pw_hash, first_name, last_name, address, phone, company, datetime.utcnow().isoformat()))
-        db.commit()
+        try:
+            pw_hash = hash_password(password)
+        except KdfBusy:
+            flash("Hay muchos registros en este momento. Intenta de nuevo en unos segundos.", "warning")
+            return render_template("register.html"), 503, {"Retry-After": "5"}
+        users.create(get_conn(), email, pw_hash, first_name, last_name, address, phone, company)
 
         flash("Cuenta creada. Inicia sesión.", "success")
         return redirect(url_for("auth.login"))
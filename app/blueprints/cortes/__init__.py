@@ -0,0 +1,88 @@
+# app/blueprints/cortes/__init__.py
+# Planes de corte de vidrio (app/cortes.py) a partir de fotos de Medidas o piezas sueltas.
+#
+#   POST /cortes/plan   {"fotos": [ids], "piezas": [{ancho, alto, cantidad, ref}],
+#                        "hojas": [{ancho, alto, nombre, stock}], "margen": 10, "kerf": 0, "tiempo": 2}
+#   flask --app main cortes plan --foto 12 --foto 15 --hoja 3210x2250
+import json
+import click
+from flask import Blueprint, request, session, jsonify
+
+from app.db import get_conn, engine
+from app.cortes import (plan, pieces_from_fotos, CorteError, DEFAULT_KERF, DEFAULT_MARGIN, TIME_BUDGET,
+                        MAX_PIECES as CLI_MAX_PIECES)
+
+MAX_TIME   = 3.0    # s; el plan corre dentro de la petición y ocupa el CPU del worker
+# Con más piezas ni un intento de la búsqueda cabe en MAX_TIME y el plan sería el de
+# respaldo por estantes; los pedidos más grandes van por la CLI (--tiempo)
+MAX_PIECES = 2000
+
+bp = Blueprint("cortes", __name__)
+
+def _plan(db, fotos, piezas, hojas, kerf, margen, tiempo, max_pieces=CLI_MAX_PIECES):
+    """(resultado, avisos). Las fotos se convierten en piezas; avisos = fotos sin medidas."""
+    if len(fotos) > max_pieces:
+        raise CorteError(f"Máximo {max_pieces} piezas por plan.")
+    pieces, warnings = pieces_from_fotos(db, fotos) if fotos else ([], [])
+    pieces += piezas or []
+    result = plan(pieces, hojas, kerf=kerf, margin=margen, time_budget=tiempo, max_pieces=max_pieces)
+    result["avisos"] = warnings
+    return result
+
+@bp.route("/plan", methods=["POST"])
+def plan_view():
+    if "user_email" not in session:
+        return jsonify({"error": "Debes iniciar sesión."}), 401
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": "Se espera un objeto JSON."}), 400
+    try:
+        fotos = [int(f) for f in body.get("fotos") or []]
+        result = _plan(get_conn(), fotos, body.get("piezas"), body.get("hojas"),
+                       kerf=float(body.get("kerf", DEFAULT_KERF)), margen=float(body.get("margen", DEFAULT_MARGIN)),
+                       tiempo=min(float(body.get("tiempo", TIME_BUDGET)), MAX_TIME), max_pieces=MAX_PIECES)
+    except CorteError as e:
+        return jsonify({"error": str(e)}), 400
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({"error": "Piezas u hojas inválidas."}), 400
+    return jsonify(result)
+
+def _sheet(value):
+    try:
+        w, h = value.lower().split("x")
+        return {"ancho": float(w), "alto": float(h)}
+    except ValueError:
+        raise click.BadParameter(f"usa ANCHOxALTO en mm, p. ej. 3210x2250 (no {value!r})")
+
+@bp.cli.command("plan")
+@click.option("--foto", "fotos", type=int, multiple=True, help="Id de foto (una pieza por foto).")
+@click.option("--pieza", "piezas", multiple=True, help="ANCHOxALTO[xCANTIDAD] en mm.")
+@click.option("--hoja", "hojas", multiple=True, help="ANCHOxALTO de hoja (default: las de app/cortes.py).")
+@click.option("--margen", default=DEFAULT_MARGIN, show_default=True)
+@click.option("--kerf", default=DEFAULT_KERF, show_default=True)
+@click.option("--tiempo", default=TIME_BUDGET, show_default=True, help="Presupuesto en segundos.")
+@click.option("--json", "as_json", is_flag=True, help="Imprime el plan completo en JSON.")
+def plan_cmd(fotos, piezas, hojas, margen, kerf, tiempo, as_json):
+    """Plan de corte para fotos de Medidas y/o piezas sueltas."""
+    extra = []
+    for p in piezas:
+        parts = p.lower().split("x")
+        if len(parts) not in (2, 3):
+            raise click.BadParameter(f"usa ANCHOxALTO[xCANTIDAD] (no {p!r})")
+        extra.append({"ref": p, "ancho": parts[0], "alto": parts[1], "cantidad": int(parts[2]) if len(parts) == 3 else 1})
+    with engine.connect() as db:
+        try:
+            result = _plan(db, list(fotos), extra, [_sheet(h) for h in hojas] or None, kerf, margen, tiempo)
+        except CorteError as e:
+            raise click.ClickException(str(e))
+    if as_json:
+        click.echo(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for w in result["avisos"]:
+        click.echo(f"  ! foto {w['foto_id']}: {w['error']}")
+    for h in result["hojas"]:
+        click.echo(f"  {h['repeticiones']} x hoja {h['hoja']}: {h['piezas']} piezas, desperdicio {h['desperdicio_pct']}%")
+    for p in result["sin_colocar"]:
+        click.echo(f"  ✗ no cabe: {p['ref']} ({p['ancho']} x {p['alto']})")
+    click.echo(f"Hojas: {result['total_hojas']}  ·  desperdicio {result['desperdicio_pct']}%  ·  "
+               f"{result['intentos']} intentos en {result['segundos']} s ({result['estrategia']})")
@@ -1,8 +1,69 @@
-# app/blueprints/clientes/__init__.py
-from flask import Blueprint, render_template
+# app/blueprints/cotizaciones/__init__.py
+# Cotizaciones: API JSON del motor de precios (app/cotizaciones.py).
+#
+#   POST /cotizaciones/api/cotizar   {"vidrio": "claro", "espesor": 6, "cargos": [...],
+#                                     "lineas": [{"ancho", "alto", "cantidad"} | {"foto_id"}, ...]}
+#   GET  /cotizaciones/api/precios   tablas vigentes y su versión
+#   PUT  /cotizaciones/api/precios   {"vidrios": [...], "cargos": [...], "reglas": {...}}; precio null borra
+#                                    (solo correos en PRECIOS_ADMINS, separados por coma; vacío = nadie)
+#   flask --app main cotizaciones precios [ARCHIVO.json]
+import os, json
+import click
+from flask import Blueprint, render_template, request, session, jsonify
+
+from app.db import get_conn, engine
+from app.cotizaciones import quote, save_precios, precios_json, CotizacionError
 
 bp = Blueprint("cotizaciones", __name__, template_folder="../../templates")
 
+# Editar precios cambia lo que se cobra en todas las cotizaciones: no basta con tener cuenta
+PRECIOS_ADMINS = {e.strip().lower() for e in os.environ.get("PRECIOS_ADMINS", "").split(",") if e.strip()}
+
 @bp.route("/")
 def index():
     return render_template("module_blank.html", title="Cotizaciones")
+
+def _json_body():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise CotizacionError("Se espera un objeto JSON.")
+    return body
+
+@bp.before_request
+def _require_login():
+    if request.endpoint != "cotizaciones.index" and "user_email" not in session:
+        return jsonify({"error": "Debes iniciar sesión."}), 401
+
+@bp.errorhandler(CotizacionError)
+def _invalid(e):
+    return jsonify({"error": str(e), "errores": e.errores}), 400
+
+@bp.route("/api/cotizar", methods=["POST"])
+def cotizar():
+    body = _json_body()
+    return jsonify(quote(get_conn(), body.get("lineas"), body))
+
+@bp.route("/api/precios", methods=["GET"])
+def precios_get():
+    return jsonify(precios_json(get_conn()))
+
+@bp.route("/api/precios", methods=["PUT"])
+def precios_put():
+    if session["user_email"].lower() not in PRECIOS_ADMINS:
+        return jsonify({"error": "No tienes permiso para editar precios."}), 403
+    return jsonify({"version": save_precios(get_conn(), _json_body())})
+
+@bp.cli.command("precios")
+@click.argument("archivo", type=click.File("r"), required=False)
+def precios_cmd(archivo):
+    """Carga tablas de precios desde JSON (mismo formato que PUT /api/precios) o las muestra."""
+    if archivo:
+        try:
+            with engine.begin() as db:
+                version = save_precios(db, json.load(archivo))
+        except (CotizacionError, ValueError) as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Precios guardados (versión {version}).")
+        return
+    with engine.connect() as db:
+        click.echo(json.dumps(precios_json(db), ensure_ascii=False, indent=2))
@@ -1,9 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import (Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, send_file, abort,
+                   current_app, stream_with_context)
 from sqlalchemy import text
-from datetime import datetime
-import base64, json
+import os, io, hashlib
+from datetime import datetime, date
+import click
 
-from app.db import get_db
+from app.db import get_db, engine
+from app.repo import fotos as fotos_repo
+from app.search import match_expr, index_foto, unindex_foto
+from app.mediciones import sync_foto, remove_foto
+from app.blobstore import get_store, gc_blobs, foto_bytes
+from app.thumbs import delete_thumb
+from app import uploads
+from app.render import parse_annotations, dump_annotations, foto_annotated, render_foto
+from app.transcode import sniff_mime
+from app.jobs import enqueue, get_job, release_keys
+import app.tasks  # noqa: F401  registra los trabajos de medidas
+from app.uploads import UploadError
 
 medidas_bp = Blueprint(
     "medidas", __name__,
@@ -18,35 +31,104 @@ def require_login():
         return False
     return True
 
+def wants_json():
+    """El cliente JS (fetch) pide JSON; el formulario clásico recibe redirect + flash."""
+    best = request.accept_mimetypes.best_match(["application/json", "text/html"])
+    return best == "application/json"
+
+def finish(url, msg, category, **extra):
+    flash(msg, category)
+    if wants_json():
+        return jsonify({"ok": True, "redirect": url, **extra})
+    return redirect(url)
+
+def fail(url, msg, category="warning", status=400):
+    if wants_json():
+        return jsonify({"error": msg}), status
+    flash(msg, category)
+    return redirect(url)
+
+def image_from_request():
+    """Imagen del POST: upload_id (subida reanudable), archivo multipart `foto` o dataurl (formato anterior)."""
+    uid = request.form.get("upload_id")
+    if uid:
+        return uploads.take(uid, session["user_email"])
+    f = request.files.get("foto")
+    if f:
+        return uploads.read_image(f.stream)
+    return uploads.decode_dataurl(request.form.get("dataurl", ""))
+
+def sha256_hex(b):
+    return hashlib.sha256(b).hexdigest()
+
+def image_url(fid, variant, sha):
+    """URL de la imagen; con hash se versiona (?v=) y el navegador la cachea para siempre."""
+    return url_for("medidas.image", fid=fid, variant=variant, v=sha[:16] if sha else None)
+
 # ============ LISTADO ============
-@medidas_bp.route("/")
-def index():
-    if not require_login(): return redirect(url_for("login"))
-    with get_db() as db:
-        rows = db.execute(text("""
-          SELECT id, nombre, creado_por, created_at, anotada_png IS NOT NULL AS tiene_anotada,
-                 CASE WHEN anotada_png IS NOT NULL THEN anotada_png ELSE original_png END AS thumb
-          FROM fotos
-          ORDER BY id DESC
-        """)).fetchall()
-
-    # Convertimos a data URI (solo para listar)
+# Paginación por cursor (keyset sobre id): cada página es un rango del índice de la PK,
+# sin OFFSET, así que el costo no crece con el tamaño de la tabla.
+PAGE_SIZE     = int(os.environ.get("MEDIDAS_PAGE_SIZE", 24))
+PAGE_SIZE_MAX = 100
+
+def _page_args():
+    """(before, limit, q) desde el querystring; before=None es la primera página."""
+    before = request.args.get("before", type=int)
+    limit = request.args.get("limit", PAGE_SIZE, type=int)
+    q = request.args.get("q", "").strip()[:200]
+    return before, max(1, min(limit, PAGE_SIZE_MAX)), q
+
+def list_page(db, before=None, limit=PAGE_SIZE, q=None):
+    """Devuelve (fotos, next_cursor). next_cursor es None si no hay más páginas.
+
+    Con `q`, solo las fotos que coinciden en el índice de búsqueda (app/search.py).
+    """
+    # Solo miniaturas: nunca leemos original_png/anotada_png en el listado
+    match = match_expr(db, q) if q else None
+    if match:
+        rows = fotos_repo.search_page(db, match, before, limit + 1)
+    else:
+        rows = fotos_repo.page(db, before, limit + 1)
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Las miniaturas se piden aparte por URL (cacheables); aquí no viaja ningún byte de imagen
     fotos = []
     for r in rows:
-        png_bytes = r[5]
-        data_uri = None
-        if png_bytes:
-            b64 = base64.b64encode(png_bytes).decode("utf-8")
-            data_uri = f"data:image/png;base64,{b64}"
         fotos.append({
-            "id": r[0],
-            "nombre": r[1],
-            "creado_por": r[2],
-            "created_at": r[3],
-            "tiene_anotada": bool(r[4]),
-            "data_uri": data_uri
+            "id": r["id"],
+            "nombre": r["nombre"],
+            "creado_por": r["creado_por"],
+            "created_at": r["created_at"],
+            "tiene_anotada": bool(r["tiene_anotada"]),
+            "thumb_url": image_url(r["id"], "thumb", r["thumb_sha256"]) if r["tiene_thumb"] else None
         })
-    return render_template("medidas_list.html", fotos=fotos)
+    return fotos, (fotos[-1]["id"] if more else None)
+
+@medidas_bp.route("/")
+def index():
+    if not require_login(): return redirect(url_for("login"))
+    before, limit, q = _page_args()
+    with get_db() as db:
+        fotos, next_cursor = list_page(db, before, limit, q)
+    return render_template("medidas_list.html", fotos=fotos, next_cursor=next_cursor, page_size=limit, q=q)
+
+@medidas_bp.route("/page")
+def page():
+    """Siguiente página del listado en JSON (scroll infinito)."""
+    if "user_email" not in session:
+        return jsonify({"error": "auth"}), 401
+    before, limit, q = _page_args()
+    with get_db() as db:
+        fotos, next_cursor = list_page(db, before, limit, q)
+    items = [dict(f,
+                  created_at=str(f["created_at"]),
+                  view_url=url_for("medidas.view", fid=f["id"]),
+                  annotate_url=url_for("medidas.annotate", fid=f["id"]),
+                  delete_url=url_for("medidas.delete", fid=f["id"]))
+             for f in fotos]
+    return jsonify({"items": items, "next": next_cursor})
 
 # ============ CAPTURAR (CÁMARA) ============
 @medidas_bp.route("/new", methods=["GET"])
@@ -58,47 +140,89 @@ def new():
 def new_post():
     if not require_login(): return redirect(url_for("login"))
     nombre = request.form.get("nombre","").strip()
-    dataurl = request.form.get("dataurl","")
-    if not nombre or not dataurl.startswith("data:image/png;base64,"):
-        flash("Falta nombre o foto.", "warning")
-        return redirect(url_for("medidas.new"))
-
-    # decode base64
-    b64 = dataurl.split(",",1)[1]
-    png_bytes = base64.b64decode(b64)
+    if not nombre:
+        return fail(url_for("medidas.new"), "Falta nombre o foto.")
+    try:
+        png_bytes = image_from_request()
+        # La captura manda la foto limpia + anotaciones; la versión anotada se renderiza en servidor
+        shapes = parse_annotations(request.form.get("anotaciones") or "[]")
+    except UploadError as e:
+        return fail(url_for("medidas.new"), str(e), status=e.status)
+    except (ValueError, KeyError, TypeError):
+        return fail(url_for("medidas.new"), "Anotaciones inválidas.")
 
+    # Se guarda la subida tal cual (solo hash + escritura) y se responde de inmediato;
+    # transcodificar, renderizar y la miniatura corren en el worker (app/tasks.py)
+    sha, size = get_store().put(png_bytes)
     with get_db() as db:
-        db.execute(text("""
-          INSERT INTO fotos (nombre, creado_por, created_at, original_png)
-          VALUES (:n, :by, :ts, :img)
-        """), {"n": nombre, "by": session["user_email"], "ts": datetime.utcnow(), "img": png_bytes})
+        jn = dump_annotations(shapes) if shapes else None
+        fid = fotos_repo.insert(db, nombre, session["user_email"], sha, size, jn)
+        index_foto(db, fid, nombre, session["user_email"], jn)
+        sync_foto(db, fid, shapes, new_foto=True)
+    job = enqueue("medidas.process_upload", {"fid": fid, "raw_sha": sha},
+                  idem_key=f"process_upload:{fid}:{sha}", owner=session["user_email"])
 
-    flash("Foto guardada.", "success")
-    return redirect(url_for("medidas.index"))
+    return finish(url_for("medidas.index"), "Foto guardada.", "success", foto_id=fid, job=job)
+
+# ============ SUBIDAS REANUDABLES ============
+# Protocolo descrito en app/uploads.py. Los errores van como JSON con el status HTTP.
+@medidas_bp.errorhandler(UploadError)
+def upload_error(e):
+    return jsonify({"error": str(e)}), e.status
+
+@medidas_bp.route("/uploads", methods=["POST"])
+def upload_start():
+    if "user_email" not in session: abort(401)
+    size = (request.get_json(silent=True) or {}).get("size")
+    return jsonify(uploads.start(session["user_email"], size)), 201
+
+@medidas_bp.route("/uploads/<uid>", methods=["GET"])
+def upload_status(uid):
+    if "user_email" not in session: abort(401)
+    return jsonify(uploads.status(uid, session["user_email"]))
+
+@medidas_bp.route("/uploads/<uid>", methods=["PUT"])
+def upload_chunk(uid):
+    if "user_email" not in session: abort(401)
+    offset = request.headers.get("Upload-Offset", type=int)
+    if offset is None:
+        raise UploadError("Falta Upload-Offset.")
+    # request.stream: el cuerpo crudo se copia a disco por bloques, sin parsear formulario
+    new_offset = uploads.append(uid, session["user_email"], offset, request.stream)
+    return jsonify({"id": uid, "offset": new_offset})
+
+# ============ TRABAJOS ============
+@medidas_bp.route("/jobs/<jid>")
+def job_status(jid):
+    """Estado de un trabajo en segundo plano (para sondeo desde el cliente)."""
+    if "user_email" not in session: abort(401)
+    job = get_job(jid)
+    if not job or job["owner"] != session["user_email"]:
+        abort(404)
+    return jsonify({k: job[k] for k in ("id", "kind", "status", "attempts", "result")})
 
 # ============ VER ============
 @medidas_bp.route("/<int:fid>")
 def view(fid):
     if not require_login(): return redirect(url_for("login"))
     with get_db() as db:
-        row = db.execute(text("""
-          SELECT id, nombre, creado_por, created_at, original_png, anotada_png, anotaciones_json
-          FROM fotos WHERE id=:id
-        """), {"id": fid}).first()
+        row = fotos_repo.get(db, fid)
+        annotated = foto_annotated(db, fid) if row else None
     if not row:
         flash("No existe la foto.", "danger")
         return redirect(url_for("medidas.index"))
 
-    def to_datauri(png_bytes):
-        if not png_bytes: return None
-        b64 = base64.b64encode(png_bytes).decode("utf-8")
-        return f"data:image/png;base64,{b64}"
-
-    original_uri = to_datauri(row[4])
-    anotada_uri  = to_datauri(row[5])
-    anotaciones  = json.loads(row[6]) if row[6] else []
+    original_uri = image_url(fid, "original", row["original_sha256"]) if row["has_original"] else None
+    if annotated:       # render en servidor desde anotaciones_json
+        anotada_uri = image_url(fid, "anotada", annotated[0])
+    elif row["has_anotada"]:   # PNG anotado heredado (capturas anteriores)
+        anotada_uri = image_url(fid, "anotada", row["anotada_sha256"])
+    else:
+        anotada_uri = None
+    anotaciones  = annotated[1] if annotated else []
     return render_template("medidas_view.html",
-                           foto_id=row[0], nombre=row[1], creado_por=row[2], created_at=row[3],
+                           foto_id=row["id"], nombre=row["nombre"], creado_por=row["creado_por"],
+                           created_at=row["created_at"],
                            original_uri=original_uri, anotada_uri=anotada_uri, anotaciones=anotaciones)
 
 # ============ ANOTAR ============
@@ -106,40 +230,287 @@ def view(fid):
 def annotate(fid):
     if not require_login(): return redirect(url_for("login"))
     with get_db() as db:
-        row = db.execute(text("SELECT id, nombre, original_png, anotaciones_json FROM fotos WHERE id=:id"), {"id": fid}).first()
+        row = fotos_repo.get(db, fid)
     if not row:
         flash("No existe la foto.", "danger"); return redirect(url_for("medidas.index"))
 
-    b64 = base64.b64encode(row[2]).decode("utf-8") if row[2] else None
-    dataurl = f"data:image/png;base64,{b64}" if b64 else None
-    anotaciones = json.loads(row[3]) if row[3] else []
+    base_image = image_url(fid, "original", row["original_sha256"]) if row["has_original"] else None
+    try:
+        anotaciones = parse_annotations(row["anotaciones_json"]) if row["anotaciones_json"] else []
+    except (ValueError, KeyError, TypeError):
+        anotaciones = []
     return render_template("medidas_annotate.html",
-                           foto_id=row[0], nombre=row[1], base_image=dataurl, anotaciones=anotaciones)
+                           foto_id=row["id"], nombre=row["nombre"], base_image=base_image, anotaciones=anotaciones)
 
 @medidas_bp.route("/<int:fid>/annotate", methods=["POST"])
 def annotate_save(fid):
     if not require_login(): return redirect(url_for("login"))
-    # Recibimos dataurl de PNG anotado y JSON de anotaciones
-    dataurl = request.form.get("dataurl","")
-    anot_json = request.form.get("anotaciones","[]")
-    if not dataurl.startswith("data:image/png;base64,"):
-        flash("No se recibió imagen anotada.", "warning")
-        return redirect(url_for("medidas.annotate", fid=fid))
-    png_bytes = base64.b64decode(dataurl.split(",",1)[1])
+    # Solo viaja el JSON de anotaciones (pocos KB); la imagen anotada se renderiza en servidor
+    try:
+        shapes = parse_annotations(request.form.get("anotaciones") or "[]")
+    except (ValueError, KeyError, TypeError):
+        return fail(url_for("medidas.annotate", fid=fid), "Anotaciones inválidas.")
+
+    with get_db() as db:
+        row = fotos_repo.get(db, fid)
+        if not row:
+            return fail(url_for("medidas.index"), "No existe la foto.", "danger", 404)
+        old_sha = row["anotada_sha256"]
+        jn = dump_annotations(shapes) if shapes else None
+        fotos_repo.set_annotations(db, fid, jn)
+        index_foto(db, fid, row["nombre"], row["creado_por"], jn)   # etiquetas nuevas
+        sync_foto(db, fid, shapes)                                   # mediciones + reportes
+    # La miniatura (y el render en caché) se rehacen en segundo plano
+    job = enqueue("medidas.refresh_thumb", {"fid": fid}, owner=session["user_email"])
+    if old_sha:
+        with get_db() as db:   # la misma conexión de la petición, ya con commit
+            gc_blobs(db, [old_sha])
+
+    return finish(url_for("medidas.view", fid=fid), "Anotaciones guardadas.", "success", job=job)
+
+# ============ IMAGEN (binario) ============
+# (tabla, columna de bytes en BD, columna de hash, llave)
+# original/anotada viven en el blobstore; la columna BYTEA solo tiene datos en filas sin migrar.
+IMAGE_VARIANTS = {
+    "original": ("fotos", "original_png", "original_sha256", "id"),
+    "anotada":  ("fotos", "anotada_png", "anotada_sha256", "id"),
+    "thumb":    ("foto_thumbs", "data", "sha256", "foto_id"),
+}
+IMAGE_MAX_AGE = 365 * 24 * 3600
+
+@medidas_bp.route("/<int:fid>/image/<variant>")
+def image(fid, variant):
+    """Bytes crudos de la imagen con ETag fuerte (sha256), 304 y soporte de Range."""
+    if "user_email" not in session:
+        abort(401)
+    if variant not in IMAGE_VARIANTS:
+        abort(404)
+    table, col, sha_col, key = IMAGE_VARIANTS[variant]
 
     with get_db() as db:
-        db.execute(text("""
-           UPDATE fotos SET anotada_png=:png, anotaciones_json=:jn WHERE id=:id
-        """), {"png": png_bytes, "jn": anot_json, "id": fid})
+        # Anotada = render desde anotaciones_json (ETag = hash(foto, anotaciones)).
+        # Si la foto no tiene JSON, cae al PNG anotado heredado más abajo.
+        annotated = foto_annotated(db, fid) if variant == "anotada" else None
+        if annotated:
+            key, shapes = annotated
+            if request.if_none_match.contains(key):
+                rv = current_app.response_class(status=304)
+                rv.set_etag(key)
+            else:
+                data = render_foto(db, fid, key, shapes)
+                if data is None:
+                    abort(404)
+                rv = send_file(io.BytesIO(data), mimetype=sniff_mime(data[:12]), etag=key, conditional=True)
+            return _image_cache_headers(rv, key)
+
+        # 1) Solo el hash: un GET condicional se resuelve sin leer el blob
+        row = db.execute(text(f"SELECT {sha_col}, {col} IS NOT NULL FROM {table} WHERE {key}=:id"),
+                         {"id": fid}).first()
+        if row is None:
+            abort(404)
+        sha, in_db = row[0], bool(row[1])
+        data = None
+        if sha and request.if_none_match.contains(sha):
+            pass
+        elif in_db:
+            data = db.execute(text(f"SELECT {col} FROM {table} WHERE {key}=:id"), {"id": fid}).scalar()
+            if not sha:  # filas anteriores al hash: se calcula una vez y se guarda
+                sha = sha256_hex(data)
+                db.execute(text(f"UPDATE {table} SET {sha_col}=:sha WHERE {key}=:id"), {"sha": sha, "id": fid})
+        elif not sha:
+            abort(404)
+
+    if data is not None:
+        rv = send_file(io.BytesIO(data), mimetype=sniff_mime(bytes(data[:12])), etag=sha, conditional=True)
+    elif request.if_none_match.contains(sha):
+        rv = current_app.response_class(status=304)
+        rv.set_etag(sha)
+    else:
+        # 2) Desde el blobstore: por ruta (sendfile) si el backend es local
+        store = get_store()
+        path = store.path(sha)
+        try:
+            if path:
+                with open(path, "rb") as f:
+                    mime = sniff_mime(f.read(12))
+                src = path
+            else:
+                src = io.BytesIO(store.get(sha))
+                mime = sniff_mime(src.getvalue()[:12])
+            rv = send_file(src, mimetype=mime, etag=sha, conditional=True)
+        except FileNotFoundError:
+            abort(404)
+    return _image_cache_headers(rv, sha)
 
-    flash("Anotaciones guardadas.", "success")
-    return redirect(url_for("medidas.view", fid=fid))
+def _image_cache_headers(rv, sha):
+    # Privado (requiere sesión). Si la URL trae la versión correcta, el contenido nunca cambia.
+    rv.cache_control.private = True
+    if request.args.get("v") and sha.startswith(request.args["v"]):
+        rv.cache_control.no_cache = None
+        rv.cache_control.max_age = IMAGE_MAX_AGE
+        rv.cache_control.immutable = True
+    else:
+        rv.cache_control.max_age = 0
+        rv.cache_control.no_cache = True
+    return rv
+
+# ============ IMPORTAR (lote) ============
+# POST /medidas/import   archivo=<zip>   ó   fotos=<varios archivos> [+ anotaciones={archivo: [...]}]
+@medidas_bp.route("/import", methods=["POST"])
+def import_batch():
+    """Importa muchas fotos en una petición; responde el resultado de cada una (JSON)."""
+    if "user_email" not in session: abort(401)
+    from app.importer import zip_items, files_items, import_items, BatchImportError
+    try:
+        if "archivo" in request.files:
+            items = zip_items(request.files["archivo"].stream)
+        elif request.files.getlist("fotos"):
+            items = files_items(request.files.getlist("fotos"), request.form.get("anotaciones"))
+        else:
+            return jsonify({"error": "Manda un ZIP en `archivo` o imágenes en `fotos`."}), 400
+        results = import_items(items, session["user_email"])
+    except BatchImportError as e:
+        return jsonify({"error": str(e)}), 400
+    ok = sum(1 for r in results if r.get("ok"))
+    return jsonify({"importadas": ok, "fallidas": len(results) - ok, "items": results})
+
+# ============ EXPORTAR ============
+# GET /medidas/export?desde=2024-01-01&hasta=2024-01-31&usuario=a@b.c&q=cocina&formato=zip|ndjson
+@medidas_bp.route("/export")
+def export():
+    """ZIP (imágenes + manifest.ndjson + mediciones.csv) o NDJSON, generado en streaming."""
+    if "user_email" not in session: abort(401)
+    from app.export import zip_stream, ndjson_stream, VARIANTS
+    try:
+        filters = {"desde": request.args.get("desde") or None, "hasta": request.args.get("hasta") or None,
+                   "usuario": request.args.get("usuario") or None, "q": request.args.get("q") or None}
+        for k in ("desde", "hasta"):
+            if filters[k]:
+                filters[k] = date.fromisoformat(filters[k])
+    except ValueError:
+        return jsonify({"error": "Fecha inválida (usa AAAA-MM-DD)."}), 400
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M")
+    if request.args.get("formato") == "ndjson":
+        return current_app.response_class(
+            stream_with_context(ndjson_stream(**filters)), mimetype="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="medidas-{stamp}.ndjson"'})
+    variants = [v for v in request.args.get("imagenes", ",".join(VARIANTS)).split(",") if v in VARIANTS]
+    return current_app.response_class(
+        stream_with_context(zip_stream(variants, **filters)), mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="medidas-{stamp}.zip"',
+                 "X-Accel-Buffering": "no"})
 
 # ============ ELIMINAR ============
 @medidas_bp.route("/<int:fid>/delete", methods=["POST"])
 def delete(fid):
     if not require_login(): return redirect(url_for("login"))
     with get_db() as db:
-        db.execute(text("DELETE FROM fotos WHERE id=:id"), {"id": fid})
+        shas = fotos_repo.shas(db, fid)
+        remove_foto(db, fid)
+        fotos_repo.delete(db, fid)
+        delete_thumb(db, fid)
+        unindex_foto(db, fid)
+        release_keys(db, f"process_upload:{fid}:")   # en SQLite el id se reutiliza
+    if shas:
+        with get_db() as db:   # ya con commit: solo se borran blobs que nadie más usa
+            gc_blobs(db, shas)
     flash("Foto eliminada.", "info")
     return redirect(url_for("medidas.index"))
+
+# ============ CLI ============
+# flask --app main medidas backfill-thumbs [--rebuild]
+@medidas_bp.cli.command("backfill-thumbs")
+@click.option("--rebuild", is_flag=True, help="Regenera también las miniaturas existentes.")
+@click.option("--batch", default=25, show_default=True)
+def backfill_thumbs_cmd(rebuild, batch):
+    """Genera miniaturas para las fotos que no tienen."""
+    from app.thumbs import backfill_thumbs
+    n = backfill_thumbs(engine, batch=batch, rebuild=rebuild)
+    click.echo(f"Miniaturas generadas: {n}")
+
+# flask --app main medidas migrate-blobs
+@medidas_bp.cli.command("migrate-blobs")
+@click.option("--batch", default=20, show_default=True)
+def migrate_blobs_cmd(batch):
+    """Mueve original_png/anotada_png de la tabla fotos al blobstore."""
+    from app.blobstore import migrate_fotos
+    n = migrate_fotos(engine, batch=batch)
+    click.echo(f"Fotos migradas: {n}")
+    if n and engine.dialect.name == "postgresql":
+        click.echo("Para liberar el espacio en disco: VACUUM FULL fotos;")
+
+# flask --app main medidas recompress [--dry-run]
+@medidas_bp.cli.command("recompress")
+@click.option("--batch", default=20, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Solo calcula el ahorro; no escribe nada.")
+def recompress_cmd(batch, dry_run):
+    """Transcodifica las imágenes ya guardadas (PNG -> WebP/JPEG) y reporta el ahorro."""
+    from app.transcode import recompress_fotos
+    st = recompress_fotos(engine, batch=batch, dry_run=dry_run,
+                          progress=lambda st: click.echo(f"  … hasta id {st['last_id']}: "
+                                                         f"{st['converted']} convertidas"))
+    saved = st["bytes_before"] - st["bytes_after"]
+    pct = 100.0 * saved / st["bytes_before"] if st["bytes_before"] else 0.0
+    click.echo(f"Fotos revisadas: {st['fotos']}  ·  variantes recomprimidas: {st['converted']}")
+    click.echo(f"Bytes: {st['bytes_before']:,} -> {st['bytes_after']:,}  (ahorro {saved:,} B, {pct:.1f}%)"
+               + ("  [dry-run]" if dry_run else ""))
+    if st["skipped_legacy"]:
+        click.echo(f"{st['skipped_legacy']} fotos siguen en BYTEA: corre antes 'flask medidas migrate-blobs'.")
+
+# flask --app main medidas reindex-search
+@medidas_bp.cli.command("reindex-search")
+@click.option("--batch", default=500, show_default=True)
+def reindex_search_cmd(batch):
+    """Reconstruye el índice de búsqueda de fotos."""
+    from app.search import rebuild
+    n = rebuild(engine, batch=batch, progress=lambda n, last: click.echo(f"  … {n} fotos (hasta id {last})"))
+    click.echo(f"Fotos indexadas: {n}")
+
+# flask --app main medidas export salida.zip --desde 2024-01-01 --usuario a@b.c --q cocina
+@medidas_bp.cli.command("export")
+@click.argument("out", type=click.Path(dir_okay=False, writable=True))
+@click.option("--desde", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@click.option("--hasta", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@click.option("--usuario", default=None, help="creado_por exacto.")
+@click.option("--q", default=None, help="Búsqueda (nombre, autor, etiquetas).")
+@click.option("--ndjson", is_flag=True, help="Solo el manifiesto, sin imágenes.")
+@click.option("--sin-anotada", is_flag=True, help="Solo la foto original.")
+def export_cmd(out, desde, hasta, usuario, q, ndjson, sin_anotada):
+    """Exporta fotos y anotaciones a un ZIP (o NDJSON) sin cargar todo en memoria."""
+    from app.export import zip_stream, ndjson_stream, VARIANTS
+    filters = {"desde": desde.date() if desde else None, "hasta": hasta.date() if hasta else None,
+               "usuario": usuario, "q": q}
+    gen = ndjson_stream(**filters) if ndjson else \
+        zip_stream(("original",) if sin_anotada else VARIANTS, **filters)
+    total = 0
+    with open(out, "wb") as f:
+        for chunk in gen:
+            f.write(chunk)
+            total += len(chunk)
+    click.echo(f"{out}: {total:,} bytes")
+
+# flask --app main medidas import capturas.zip --usuario a@b.c
+@medidas_bp.cli.command("import")
+@click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+@click.option("--usuario", required=True, help="creado_por de las fotos importadas.")
+@click.option("--batch", default=50, show_default=True, help="Fotos por transacción.")
+def import_cmd(archivo, usuario, batch):
+    """Importa un ZIP de fotos (con anotaciones .json o manifest.ndjson opcionales)."""
+    from app.importer import zip_items, import_items, BatchImportError
+    with open(archivo, "rb") as f:
+        try:
+            results = import_items(zip_items(f), usuario, batch=batch)
+        except BatchImportError as e:
+            raise click.ClickException(str(e))
+    for r in results:
+        if not r.get("ok"):
+            click.echo(f"  ✗ {r['archivo']}: {r['error']}")
+    ok = sum(1 for r in results if r.get("ok"))
+    click.echo(f"Importadas: {ok}  ·  con error: {len(results) - ok}")
+
+# flask --app main medidas gc-blobs
+@medidas_bp.cli.command("gc-blobs")
+def gc_blobs_cmd():
+    """Borra del blobstore los blobs que ninguna foto usa."""
+    from app.blobstore import gc_sweep
+    click.echo(f"Blobs eliminados: {gc_sweep(engine)}")
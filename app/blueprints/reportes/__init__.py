@@ -1,8 +1,34 @@
-# app/blueprints/clientes/__init__.py
-from flask import Blueprint, render_template
+# app/blueprints/reportes/__init__.py
+# Reportes de Medidas. Solo lee las tablas agregadas que mantiene app/mediciones.py;
+# nunca recorre fotos ni anotaciones_json.
+import click
+from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify
+
+from app.db import get_conn, engine
+from app.mediciones import report, rebuild
+from app.blueprints.medidas import wants_json
 
 bp = Blueprint("reportes", __name__, template_folder="../../templates")
 
+DAYS_DEFAULT = 30
+DAYS_MAX     = 366   # la serie diaria va directo al LIMIT de la consulta
+
 @bp.route("/")
 def index():
-    return render_template("module_blank.html", title="Reportes")
+    if "user_email" not in session:
+        flash("Debes iniciar sesión.", "warning")
+        return redirect(url_for("login"))
+    days = request.args.get("dias", DAYS_DEFAULT, type=int)
+    data = report(get_conn(), days=max(1, min(days, DAYS_MAX)))
+    if wants_json():
+        return jsonify(data)
+    return render_template("reportes.html", r=data)
+
+# flask --app main reportes backfill
+@bp.cli.command("backfill")
+@click.option("--batch", default=500, show_default=True)
+def backfill_cmd(batch):
+    """Recalcula mediciones y agregados desde anotaciones_json (en una transacción)."""
+    with engine.begin() as db:
+        n = rebuild(db, batch=batch, progress=lambda n, last: click.echo(f"  … {n} fotos (hasta id {last})"))
+    click.echo(f"Fotos procesadas: {n}")
@@ -0,0 +1,455 @@
+# app/cortes.py
+# Optimización de cortes de vidrio: piezas rectangulares (ancho x alto en mm) sacadas de
+# hojas de stock con cortes de guillotina (cada corte atraviesa de lado a lado el
+# rectángulo en que se hace, como en la mesa de corte).
+#
+# Algoritmo (plan()):
+#   - Las piezas iguales se agrupan en tipos; los candidatos se evalúan por tipo y
+#     orientación (no por pieza), así un pedido de 500 vidrios de 3 medidas cuesta lo
+#     mismo que uno de 3.
+#   - Cada rectángulo libre se llena de forma recursiva: se elige la mejor pieza para la
+#     esquina (criterio de ajuste), se corta el resto en dos rectángulos (regla de corte) y
+#     se llenan. Los sub-layouts se memorizan por (ancho, alto, piezas disponibles que
+#     caben): en pedidos repetitivos casi todos los rectángulos ya se resolvieron.
+#   - Una hoja resuelta se repite mientras alcancen las piezas y el stock.
+#   - Primero un plan por estantes (_shelves: una pasada, acotada aun con MAX_PIECES), así
+#     que siempre hay plan. Luego se prueban combinaciones de criterio y regla (y órdenes
+#     aleatorios) hasta agotar el presupuesto de tiempo, que aplica a todos los intentos;
+#     gana el plan con menos área de hoja. La búsqueda para antes si el plan ya está en la
+#     cota inferior de área o cabe en una hoja, si STALL_ATTEMPTS intentos seguidos no
+#     mejoran, y no empieza si ninguna pieza cabe en las hojas con stock.
+#
+# first_fit() es la referencia ingenua (estantes, primera hoja donde quepa) para el
+# benchmark: python -m bench cortes
+import sys, time, random
+from collections import deque
+
+from app.mediciones import fotos_dims
+
+# Hojas de stock comunes (mm)
+DEFAULT_SHEETS = [
+    {"nombre": "3210 x 2250", "ancho": 3210, "alto": 2250},
+    {"nombre": "2440 x 1830", "ancho": 2440, "alto": 1830},
+]
+DEFAULT_KERF   = 0      # el vidrio se raya y se quiebra: no hay disco que coma material
+DEFAULT_MARGIN = 10     # orilla de la hoja que se descarta (mm por lado)
+TIME_BUDGET    = 2.0    # s
+STALL_ATTEMPTS = 500    # intentos seguidos sin mejora antes de cortar la búsqueda
+MAX_PIECES     = 20000
+
+class CorteError(ValueError):
+    """Entrada inválida para el optimizador (piezas u hojas)."""
+
+SCORES = {   # menor es mejor; (W, H) rectángulo libre, (w, h) pieza
+    "area":  lambda W, H, w, h: (W * H - w * h, min(W - w, H - h)),
+    "corto": lambda W, H, w, h: (min(W - w, H - h), max(W - w, H - h)),
+    "largo": lambda W, H, w, h: (max(W - w, H - h), min(W - w, H - h)),
+}
+SPLITS = ("area", "corto", "largo")
+
+# ---------- entrada ----------
+def _mm(v, what):
+    try:
+        v = int(round(float(v)))
+    except (TypeError, ValueError):
+        raise CorteError(f"{what}: medida inválida ({v!r})")
+    if v <= 0:
+        raise CorteError(f"{what}: la medida debe ser positiva")
+    return v
+
+def normalize_pieces(pieces, max_pieces=MAX_PIECES):
+    """[{ancho, alto, cantidad=1, ref=None, rotable=True}] -> lista validada."""
+    out, total = [], 0
+    for i, p in enumerate(pieces or []):
+        ref = p.get("ref") or f"pieza {i + 1}"
+        q = int(p.get("cantidad", 1))
+        if q < 1:
+            continue
+        total += q
+        out.append({"ref": str(ref), "ancho": _mm(p.get("ancho"), ref), "alto": _mm(p.get("alto"), ref),
+                    "cantidad": q, "rotable": bool(p.get("rotable", True))})
+    if not out:
+        raise CorteError("No hay piezas que cortar.")
+    if total > max_pieces:
+        raise CorteError(f"Máximo {max_pieces} piezas por plan.")
+    return out
+
+def check_cut(kerf, margin):
+    """kerf (mm que come cada corte) y margen (orilla por lado) no pueden ser negativos."""
+    if kerf < 0:
+        raise CorteError("kerf: no puede ser negativo")
+    if margin < 0:
+        raise CorteError("margen: no puede ser negativo")
+
+def normalize_sheets(sheets):
+    """[{ancho, alto, nombre=None, stock=None (ilimitado)}] -> lista validada."""
+    out = []
+    for s in sheets or DEFAULT_SHEETS:
+        name = s.get("nombre") or f"{s.get('ancho')} x {s.get('alto')}"
+        stock = s.get("stock")
+        out.append({"nombre": str(name), "ancho": _mm(s.get("ancho"), name), "alto": _mm(s.get("alto"), name),
+                    "stock": None if stock is None else int(stock)})
+    return out
+
+def pieces_from_fotos(db, foto_ids):
+    """Una pieza por foto: ancho = mayor medida horizontal, alto = mayor medida vertical.
+
+    Devuelve (piezas, avisos). Las fotos sin las dos medidas en mm van a avisos.
+    """
+    dims, errors = fotos_dims(db, foto_ids)
+    pieces, warnings = [], []
+    for fid in foto_ids:
+        if fid in errors:
+            warnings.append({"foto_id": fid, "error": errors[fid]})
+            continue
+        d = dims[fid]
+        pieces.append({"ref": f"foto {fid}: {d['nombre']}", "foto_id": fid, "ancho": d["ancho"], "alto": d["alto"],
+                       "cantidad": 1, "rotable": True})
+    return pieces, warnings
+
+# ---------- motor ----------
+MEMO_TYPES = 48   # con más medidas distintas casi no se repiten sub-layouts: sin memo
+
+class _Engine:
+    def __init__(self, types, score, split, rng=None):
+        self.score = SCORES[score]
+        self.split = split
+        self.rng = rng
+        # Tabla de orientaciones (tipo, w, h, rotada) por área descendente: con el criterio
+        # "area" la primera que cabe es la mejor y el recorrido termina ahí
+        orients = []
+        for t, (w, h, rot) in enumerate(types):
+            orients.append((t, w, h, False))
+            if rot and w != h:
+                orients.append((t, h, w, True))
+        self.orients = sorted(orients, key=lambda o: -o[1] * o[2])
+        self.first_wins = score == "area" and rng is None
+        self.min_side = min(min(w, h) for w, h, _ in types)
+        self.areas = [w * h for w, h, _ in types]
+        self.memo = {} if len(types) <= MEMO_TYPES else None
+
+    def _pick(self, W, H, left):
+        score, rng, best = self.score, self.rng, None
+        for o in self.orients:
+            t, w, h, _ = o
+            if left[t] and w <= W and h <= H:
+                if self.first_wins:
+                    return o
+                s = score(W, H, w, h)
+                if rng is not None:
+                    s = (s[0] * rng.uniform(0.9, 1.1), s[1])
+                elif s[0] == 0:
+                    return o   # ajuste exacto: no hay mejor
+                if best is None or s < best[0]:
+                    best = (s, o)
+        return best[1] if best else None
+
+    def fill(self, W, H, left):
+        """Llena W x H consumiendo piezas de `left` (cantidades por tipo, se modifica).
+
+        Devuelve (colocaciones ((x, y, w, h, tipo, rotada), ...), área usada).
+        """
+        if W < self.min_side or H < self.min_side:
+            return (), 0
+        memo = self.memo
+        if memo is not None:
+            # Solo importa cuántas de cada tipo podrían caber: eso hace que el sub-layout se repita
+            key = (W, H, tuple(min(a, (W * H) // ar) for a, ar in zip(left, self.areas)))
+            hit = memo.get(key)
+            if hit is not None:
+                placed, used, area = hit
+                for t, n in used:
+                    left[t] -= n
+                return placed, area
+            before = list(left)
+        o = self._pick(W, H, left)
+        if o is None:
+            placed, area = (), 0
+        else:
+            t, w, h, rotated = o
+            left[t] -= 1
+            # Dos formas de cortar el resto: corte horizontal o vertical primero
+            a = ((W - w, h), (W, H - h))     # derecha (alto de la pieza) + franja de arriba completa
+            b = ((W - w, H), (w, H - h))     # franja derecha completa + arriba (ancho de la pieza)
+            if self.split == "area":
+                rects = a if max(a[0][0] * a[0][1], a[1][0] * a[1][1]) >= max(b[0][0] * b[0][1], b[1][0] * b[1][1]) else b
+            elif self.split == "corto":
+                rects = a if W - w < H - h else b
+            else:
+                rects = b if W - w < H - h else a
+            (rw, rh), (tw, th) = rects
+            placed = [(0, 0, w, h, t, rotated)]
+            area = self.areas[t]
+            for ox, oy, sw, sh in ((w, 0, rw, rh), (0, h, tw, th)):
+                if sw > 0 and sh > 0:
+                    sub, sub_area = self.fill(sw, sh, left)
+                    placed.extend((x + ox, y + oy, pw, ph, pt, pr) for x, y, pw, ph, pt, pr in sub)
+                    area += sub_area
+            placed = tuple(placed)
+        if memo is not None:
+            memo[key] = (placed, tuple((t, b - a) for t, (b, a) in enumerate(zip(before, left)) if b != a), area)
+        return placed, area
+
+def _solve(types, demand, sheets, kerf, margin, score, split, rng, deadline):
+    """Un plan completo con una estrategia. None si se pasó del tiempo."""
+    eng = _Engine(types, score, split, rng)
+    demand = list(demand)
+    stock = [s["stock"] for s in sheets]
+    usable = [(s["ancho"] - 2 * margin + kerf, s["alto"] - 2 * margin + kerf) for s in sheets]
+    layouts = []
+    while any(demand):
+        if time.perf_counter() > deadline:
+            return None
+        best = None
+        for i, (W, H) in enumerate(usable):
+            if stock[i] is not None and stock[i] <= 0 or W <= 0 or H <= 0:
+                continue
+            left = list(demand)
+            placed, area = eng.fill(W, H, left)
+            if not placed:
+                continue
+            util = area / (sheets[i]["ancho"] * sheets[i]["alto"])
+            if best is None or util > best[0]:
+                best = (util, i, placed, [d - l for d, l in zip(demand, left)])
+        if best is None:
+            break   # lo que queda no cabe en ninguna hoja disponible
+        _, i, placed, used = best
+        # La misma hoja se repite mientras alcancen las piezas y el stock
+        reps = min(demand[t] // n for t, n in enumerate(used) if n)
+        if stock[i] is not None:
+            reps = min(reps, stock[i])
+            stock[i] -= reps
+        for t, n in enumerate(used):
+            demand[t] -= n * reps
+        layouts.append((i, placed, reps))
+    return layouts, demand
+
+def _shelves(types, demand, sheets, kerf, margin):
+    """Plan de respaldo: estantes, piezas por alto descendente, una hoja abierta a la vez.
+
+    Una sola pasada (piezas x estantes de la hoja): termina rápido con cualquier pedido.
+    Estantes = corte horizontal entre ellos y verticales dentro, así que es de guillotina.
+    """
+    stock = [s["stock"] for s in sheets]
+    usable = [(s["ancho"] - 2 * margin + kerf, s["alto"] - 2 * margin + kerf) for s in sheets]
+    # Los tipos rotables ya vienen acostados (ancho >= alto, ver _prepare): estantes más bajos
+    items = sorted(((w, h, rot, t) for t, (w, h, rot) in enumerate(types) for _ in range(demand[t])),
+                   key=lambda it: -it[1])
+    leftover, layouts = list(demand), []
+    sheet = None   # [índice de hoja, estantes [[y, alto, x libre]], y libre, colocaciones]
+    for w, h, rot, t in items:
+        orients = ((w, h, False), (h, w, True)) if rot and w != h else ((w, h, False),)
+        for _ in range(2):   # la hoja abierta y, si no cupo, una nueva
+            if sheet is not None:
+                W, H = usable[sheet[0]]
+                spot = next(((st, pw, ph, r) for st in sheet[1] for pw, ph, r in orients
+                             if ph <= st[1] and st[2] + pw <= W), None)
+                if spot is None:
+                    spot = next(((None, pw, ph, r) for pw, ph, r in orients
+                                 if pw <= W and sheet[2] + ph <= H), None)
+                if spot is not None:
+                    st, pw, ph, r = spot
+                    if st is None:
+                        st = [sheet[2], ph, 0]
+                        sheet[1].append(st)
+                        sheet[2] += ph
+                    sheet[3].append((st[2], st[0], pw, ph, t, r))
+                    st[2] += pw
+                    leftover[t] -= 1
+                    break
+                layouts.append((sheet[0], tuple(sheet[3]), 1))
+                sheet = None
+            i = next((i for i, (W, H) in enumerate(usable) if (stock[i] is None or stock[i] > 0)
+                      and any(pw <= W and ph <= H for pw, ph, _ in orients)), None)
+            if i is None:
+                break   # no cabe en ninguna hoja con stock: queda sin colocar
+            if stock[i] is not None:
+                stock[i] -= 1
+            sheet = [i, [], 0, []]
+    if sheet is not None:
+        layouts.append((sheet[0], tuple(sheet[3]), 1))
+    return layouts, leftover
+
+def _cost(layouts, leftover, sheets):
+    """(piezas sin colocar, área de hoja, hojas): menor es mejor."""
+    return (sum(leftover), sum(sheets[i]["ancho"] * sheets[i]["alto"] * reps for i, _, reps in layouts),
+            sum(reps for _, _, reps in layouts))
+
+def _prepare(pieces, kerf):
+    types, index, demand, refs = [], {}, [], []
+    for p in pieces:
+        key = (p["ancho"] + kerf, p["alto"] + kerf, p["rotable"])
+        if p["rotable"]:   # 1000x600 y 600x1000 rotables son el mismo tipo
+            key = (max(key[0], key[1]), min(key[0], key[1]), True)
+        t = index.get(key)
+        if t is None:
+            t = index[key] = len(types)
+            types.append(key)
+            demand.append(0)
+            refs.append([])
+        demand[t] += p["cantidad"]
+        refs[t].extend([p] * p["cantidad"])
+    return types, demand, refs
+
+def _bounds(types, demand, sheets, kerf, margin):
+    """(piezas que no caben en ninguna hoja, cota inferior del área de hoja del resto)."""
+    usable = [(s["ancho"] - 2 * margin + kerf, s["alto"] - 2 * margin + kerf, s["ancho"] * s["alto"])
+              for s in sheets if s["stock"] is None or s["stock"] > 0]
+    usable = [u for u in usable if u[0] > 0 and u[1] > 0]
+    unplaceable, area, min_sheet = 0, 0, None
+    for (w, h, rot), n in zip(types, demand):
+        fits = [A for W, H, A in usable if w <= W and h <= H or rot and h <= W and w <= H]
+        if not fits:
+            unplaceable += n
+            continue
+        area += w * h * n
+        min_sheet = min(fits + ([min_sheet] if min_sheet else []))
+    if not area:
+        return unplaceable, 0
+    # Ninguna hoja rinde más que su área útil, y cualquier plan usa al menos una hoja
+    ratio = max(W * H / A for W, H, A in usable)
+    return unplaceable, max(area / ratio, min_sheet)
+
+def _report(layouts, leftover, types, refs, sheets, kerf, margin, started, attempts, strategy):
+    queues = [deque(r) for r in refs]
+    out, sheet_area, piece_area, n_sheets = [], 0, 0, 0
+    for i, placed, reps in layouts:
+        s = sheets[i]
+        area = s["ancho"] * s["alto"]
+        used_area = sum((w - kerf) * (h - kerf) for _, _, w, h, _, _ in placed)
+        cortes = []
+        for x, y, w, h, t, rotated in sorted(placed, key=lambda p: (p[1], p[0])):
+            # Hoja repetida: en esta posición va una pieza (de la misma medida) por repetición
+            taken = [queues[t].popleft() for _ in range(reps) if queues[t]]
+            cortes.append({"x": x + margin, "y": y + margin, "ancho": w - kerf, "alto": h - kerf,
+                           "rotada": rotated, "refs": [p["ref"] for p in taken]})
+        out.append({"hoja": s["nombre"], "ancho": s["ancho"], "alto": s["alto"], "repeticiones": reps,
+                    "piezas": len(placed), "desperdicio_pct": round(100 * (1 - used_area / area), 2),
+                    "cortes": cortes})
+        sheet_area += area * reps
+        piece_area += used_area * reps
+        n_sheets += reps
+    sin_colocar = [{"ref": p["ref"], "ancho": p["ancho"], "alto": p["alto"]} for q in queues for p in q]
+    return {
+        "hojas": out,
+        "total_hojas": n_sheets,
+        "area_hojas_m2": round(sheet_area / 1e6, 3),
+        "area_piezas_m2": round(piece_area / 1e6, 3),
+        "desperdicio_pct": round(100 * (1 - piece_area / sheet_area), 2) if sheet_area else 0.0,
+        "sin_colocar": sin_colocar,
+        "estrategia": strategy,
+        "intentos": attempts,
+        "segundos": round(time.perf_counter() - started, 3),
+    }
+
+def plan(pieces, sheets=None, kerf=DEFAULT_KERF, margin=DEFAULT_MARGIN, time_budget=TIME_BUDGET, seed=0,
+         max_pieces=MAX_PIECES):
+    """Plan de corte para `pieces` en `sheets` (ver normalize_pieces / normalize_sheets)."""
+    started = time.perf_counter()
+    check_cut(kerf, margin)
+    pieces, sheets = normalize_pieces(pieces, max_pieces), normalize_sheets(sheets)
+    types, demand, refs = _prepare(pieces, kerf)
+    deadline = started + time_budget
+    strategies = [(sc, sp, None) for sc in SCORES for sp in SPLITS]
+    rng = random.Random(seed)
+    unplaceable, lower = _bounds(types, demand, sheets, kerf, margin)
+    if unplaceable == sum(demand):   # ninguna pieza cabe en las hojas con stock: no hay nada que buscar
+        return _report([], demand, types, refs, sheets, kerf, margin, started, 0, "sin hojas útiles")
+    layouts, leftover = _shelves(types, demand, sheets, kerf, margin)
+    best, attempts, stalled = (_cost(layouts, leftover, sheets), layouts, leftover, "estantes"), 1, 0
+    # Profundidad de la recursión ~ piezas por hoja
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 4 * sum(demand) + 1000))
+    try:
+        while True:
+            # Corta antes del plazo si ya no se puede mejorar (cota inferior, una sola hoja)
+            unplaced, area, n_sheets = best[0]
+            if unplaced <= unplaceable and (area <= lower or n_sheets == 1):
+                break
+            if strategies:
+                score, split, r = strategies.pop(0)
+                name = f"{score}/{split}"
+            else:   # con tiempo de sobra: órdenes aleatorios alrededor de los criterios
+                score, split, r = rng.choice(list(SCORES)), rng.choice(SPLITS), random.Random(rng.random())
+                name = f"{score}/{split}/aleatorio"
+            res = _solve(types, demand, sheets, kerf, margin, score, split, r, deadline)
+            if res is None:
+                break
+            attempts += 1
+            layouts, leftover = res
+            cost = _cost(layouts, leftover, sheets)
+            if cost < best[0]:
+                best, stalled = (cost, layouts, leftover, name), 0
+            else:
+                stalled += 1
+            if stalled >= STALL_ATTEMPTS or time.perf_counter() > deadline:
+                break
+    finally:
+        sys.setrecursionlimit(limit)
+    _, layouts, leftover, name = best
+    return _report(layouts, leftover, types, refs, sheets, kerf, margin, started, attempts, name)
+
+# ---------- referencia ingenua ----------
+def first_fit(pieces, sheets=None, kerf=DEFAULT_KERF, margin=DEFAULT_MARGIN):
+    """Estantes first-fit: piezas por alto descendente, primera hoja abierta donde quepan."""
+    started = time.perf_counter()
+    check_cut(kerf, margin)
+    pieces, sheets = normalize_pieces(pieces), normalize_sheets(sheets)
+    s = sheets[0]
+    W, H = s["ancho"] - 2 * margin + kerf, s["alto"] - 2 * margin + kerf
+    items = []
+    for p in pieces:
+        w, h = p["ancho"] + kerf, p["alto"] + kerf
+        if p["rotable"] and h > w and h <= W:
+            w, h = h, w   # acostada: estantes más bajos
+        items.extend([(w, h, p)] * p["cantidad"])
+    items.sort(key=lambda it: -it[1])
+    open_sheets = []   # [[estantes [[y, alto, x_libre]], y_libre, colocaciones]]
+    unplaced = []
+    for w, h, p in items:
+        if w > W or h > H:
+            unplaced.append(p)
+            continue
+        for sh in open_sheets:
+            shelf = next((st for st in sh[0] if st[1] >= h and st[2] + w <= W), None)
+            if shelf is None and sh[1] + h <= H:
+                shelf = [sh[1], h, 0]
+                sh[0].append(shelf)
+                sh[1] += h
+            if shelf is not None:
+                break
+        else:
+            sh = [[[0, h, 0]], h, []]
+            open_sheets.append(sh)
+            shelf = sh[0][0]
+        sh[2].append((shelf[2], shelf[0], w, h, p))
+        shelf[2] += w
+    area = s["ancho"] * s["alto"]
+    out, piece_area = [], 0
+    for _, _, placed in open_sheets:
+        used = sum((w - kerf) * (h - kerf) for _, _, w, h, _ in placed)
+        piece_area += used
+        out.append({"hoja": s["nombre"], "ancho": s["ancho"], "alto": s["alto"], "repeticiones": 1,
+                    "piezas": len(placed), "desperdicio_pct": round(100 * (1 - used / area), 2),
+                    "cortes": [{"x": x + margin, "y": y + margin, "ancho": w - kerf, "alto": h - kerf,
+                                "rotada": False, "refs": [p["ref"]]} for x, y, w, h, p in placed]})
+    sheet_area = area * len(open_sheets)
+    return {"hojas": out, "total_hojas": len(open_sheets), "area_hojas_m2": round(sheet_area / 1e6, 3),
+            "area_piezas_m2": round(piece_area / 1e6, 3),
+            "desperdicio_pct": round(100 * (1 - piece_area / sheet_area), 2) if sheet_area else 0.0,
+            "sin_colocar": [{"ref": p["ref"], "ancho": p["ancho"], "alto": p["alto"]} for p in unplaced],
+            "estrategia": "first-fit", "intentos": 1, "segundos": round(time.perf_counter() - started, 3)}
+
+def validate(result, kerf=DEFAULT_KERF):
+    """Errores de un plan (solapes o piezas fuera de la hoja); lista vacía si es válido."""
+    errors = []
+    for n, hoja in enumerate(result["hojas"]):
+        rects = [(c["x"], c["y"], c["x"] + c["ancho"] + kerf, c["y"] + c["alto"] + kerf) for c in hoja["cortes"]]
+        for i, (x1, y1, x2, y2) in enumerate(rects):
+            if x1 < 0 or y1 < 0 or x2 - kerf > hoja["ancho"] or y2 - kerf > hoja["alto"]:
+                errors.append(f"hoja {n}: corte {i} fuera de la hoja")
+            for j in range(i):
+                a1, b1, a2, b2 = rects[j]
+                if x1 < a2 and a1 < x2 and y1 < b2 and b1 < y2:
+                    errors.append(f"hoja {n}: cortes {j} y {i} se enciman")
+    return errors
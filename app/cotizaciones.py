@@ -0,0 +1,241 @@
+# app/cotizaciones.py
+# Motor de precios de Cotizaciones.
+#
+# Las tablas de precios (app/repo/precios.py) se cargan una vez por proceso en estructuras
+# compactas: (tipo, espesor) -> índice en arreglos de precio por m² y área mínima, y
+# clave de cargo -> (unidad, precio). Cada cotización hace UNA consulta (precios_version)
+# y solo recarga si alguien editó precios; la versión vive en la BD, así que una edición
+# invalida la caché de todos los workers.
+#
+# quote() valúa todas las líneas en una pasada:
+#   - las medidas que vienen de fotos (foto_id) se leen de anotaciones_json en una sola
+#     consulta para toda la cotización (mediciones.fotos_dims),
+#   - las líneas con la misma medida, vidrio y cargos se valúan una sola vez,
+#   - los importes van en centavos enteros; el precio unitario se redondea al centavo y se
+#     multiplica por la cantidad, como en una cotización a mano.
+#
+# Línea: {"ref", "ancho", "alto" (mm, o texto como en las etiquetas: "120 cm"), o "foto_id",
+#         "cantidad", "vidrio", "espesor", "cargos": ["canto_pulido", "instalacion"]}.
+# vidrio, espesor y cargos pueden darse una vez para toda la cotización (defaults).
+# Cargos por unidad: ml = perímetro de la pieza, m2 = área, pieza = fijo.
+import math, threading
+from array import array
+
+from app.repo import precios
+from app.mediciones import parse_mm, fotos_dims
+
+UNITS = ("ml", "m2", "pieza")
+REGLAS = {"iva": 0.16, "redondeo_mm": 0}   # claves válidas y valor si falta la fila
+MAX_LINES = 5000
+
+class CotizacionError(ValueError):
+    """Cotización o tabla de precios inválida; `errores` = [{"linea": n, "error": ...}]."""
+    def __init__(self, message, errores=None):
+        super().__init__(message)
+        self.errores = errores or []
+
+def cents(value):
+    return int(round(float(value) * 100))
+
+def money(c):
+    return c / 100
+
+def _div(a, b):
+    """a / b al entero más cercano (mitades hacia arriba), para enteros no negativos."""
+    return (2 * a + b) // (2 * b)
+
+def _glass_key(tipo, espesor):
+    return str(tipo).strip().lower(), float(espesor)
+
+# ---------- tablas en memoria ----------
+class Tables:
+    __slots__ = ("version", "glass", "glass_price", "glass_min", "charges", "iva", "redondeo")
+
+    def __init__(self, version, vidrios, cargos, reglas):
+        self.version = version
+        self.glass = {}                  # (tipo, espesor) -> índice
+        self.glass_price = array("q")    # centavos por m²
+        self.glass_min = array("q")      # mm² mínimos cobrables por pieza
+        for v in vidrios:
+            self.glass[_glass_key(v["tipo"], v["espesor_mm"])] = len(self.glass_price)
+            self.glass_price.append(cents(v["precio_m2"]))
+            self.glass_min.append(round(float(v["minimo_m2"] or 0) * 1_000_000))
+        self.charges = {c["clave"]: (UNITS.index(c["unidad"]), cents(c["precio"])) for c in cargos}
+        rules = dict(REGLAS, **{r["clave"]: r["valor"] for r in reglas})
+        self.iva = float(rules["iva"])
+        self.redondeo = int(rules["redondeo_mm"] or 0)
+
+_cache = {"tables": None}
+_lock = threading.Lock()
+
+def tables(db):
+    """Tablas vigentes. Una consulta (la versión); recarga solo si cambiaron."""
+    version = precios.version(db)
+    current = _cache["tables"]
+    if current is not None and current.version == version:
+        return current
+    with _lock:   # gthread: un solo hilo recarga
+        current = _cache["tables"]
+        if current is None or current.version != version:
+            current = _cache["tables"] = Tables(*precios.load(db))
+    return current
+
+# ---------- cotización ----------
+def _mm(value, what):
+    mm = parse_mm(value) if isinstance(value, str) else value
+    try:
+        mm = float(mm)
+    except (TypeError, ValueError):
+        raise CotizacionError(f"{what} inválido")
+    if not mm > 0:
+        raise CotizacionError(f"{what} debe ser positivo")
+    return mm
+
+def _round_up(mm, step):
+    mm = math.ceil(round(mm, 3))
+    return -(-mm // step) * step if step > 1 else mm
+
+def _line(raw, defaults, t, dims, dim_errors):
+    """(ref, foto_id, ancho, alto, cantidad, índice de vidrio, cargos) de una línea."""
+    if not isinstance(raw, dict):
+        raise CotizacionError("se espera un objeto")
+    fid = raw.get("foto_id")
+    if raw.get("ancho") is None and raw.get("alto") is None and fid is not None:
+        if fid in dim_errors:
+            raise CotizacionError(f"foto {fid}: {dim_errors[fid]}")
+        if fid not in dims:
+            raise CotizacionError("foto_id inválido")
+        w, h = dims[fid]["ancho"], dims[fid]["alto"]
+        ref = raw.get("ref") or f"foto {fid}: {dims[fid]['nombre']}"
+    else:
+        w, h = _mm(raw.get("ancho"), "ancho"), _mm(raw.get("alto"), "alto")
+        ref = raw.get("ref") or ""
+    try:
+        qty = int(raw.get("cantidad", 1))
+    except (TypeError, ValueError):
+        raise CotizacionError("cantidad inválida")
+    if qty < 1:
+        raise CotizacionError("la cantidad debe ser al menos 1")
+    tipo, espesor = raw.get("vidrio", defaults.get("vidrio")), raw.get("espesor", defaults.get("espesor"))
+    if tipo is None or espesor is None:
+        raise CotizacionError("falta vidrio o espesor")
+    try:
+        gi = t.glass[_glass_key(tipo, espesor)]
+    except (KeyError, TypeError, ValueError):
+        raise CotizacionError(f"sin precio para vidrio {tipo!r} de {espesor} mm")
+    claves = raw.get("cargos", defaults.get("cargos")) or ()
+    if isinstance(claves, str) or not all(isinstance(c, str) for c in claves):
+        raise CotizacionError("cargos debe ser una lista de claves")
+    unknown = [c for c in claves if c not in t.charges]
+    if unknown:
+        raise CotizacionError(f"cargo desconocido: {', '.join(unknown)}")
+    return ref, fid, _round_up(w, t.redondeo), _round_up(h, t.redondeo), qty, gi, tuple(claves)
+
+def quote(db, lineas, defaults=None):
+    """Valúa una cotización completa. Lanza CotizacionError con todos los errores por línea."""
+    if not isinstance(lineas, list) or not lineas:
+        raise CotizacionError("La cotización no tiene líneas.")
+    if len(lineas) > MAX_LINES:
+        raise CotizacionError(f"Máximo {MAX_LINES} líneas por cotización.")
+    defaults = defaults if isinstance(defaults, dict) else {}
+    t = tables(db)
+
+    foto_ids = [l["foto_id"] for l in lineas if isinstance(l, dict) and isinstance(l.get("foto_id"), int)
+                and l.get("ancho") is None and l.get("alto") is None]
+    dims, dim_errors = fotos_dims(db, foto_ids) if foto_ids else ({}, {})
+
+    parsed, errores = [], []
+    for n, raw in enumerate(lineas, 1):
+        try:
+            parsed.append(_line(raw, defaults, t, dims, dim_errors))
+        except CotizacionError as e:
+            errores.append({"linea": n, "error": str(e)})
+    if errores:
+        raise CotizacionError(f"{len(errores)} línea(s) con errores.", errores)
+
+    priced = {}   # (ancho, alto, vidrio, cargos) -> (área, área cobrada, vidrio, {cargo: importe})
+    out, subtotal, pieces, area_total = [], 0, 0, 0
+    for n, (ref, fid, w, h, qty, gi, claves) in enumerate(parsed, 1):
+        key = (w, h, gi, claves)
+        p = priced.get(key)
+        if p is None:
+            area = w * h
+            billed = max(area, t.glass_min[gi])
+            perimeter = 2 * (w + h)
+            charges = {}
+            for c in claves:
+                unit, price = t.charges[c]
+                charges[c] = (_div(price * perimeter, 1000) if unit == 0 else
+                              _div(price * area, 1_000_000) if unit == 1 else price)
+            p = priced[key] = (area, billed, _div(t.glass_price[gi] * billed, 1_000_000), charges)
+        area, billed, glass, charges = p
+        unit_price = glass + sum(charges.values())
+        subtotal += unit_price * qty
+        pieces += qty
+        area_total += area * qty
+        out.append({"linea": n, "ref": ref, "foto_id": fid, "ancho": w, "alto": h, "cantidad": qty,
+                    "m2": round(area / 1e6, 4), "m2_cobrados": round(billed / 1e6, 4),
+                    "vidrio": money(glass), "cargos": {c: money(v) for c, v in charges.items()},
+                    "unitario": money(unit_price), "importe": money(unit_price * qty)})
+    iva = _div(subtotal * round(t.iva * 10_000), 10_000)
+    return {"lineas": out, "piezas": pieces, "m2": round(area_total / 1e6, 4),
+            "subtotal": money(subtotal), "iva": money(iva), "total": money(subtotal + iva),
+            "tasa_iva": t.iva, "version_precios": t.version, "distintas": len(priced)}
+
+# ---------- edición de precios ----------
+def _price(value, what):
+    if value is None:
+        return None   # borra la entrada
+    try:
+        value = round(float(value), 2)
+    except (TypeError, ValueError):
+        raise CotizacionError(f"{what}: precio inválido")
+    if value < 0:
+        raise CotizacionError(f"{what}: el precio no puede ser negativo")
+    return value
+
+def normalize_precios(data):
+    """Valida {"vidrios": [...], "cargos": [...], "reglas": {...}} -> (vidrios, cargos, reglas)."""
+    if not isinstance(data, dict):
+        raise CotizacionError("Se espera un objeto con vidrios, cargos y/o reglas.")
+    vidrios, cargos = [], []
+    try:
+        for v in data.get("vidrios") or []:
+            tipo, espesor = str(v["tipo"]).strip().lower(), float(v["espesor"])
+            if not tipo or espesor <= 0:
+                raise CotizacionError(f"vidrio inválido: {v!r}")
+            vidrios.append({"tipo": tipo, "espesor_mm": espesor,
+                            "precio_m2": _price(v.get("precio_m2"), f"{tipo} {espesor:g} mm"),
+                            "minimo_m2": None if v.get("minimo_m2") is None else float(v["minimo_m2"])})
+        for c in data.get("cargos") or []:
+            clave = str(c["clave"]).strip()
+            price = _price(c.get("precio"), clave)
+            if not clave or (price is not None and c.get("unidad") not in UNITS):
+                raise CotizacionError(f"cargo {clave!r}: unidad debe ser {', '.join(UNITS)}")
+            cargos.append({"clave": clave, "descripcion": c.get("descripcion"), "unidad": c.get("unidad"),
+                           "precio": price})
+        reglas = {k: float(v) for k, v in (data.get("reglas") or {}).items()}
+    except CotizacionError:
+        raise
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise CotizacionError("Formato de precios inválido.")
+    unknown = set(reglas) - set(REGLAS)
+    if unknown:
+        raise CotizacionError(f"reglas desconocidas: {', '.join(sorted(unknown))} (hay: {', '.join(REGLAS)})")
+    return vidrios, cargos, reglas
+
+def save_precios(db, data):
+    """Aplica cambios de precios y devuelve la nueva versión.
+
+    Precio null borra la entrada; minimo_m2 y descripcion omitidos conservan el valor actual.
+    """
+    return precios.save(db, *normalize_precios(data))
+
+def precios_json(db):
+    version, vidrios, cargos, reglas = precios.load(db)
+    return {"version": version,
+            "vidrios": [{"tipo": v["tipo"], "espesor": v["espesor_mm"], "precio_m2": float(v["precio_m2"]),
+                         "minimo_m2": v["minimo_m2"]} for v in vidrios],
+            "cargos": [{"clave": c["clave"], "descripcion": c["descripcion"], "unidad": c["unidad"],
+                        "precio": float(c["precio"])} for c in cargos],
+            "reglas": dict(REGLAS, **{r["clave"]: r["valor"] for r in reglas})}
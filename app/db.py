@@ -1,7 +1,10 @@
 # app/db.py
-import os
+import os, time
 from contextlib import contextmanager
-from sqlalchemy import create_engine, text
+from flask import g, has_request_context
+from sqlalchemy import create_engine
+
+from app.metrics import observe_checkout
 
 # Usa DATABASE_URL si existe; si no, cae a SQLite local para desarrollo.
 DATABASE_URL = os.environ.get("DATABASE_URL")
@@ -9,59 +12,82 @@ if not DATABASE_URL:
     base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     DATABASE_URL = f"sqlite:///{os.path.join(base, 'vidrio.db')}"
 
+# Pool: cada petición toma a lo sumo UNA conexión (ver get_conn), así que
+# pool_size ~ hilos por worker de gunicorn (gunicorn.conf.py lo fija a GUNICORN_THREADS).
+# Los trabajos encolados o ejecutados inline desde una vista también usan esa conexión
+# (get_db); el overflow queda para procesos fuera de petición.
+POOL_OPTS = {} if DATABASE_URL.startswith("sqlite") else {
+    "pool_size":     int(os.environ.get("DB_POOL_SIZE", 5)),
+    "max_overflow":  int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+    "pool_recycle":  int(os.environ.get("DB_POOL_RECYCLE", 1800)),   # s; < idle timeout del proxy/PG
+    "pool_timeout":  int(os.environ.get("DB_POOL_TIMEOUT", 10)),     # s esperando conexión libre
+}
+
 # Render/psycopg: pool preconfigurado
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
     future=True,
+    **POOL_OPTS,
 )
 
-@contextmanager
-def get_db():
-    """Yield a connection with BEGIN/COMMIT/ROLLBACK automáticamente."""
-    with engine.begin() as conn:
-        yield conn
+# ---------- conexión por petición ----------
+def get_conn():
+    """Conexión de la petición actual.
 
-SCHEMA_SQL = """
-CREATE TABLE IF NOT EXISTS users (
-  id SERIAL PRIMARY KEY,
-  email TEXT UNIQUE NOT NULL,
-  password_hash TEXT NOT NULL,
-  first_name TEXT NOT NULL,
-  last_name  TEXT NOT NULL,
-  address TEXT,
-  phone TEXT UNIQUE,
-  company TEXT,
-  created_at TEXT NOT NULL
-);
-CREATE TABLE IF NOT EXISTS medidas (
-  id SERIAL PRIMARY KEY,
-  nombre TEXT NOT NULL,
-  unidad TEXT NOT NULL,
-  descripcion TEXT,
-  creado_por TEXT NOT NULL,
-  created_at TIMESTAMP NOT NULL
-);
+    Se toma del pool en el primer uso (las peticiones que no tocan la BD no consumen
+    conexión), se hace COMMIT al terminar la vista (after_request) y se devuelve al
+    pool en el teardown. Solo para código que corre dentro de una petición.
+    """
+    if "db_conn" not in g:
+        t0 = time.perf_counter()
+        g.db_conn = engine.connect()
+        observe_checkout(time.perf_counter() - t0)   # espera del pool (/__metrics)
+    return g.db_conn
 
-CREATE TABLE IF NOT EXISTS fotos (
-  id SERIAL PRIMARY KEY,
-  nombre TEXT NOT NULL,
-  creado_por TEXT NOT NULL,
-  created_at TIMESTAMP NOT NULL,
-  original_png BYTEA,     -- imagen original (PNG)
-  anotada_png BYTEA,      -- imagen con anotaciones (PNG)
-  anotaciones_json TEXT   -- lista de anotaciones (JSON)
-);
+def _commit_request(response):
+    conn = g.get("db_conn")
+    if conn is not None and conn.in_transaction():
+        # Aquí (y no en el teardown) un error de COMMIT todavía se convierte en 500
+        if response.status_code < 400:
+            conn.commit()
+        else:
+            conn.rollback()
+    return response
 
-"""
+def _release_request(exc=None):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        conn.close()   # ROLLBACK de lo pendiente (p. ej. si la vista lanzó) y vuelta al pool
 
-def init_app_db(app):
-    # Crear tablas si no existen
-    with engine.begin() as conn:
-        for stmt in filter(None, SCHEMA_SQL.split(";")):
-            s = stmt.strip()
-            if s:
-                conn.execute(text(s))
-                
+@contextmanager
+def get_db():
+    """Yield a connection with BEGIN/COMMIT/ROLLBACK automáticamente.
 
+    Dentro de una petición reutiliza la conexión de get_conn(): el COMMIT ocurre al salir
+    del bloque (el código que va después, p. ej. la GC de blobs, ve los cambios), pero sin
+    otro checkout del pool. Fuera de una petición (CLI, worker) abre su propia transacción.
+    """
+    if not has_request_context():
+        with engine.begin() as conn:
+            yield conn
+        return
+    conn = get_conn()
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
 
+def _check_schema():
+    # El esquema se migra en el deploy (flask --app main db upgrade); aquí solo se verifica,
+    # una vez por proceso. No al importar: la CLI (db upgrade) tiene que poder cargar la app
+    # con el esquema atrasado. Ver app/migrations.py.
+    from app.migrations import ensure_schema
+    ensure_schema()
+
+def init_app_db(app):
+    app.before_request(_check_schema)
+    app.after_request(_commit_request)
+    app.teardown_appcontext(_release_request)
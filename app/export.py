@@ -0,0 +1,200 @@
+# app/export.py
+# Exportación masiva de fotos + anotaciones en streaming.
+#
+#   ZIP:    fotos/<id>-<nombre>/original.<ext>, anotada.<ext>
+#           manifest.ndjson   una línea JSON por foto (metadatos + anotaciones)
+#           mediciones.csv    una fila por medida (app/mediciones.py)
+#   NDJSON: solo el manifiesto, línea por línea
+#
+# Memoria constante sin importar cuántas fotos: las filas se leen con cursor del lado del
+# servidor (stream_results), las imágenes se copian al ZIP por bloques y el ZIP se escribe
+# sobre un flujo no posicionable (zipfile usa data descriptors) que se vacía en cada yield.
+# El manifiesto y el CSV se acumulan en archivos temporales y van al final del ZIP.
+import csv, json, shutil, tempfile, zipfile
+from datetime import datetime, date, time as dtime
+from sqlalchemy import text
+
+from app.db import engine
+from app.blobstore import get_store, foto_bytes
+from app.render import parse_annotations, render_foto, foto_annotated
+from app.mediciones import rows_from_shapes
+from app.search import match_expr, normalize
+from app.transcode import sniff_mime
+
+VARIANTS  = ("original", "anotada")
+CHUNK     = 256 * 1024
+YIELD_PER = 200   # filas por viaje del cursor del lado del servidor
+EXTENSIONS = {"image/webp": "webp", "image/jpeg": "jpg", "image/png": "png"}
+
+# ---------- filtros ----------
+def _as_datetime(v, end=False):
+    if v is None or isinstance(v, datetime):
+        return v
+    if not isinstance(v, date):
+        v = date.fromisoformat(str(v))
+    return datetime.combine(v, dtime.max if end else dtime.min)
+
+def _query(conn, desde=None, hasta=None, usuario=None, q=None):
+    """SELECT de fotos según filtros (rango de fechas inclusivo, usuario exacto, búsqueda)."""
+    where, params, join = [], {}, ""
+    if desde:
+        where.append("f.created_at >= :desde"); params["desde"] = _as_datetime(desde)
+    if hasta:
+        where.append("f.created_at <= :hasta"); params["hasta"] = _as_datetime(hasta, end=True)
+    if usuario:
+        where.append("f.creado_por = :usuario"); params["usuario"] = usuario
+    match = match_expr(conn, q) if q else None
+    if match:
+        if conn.dialect.name == "postgresql":
+            join = "JOIN fotos_search s ON s.foto_id = f.id"
+            where.append("s.doc @@ to_tsquery('simple', :match)")
+        else:
+            join = "JOIN fotos_search s ON s.rowid = f.id"
+            where.append("fotos_search MATCH :match")
+        params["match"] = match
+    sql = f"""
+      SELECT f.id, f.nombre, f.creado_por, f.created_at, f.anotaciones_json,
+             f.original_sha256, f.original_png IS NOT NULL AS original_legacy,
+             f.anotada_sha256, f.anotada_png IS NOT NULL AS anotada_legacy
+      FROM fotos f {join}
+      {"WHERE " + " AND ".join(where) if where else ""}
+      ORDER BY f.id
+    """
+    return text(sql), params
+
+def iter_fotos(conn, **filters):
+    """Filas de fotos en streaming (cursor del lado del servidor en Postgres)."""
+    stmt, params = _query(conn, **filters)
+    result = conn.execution_options(stream_results=True, yield_per=YIELD_PER).execute(stmt, params)
+    for row in result.mappings():
+        yield row
+
+# ---------- manifiesto ----------
+def _shapes(row):
+    try:
+        return parse_annotations(row["anotaciones_json"]) if row["anotaciones_json"] else []
+    except (ValueError, KeyError, TypeError):
+        return []
+
+def manifest_entry(row, files=None):
+    return {"id": row["id"], "nombre": row["nombre"], "creado_por": row["creado_por"],
+            "created_at": str(row["created_at"]), "anotaciones": _shapes(row),
+            **({"archivos": files} if files is not None else {})}
+
+def ndjson_stream(**filters):
+    """Generador de bytes: una línea JSON por foto."""
+    with engine.connect() as conn:
+        for row in iter_fotos(conn, **filters):
+            yield (json.dumps(manifest_entry(row), ensure_ascii=False) + "\n").encode()
+
+# ---------- ZIP ----------
+class _Sink:
+    """Destino no posicionable para zipfile: guarda lo escrito hasta el siguiente drain()."""
+    def __init__(self):
+        self._chunks = []
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+    def flush(self):
+        pass
+    def drain(self):
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+def _slug(s):
+    return normalize(s).replace(" ", "-")[:60] or "foto"
+
+def _zip_time(ts):
+    try:
+        ts = ts if isinstance(ts, datetime) else datetime.fromisoformat(str(ts))
+        return ts.timetuple()[:6] if ts.year >= 1980 else (1980, 1, 1, 0, 0, 0)
+    except ValueError:
+        return (1980, 1, 1, 0, 0, 0)
+
+def _image_source(db, row, variant):
+    """(ruta | bytes, mime) de una variante, o None si no existe."""
+    store = get_store()
+    if variant == "anotada":
+        found = foto_annotated(db, row["id"])
+        if found:   # render desde anotaciones_json (de la caché si ya estaba)
+            data = render_foto(db, row["id"], *found)
+            return (data, sniff_mime(data[:12])) if data else None
+    if row[f"{variant}_legacy"]:
+        data = bytes(foto_bytes(db, row["id"], variant))
+        return data, sniff_mime(data[:12])
+    sha = row[f"{variant}_sha256"]
+    if not sha:
+        return None
+    path = store.path(sha)
+    if path:
+        try:
+            with open(path, "rb") as f:
+                return path, sniff_mime(f.read(12))
+        except FileNotFoundError:
+            return None
+    try:
+        data = store.get(sha)
+    except FileNotFoundError:
+        return None
+    return data, sniff_mime(data[:12])
+
+def zip_stream(variants=VARIANTS, **filters):
+    """Generador de bytes de un ZIP con imágenes, manifest.ndjson y mediciones.csv."""
+    sink = _Sink()
+    manifest = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    csv_buf = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024, mode="w+", newline="", encoding="utf-8")
+    writer = csv.writer(csv_buf)
+    writer.writerow(["foto_id", "nombre", "creado_por", "idx", "label", "length_px", "length_mm", "mm_per_px"])
+
+    # Dos conexiones: una sostiene el cursor en streaming, la otra lee blobs heredados/render
+    with engine.connect() as rows_conn, engine.connect() as db, \
+         zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for row in iter_fotos(rows_conn, **filters):
+            folder = f"fotos/{row['id']:06d}-{_slug(row['nombre'])}"
+            files = {}
+            for variant in variants:
+                src = _image_source(db, row, variant)
+                if not src:
+                    continue
+                data, mime = src
+                name = f"{folder}/{variant}.{EXTENSIONS.get(mime, 'bin')}"
+                info = zipfile.ZipInfo(name, date_time=_zip_time(row["created_at"]))
+                info.compress_type = zipfile.ZIP_STORED   # WebP/JPEG ya vienen comprimidos
+                with zf.open(info, "w", force_zip64=True) as out:
+                    if isinstance(data, str):
+                        with open(data, "rb") as f:
+                            while True:
+                                chunk = f.read(CHUNK)
+                                if not chunk:
+                                    break
+                                out.write(chunk)
+                                yield sink.drain()
+                    else:
+                        out.write(data)
+                files[variant] = name
+                yield sink.drain()
+
+            entry = manifest_entry(row, files)
+            manifest.write((json.dumps(entry, ensure_ascii=False) + "\n").encode())
+            for m in rows_from_shapes(entry["anotaciones"]):
+                writer.writerow([row["id"], row["nombre"], row["creado_por"], m["idx"], m["label"],
+                                 m["length_px"], m["length_mm"], m["mm_per_px"]])
+
+        for name, src, binary in (("manifest.ndjson", manifest, True), ("mediciones.csv", csv_buf, False)):
+            src.seek(0)
+            info = zipfile.ZipInfo(name, date_time=datetime.utcnow().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with zf.open(info, "w", force_zip64=True) as out:
+                if binary:
+                    shutil.copyfileobj(src, out, CHUNK)
+                else:
+                    while True:
+                        chunk = src.read(CHUNK)
+                        if not chunk:
+                            break
+                        out.write(chunk.encode("utf-8"))
+            yield sink.drain()
+    manifest.close()
+    csv_buf.close()
+    yield sink.drain()   # directorio central (lo escribe zf.close())
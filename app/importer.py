@@ -0,0 +1,154 @@
+# app/importer.py
+# Importación en lote de fotos (capturas hechas sin conexión).
+#
+# Entradas aceptadas:
+#   - ZIP con imágenes. Anotaciones opcionales por imagen en un JSON hermano
+#     (foto1.jpg + foto1.json) o en un manifest.ndjson como el que genera app/export.py
+#     ({"nombre", "anotaciones", "archivos": {"original": "<ruta en el zip>"}}).
+#     El JSON hermano puede ser la lista de anotaciones o {"nombre", "anotaciones"}.
+#   - Varios archivos multipart (`fotos`) + un campo `anotaciones` opcional con un
+#     objeto JSON {nombre_de_archivo: lista | {"nombre", "anotaciones"}}.
+#
+# Las entradas se procesan una a una (solo una imagen en memoria a la vez) y las filas se
+# escriben cada IMPORT_BATCH con un INSERT multi-VALUES, en transacciones de tamaño acotado.
+# Transcodificar/miniaturas corre después en la cola (medidas.process_upload), igual
+# que en una captura normal. Cada entrada reporta su resultado por separado.
+import json, os, posixpath, zipfile, zlib
+from datetime import datetime
+
+from app.db import get_db
+from app.blobstore import get_store
+from app.repo import fotos as fotos_repo
+from app.render import parse_annotations, dump_annotations
+from app.search import index_many
+from app.mediciones import add_fotos
+from app.jobs import enqueue_many
+from app.uploads import read_image, UploadError, MAX_IMAGE_BYTES
+
+IMPORT_BATCH     = int(os.environ.get("IMPORT_BATCH", 50))
+IMPORT_MAX_ITEMS = int(os.environ.get("IMPORT_MAX_ITEMS", 1000))
+IMAGE_EXTS       = {".jpg", ".jpeg", ".png", ".webp"}
+
+class BatchImportError(Exception):
+    """Error de la importación completa (no de una entrada)."""
+
+def _meta(raw, default_name):
+    """(nombre, shapes) a partir de una lista de anotaciones o {"nombre", "anotaciones"}."""
+    if isinstance(raw, (str, bytes)):
+        raw = json.loads(raw)
+    if isinstance(raw, dict):
+        return (str(raw.get("nombre") or default_name)[:200], parse_annotations(raw.get("anotaciones")))
+    return default_name, parse_annotations(raw)
+
+def _stem(name):
+    return posixpath.splitext(posixpath.basename(name))[0] or "foto"
+
+# ---------- fuentes ----------
+def zip_items(fileobj):
+    """Entradas (archivo, leer(), meta(), nombre por defecto) de un ZIP. meta() da None o JSON."""
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise BatchImportError("El archivo no es un ZIP válido.")
+    names = {i.filename: i for i in zf.infolist() if not i.is_dir()}
+    manifest = {}
+    if "manifest.ndjson" in names:
+        with zf.open("manifest.ndjson") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    path = (entry.get("archivos") or {}).get("original")
+                except (ValueError, AttributeError):
+                    raise BatchImportError(f"manifest.ndjson, línea {n}: se espera un objeto JSON por línea.")
+                if path:
+                    manifest[path] = entry
+    for name, info in names.items():
+        base, ext = posixpath.splitext(name)
+        if ext.lower() not in IMAGE_EXTS or posixpath.basename(name).startswith("."):
+            continue
+        if name.endswith(tuple(f"/anotada{e}" for e in IMAGE_EXTS)):
+            continue   # la versión anotada de una exportación se regenera desde las anotaciones
+        def meta(name=name, sidecar=base + ".json"):
+            if name in manifest:
+                return manifest[name]
+            if sidecar in names:
+                with zf.open(sidecar) as f:
+                    return json.load(f)
+            return None
+
+        def read(info=info):
+            if info.file_size > MAX_IMAGE_BYTES:   # antes de descomprimir (zip bomb)
+                raise UploadError("La imagen excede el tamaño máximo.", 413)
+            with zf.open(info) as f:
+                return read_image(f)
+        yield name, read, meta, _stem(name)
+
+def files_items(files, anotaciones=None):
+    """Entradas desde archivos multipart (werkzeug FileStorage) + JSON {archivo: meta}."""
+    try:
+        by_name = json.loads(anotaciones) if anotaciones else {}
+    except ValueError:
+        raise BatchImportError("`anotaciones` no es JSON válido.")
+    if not isinstance(by_name, dict):
+        raise BatchImportError("`anotaciones` debe ser un objeto {archivo: anotaciones}.")
+    for f in files:
+        yield (f.filename, (lambda f=f: read_image(f.stream)), (lambda f=f: by_name.get(f.filename)),
+               _stem(f.filename))
+
+# ---------- importación ----------
+def import_items(items, creado_por, batch=IMPORT_BATCH):
+    """Importa las entradas; devuelve una lista [{archivo, ok, foto_id | error}] en el mismo orden."""
+    store = get_store()
+    results, pending = [], []
+
+    def flush():
+        if not pending:
+            return
+        now = datetime.utcnow()
+        for p in pending:
+            p["row"]["created_at"] = now
+        with get_db() as db:
+            ids = fotos_repo.insert_many(db, [p["row"] for p in pending])
+            for p, fid in zip(pending, ids):
+                p["result"].update(ok=True, foto_id=fid)
+            index_many(db, [(fid, p["row"]["nombre"], creado_por, p["row"]["anotaciones_json"])
+                            for p, fid in zip(pending, ids)])
+            add_fotos(db, [(fid, creado_por, now, p["shapes"]) for p, fid in zip(pending, ids)])
+        # Después del commit (igual que new_post): el worker debe ver las filas
+        jobs = enqueue_many("medidas.process_upload",
+                            [({"fid": fid, "raw_sha": p["row"]["sha"]}, f"process_upload:{fid}:{p['row']['sha']}")
+                             for p, fid in zip(pending, ids)], owner=creado_por)
+        for p, jid in zip(pending, jobs):
+            p["result"]["job"] = jid
+        pending.clear()
+
+    for n, (archivo, read, meta, default_name) in enumerate(items):
+        result = {"archivo": archivo}
+        results.append(result)
+        if n >= IMPORT_MAX_ITEMS:
+            result.update(ok=False, error=f"Máximo {IMPORT_MAX_ITEMS} fotos por importación.")
+            continue
+        try:
+            raw = meta()
+            nombre, shapes = _meta(raw, default_name) if raw is not None else (default_name, [])
+        except (ValueError, KeyError, TypeError):
+            result.update(ok=False, error="Anotaciones inválidas.")
+            continue
+        try:
+            data = read()
+        except UploadError as e:
+            result.update(ok=False, error=str(e))
+            continue
+        except (zipfile.BadZipFile, EOFError, zlib.error):
+            result.update(ok=False, error="Entrada dañada en el ZIP.")
+            continue
+        sha, size = store.put(data)
+        pending.append({"result": result, "shapes": shapes,
+                        "row": {"nombre": nombre, "creado_por": creado_por, "sha": sha, "size": size,
+                                "anotaciones_json": dump_annotations(shapes) if shapes else None}})
+        if len(pending) >= batch:
+            flush()
+    flush()
+    return results
@@ -0,0 +1,245 @@
+# app/jobs.py
+# Cola de trabajos en la misma base de datos (sin broker externo).
+# El trabajo pesado de imágenes (transcodificar, renderizar, miniaturas) se encola desde
+# la petición y lo ejecuta:
+#
+#   - un hilo dentro de cada worker de gunicorn (JOBS_IN_WEB=1, default; gunicorn.conf.py
+#     post_worker_init). Es lo que corre en Render: el blobstore está en un disco que solo
+#     monta el servicio web, así que un proceso worker aparte no podría leer las imágenes.
+#   - o un pool aparte, solo si comparte el almacenamiento de blobs con el servicio web:
+#       flask --app main jobs worker --processes 2      (con JOBS_IN_WEB=0 en el web)
+#
+# - Reintentos con espera exponencial hasta max_attempts.
+# - idem_key: encolar dos veces la misma llave devuelve el mismo trabajo.
+# - Un trabajo "running" cuyo worker murió se recupera tras JOB_TIMEOUT.
+# - Con JOBS_INLINE=1 (default en desarrollo con SQLite) se ejecuta en la misma petición;
+#   los trabajos con `delay` (GC de blobs) igual los toma el hilo de JOBS_IN_WEB.
+# - Dentro de una petición todo (encolar, consultar, ejecutar inline) usa la conexión de la
+#   petición vía get_db(): un solo checkout del pool por petición.
+import os, json, time, uuid, signal, socket, threading, traceback, multiprocessing
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import text, bindparam
+
+from app.db import engine, get_db, DATABASE_URL
+
+# Mismo criterio que migrations.AUTO_MIGRATE: SQLite = desarrollo, sin proceso worker
+JOBS_INLINE   = os.environ.get("JOBS_INLINE", "1" if DATABASE_URL.startswith("sqlite") else "0") == "1"
+JOBS_IN_WEB   = os.environ.get("JOBS_IN_WEB", "1") == "1"
+JOB_TIMEOUT   = int(os.environ.get("JOB_TIMEOUT", 300))     # s antes de considerar muerto a un worker
+POLL_INTERVAL = float(os.environ.get("JOB_POLL", 1.0))
+MAX_ATTEMPTS  = 5
+
+TASKS = {}
+
+def task(kind):
+    """Registra una función como tipo de trabajo. Recibe el payload como kwargs."""
+    def deco(fn):
+        TASKS[kind] = fn
+        return fn
+    return deco
+
+# ---------- encolar / consultar ----------
+def enqueue(kind, payload, idem_key=None, owner=None, delay=0, max_attempts=MAX_ATTEMPTS):
+    """Encola un trabajo y devuelve su id. Con idem_key repetida devuelve el trabajo existente."""
+    if kind not in TASKS:
+        raise KeyError(f"trabajo desconocido: {kind}")
+    now = datetime.utcnow()
+    jid = uuid.uuid4().hex
+    with get_db() as db:   # COMMIT al salir: el worker (o la ejecución inline) ve el trabajo
+        db.execute(text("""
+          INSERT INTO jobs (id, kind, payload, idem_key, owner, status, attempts, max_attempts,
+                            run_after, created_at, updated_at)
+          VALUES (:id, :kind, :payload, :key, :owner, 'queued', 0, :max, :run_after, :now, :now)
+          ON CONFLICT (idem_key) DO NOTHING
+        """), {"id": jid, "kind": kind, "payload": json.dumps(payload), "key": idem_key,
+               "owner": owner, "max": max_attempts, "run_after": now + timedelta(seconds=delay), "now": now})
+        if idem_key:
+            jid = db.execute(text("SELECT id FROM jobs WHERE idem_key=:k"), {"k": idem_key}).scalar()
+    if JOBS_INLINE and not delay:
+        run_pending(limit=1, job_id=jid)
+    return jid
+
+def enqueue_many(kind, items, owner=None, max_attempts=MAX_ATTEMPTS):
+    """Encola varios trabajos en una transacción (executemany). items = [(payload, idem_key)].
+
+    Devuelve los ids en el mismo orden (el existente si la idem_key ya estaba).
+    """
+    if kind not in TASKS:
+        raise KeyError(f"trabajo desconocido: {kind}")
+    if not items:
+        return []
+    now = datetime.utcnow()
+    params = [{"id": uuid.uuid4().hex, "kind": kind, "payload": json.dumps(payload), "key": key,
+               "owner": owner, "max": max_attempts, "run_after": now, "now": now} for payload, key in items]
+    with get_db() as db:
+        db.execute(text("""
+          INSERT INTO jobs (id, kind, payload, idem_key, owner, status, attempts, max_attempts,
+                            run_after, created_at, updated_at)
+          VALUES (:id, :kind, :payload, :key, :owner, 'queued', 0, :max, :run_after, :now, :now)
+          ON CONFLICT (idem_key) DO NOTHING
+        """), params)
+        keys = [p["key"] for p in params if p["key"]]
+        existing = dict(db.execute(text("SELECT idem_key, id FROM jobs WHERE idem_key IN :keys")
+                                   .bindparams(bindparam("keys", expanding=True)), {"keys": keys}).all()) if keys else {}
+    jids = [existing.get(p["key"], p["id"]) for p in params]
+    if JOBS_INLINE:
+        for jid in jids:
+            run_pending(limit=1, job_id=jid)
+    return jids
+
+def release_keys(db, prefix):
+    """Libera las idem_key que empiezan con `prefix` (p.ej. al borrar la fila a la que se
+    refieren), para que un trabajo nuevo con la misma llave no reciba el viejo."""
+    db.execute(text("UPDATE jobs SET idem_key=NULL WHERE idem_key LIKE :p ESCAPE '\\'"),
+               {"p": prefix.replace("%", r"\%").replace("_", r"\_") + "%"})
+
+def get_job(jid):
+    with get_db() as db:
+        row = db.execute(text("""
+          SELECT id, kind, status, attempts, max_attempts, result, error, owner, created_at, updated_at
+          FROM jobs WHERE id=:id
+        """), {"id": jid}).mappings().first()
+    if not row:
+        return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+# ---------- ejecución ----------
+def _claim(worker, job_id=None):
+    """Toma un trabajo pendiente de forma atómica. Devuelve (id, kind, payload, attempts) o None."""
+    now = datetime.utcnow()
+    skip_locked = " FOR UPDATE SKIP LOCKED" if engine.dialect.name == "postgresql" else ""
+    pick = "id = :jid" if job_id else "status = 'queued' AND run_after <= :now"
+    with get_db() as db:
+        # Recupera trabajos de workers muertos
+        db.execute(text("""
+          UPDATE jobs SET status='queued', locked_by=NULL, updated_at=:now
+          WHERE status='running' AND locked_at < :stale
+        """), {"now": now, "stale": now - timedelta(seconds=JOB_TIMEOUT)})
+        return db.execute(text(f"""
+          UPDATE jobs SET status='running', locked_by=:w, locked_at=:now, updated_at=:now,
+                          attempts=attempts+1
+          WHERE status='queued' AND id = (
+            SELECT id FROM jobs WHERE {pick} ORDER BY run_after LIMIT 1{skip_locked}
+          )
+          RETURNING id, kind, payload, attempts, max_attempts
+        """), {"w": worker, "now": now, "jid": job_id}).first()
+
+def _finish(jid, status, result=None, error=None, retry_in=None):
+    now = datetime.utcnow()
+    with get_db() as db:
+        db.execute(text("""
+          UPDATE jobs SET status=:st, result=:res, error=:err, locked_by=NULL, updated_at=:now,
+                          run_after=COALESCE(:ra, run_after)
+          WHERE id=:id
+        """), {"st": status, "res": json.dumps(result) if result is not None else None, "err": error,
+               "now": now, "ra": now + timedelta(seconds=retry_in) if retry_in else None, "id": jid})
+
+def execute(job):
+    jid, kind, payload, attempts, max_attempts = job
+    try:
+        result = TASKS[kind](**json.loads(payload))
+    except Exception:
+        err = traceback.format_exc(limit=5)
+        if attempts < max_attempts:
+            _finish(jid, "queued", error=err, retry_in=min(600, 5 * 2 ** attempts))
+        else:
+            _finish(jid, "failed", error=err)
+        return False
+    _finish(jid, "done", result=result)
+    return True
+
+def run_pending(limit=None, job_id=None, worker=None):
+    """Ejecuta trabajos pendientes hasta que no haya (o hasta `limit`). Devuelve cuántos corrió."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    n = 0
+    while limit is None or n < limit:
+        job = _claim(worker, job_id)
+        if not job:
+            break
+        execute(job)
+        n += 1
+    return n
+
+def _worker_loop(idx):
+    # Proceso hijo: no reutilizar conexiones heredadas del padre
+    engine.dispose(close=False)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    worker = f"{socket.gethostname()}:{os.getpid()}:{idx}"
+    try:
+        while True:
+            if not run_pending(worker=worker):
+                time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+
+def start_web_worker():
+    """Hilo daemon que procesa la cola dentro de un worker web (gunicorn post_worker_init).
+
+    Si el proceso muere a mitad de un trabajo, este se recupera tras JOB_TIMEOUT.
+    """
+    import app.tasks  # noqa: F401
+    worker = f"{socket.gethostname()}:{os.getpid()}:web"
+
+    def loop():
+        while True:
+            try:
+                if not run_pending(worker=worker):
+                    time.sleep(POLL_INTERVAL)
+            except Exception:   # BD caída, etc.: el worker web sigue atendiendo peticiones
+                traceback.print_exc()
+                time.sleep(POLL_INTERVAL * 5)
+
+    t = threading.Thread(target=loop, name="jobs", daemon=True)
+    t.start()
+    return t
+
+def run_worker(processes=2):
+    """Pool de procesos; cada uno toma trabajos de la cola hasta recibir SIGTERM/SIGINT."""
+    import app.tasks  # noqa: F401  registra los tipos de trabajo
+    from app.migrations import ensure_schema
+    ensure_schema()
+    if processes <= 1:
+        _worker_loop(0)
+        return
+    procs = [multiprocessing.Process(target=_worker_loop, args=(i,), daemon=True) for i in range(processes)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            p.join(timeout=10)
+
+# ---------- CLI ----------
+@click.group("jobs")
+def jobs_cli():
+    """Cola de trabajos en segundo plano."""
+
+@jobs_cli.command("worker")
+@click.option("--processes", default=int(os.environ.get("JOB_WORKERS", 2)), show_default=True)
+def worker_cmd(processes):
+    """Arranca el pool de workers."""
+    click.echo(f"Workers de trabajos: {processes} procesos")
+    run_worker(processes)
+
+@jobs_cli.command("run")
+def run_cmd():
+    """Ejecuta los trabajos pendientes y termina."""
+    import app.tasks  # noqa: F401
+    click.echo(f"Trabajos ejecutados: {run_pending()}")
+
+@jobs_cli.command("status")
+def status_cmd():
+    """Cuenta trabajos por estado."""
+    with engine.connect() as db:
+        for st, n in db.execute(text("SELECT status, COUNT(*) FROM jobs GROUP BY status ORDER BY status")):
+            click.echo(f"{st:8s} {n}")
@@ -0,0 +1,254 @@
+# app/mediciones.py
+# Mediciones normalizadas a partir de anotaciones_json + agregados para Reportes.
+#
+# Cada anotación "dim" de una foto es una fila de `mediciones`: largo en píxeles, largo
+# en mm (si la etiqueta lo dice: "1200 mm", "120 cm", "1.2 m"; sin unidad = mm) y la
+# calibración mm/px que resulta de ambos.
+#
+# Los reportes leen tablas ya agregadas (por usuario, por día y por rango de tamaño):
+#   reporte_usuario, reporte_dia, reporte_tamano
+# que se actualizan por diferencia (delta) en la misma transacción que cambia las
+# anotaciones: sync_foto() / remove_foto(). Nada se recalcula en la petición.
+# Reconstrucción completa:  flask --app main reportes backfill
+import math, re
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import text, bindparam
+
+from app.render import parse_annotations
+
+# (nombre, desde mm, hasta mm) — el último sin tope
+SIZE_BUCKETS = [
+    ("< 500 mm",      0,    500),
+    ("500–999 mm",    500,  1000),
+    ("1000–1999 mm",  1000, 2000),
+    ("2000–2999 mm",  2000, 3000),
+    ("≥ 3000 mm",     3000, None),
+]
+NO_MM = "sin medida"   # etiqueta sin número: cuenta pero no suma mm
+
+_LABEL_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(mm|cm|m)?\b", re.I)
+_UNIT_MM  = {"mm": 1.0, "cm": 10.0, "m": 1000.0}
+
+def parse_mm(label):
+    """Largo en mm a partir del texto de la etiqueta, o None si no trae número."""
+    m = _LABEL_RE.search(label or "")
+    if not m:
+        return None
+    value = float(m.group(1).replace(",", "."))
+    return round(value * _UNIT_MM[(m.group(2) or "mm").lower()], 2)
+
+def bucket(mm):
+    if mm is None:
+        return NO_MM
+    for name, lo, hi in SIZE_BUCKETS:
+        if mm >= lo and (hi is None or mm < hi):
+            return name
+    return NO_MM
+
+def rows_from_shapes(shapes):
+    """Filas de `mediciones` (sin foto_id) para las anotaciones tipo "dim"."""
+    out = []
+    for i, s in enumerate(shapes):
+        if s.get("type", "dim") != "dim":
+            continue
+        px = round(math.hypot(s["x2"] - s["x1"], s["y2"] - s["y1"]), 2)
+        mm = parse_mm(s.get("label"))
+        out.append({"idx": i, "label": s.get("label") or "", "length_px": px, "length_mm": mm,
+                    "mm_per_px": round(mm / px, 6) if mm and px else None})
+    return out
+
+def piece_dims(shapes):
+    """(ancho, alto) en mm de una pieza: mayor medida horizontal y mayor vertical, o None."""
+    horiz, vert = [], []
+    for s in shapes:
+        mm = parse_mm(s.get("label")) if s.get("type", "dim") == "dim" else None
+        if mm:
+            (horiz if abs(s["x2"] - s["x1"]) >= abs(s["y2"] - s["y1"]) else vert).append(mm)
+    return (max(horiz), max(vert)) if horiz and vert else None
+
+def fotos_dims(db, foto_ids):
+    """Medidas de pieza de varias fotos en una consulta (Cortes, Cotizaciones).
+
+    Devuelve ({foto_id: {"nombre", "ancho", "alto"}}, {foto_id: error}).
+    """
+    ids = sorted(set(foto_ids))
+    rows = db.execute(text("SELECT id, nombre, anotaciones_json FROM fotos WHERE id IN :ids")
+                      .bindparams(bindparam("ids", expanding=True)), {"ids": ids}).fetchall() if ids else []
+    found = {r[0]: r for r in rows}
+    dims, errors = {}, {}
+    for fid in ids:
+        row = found.get(fid)
+        if not row:
+            errors[fid] = "No existe la foto."
+            continue
+        try:
+            shapes = parse_annotations(row[2]) if row[2] else []
+        except (ValueError, KeyError, TypeError):
+            shapes = []
+        wh = piece_dims(shapes)
+        if not wh:
+            errors[fid] = "La foto necesita una medida horizontal y una vertical en mm."
+            continue
+        dims[fid] = {"nombre": row[1], "ancho": wh[0], "alto": wh[1]}
+    return dims, errors
+
+def _day(created_at):
+    if isinstance(created_at, (datetime, date)):
+        return created_at.strftime("%Y-%m-%d")
+    return str(created_at)[:10]
+
+# ---------- agregados ----------
+_UPSERT = {
+    "reporte_usuario": text("""
+      INSERT INTO reporte_usuario (creado_por, fotos, mediciones, total_mm)
+      VALUES (:k, :fotos, :n, :mm)
+      ON CONFLICT (creado_por) DO UPDATE SET
+        fotos = reporte_usuario.fotos + excluded.fotos,
+        mediciones = reporte_usuario.mediciones + excluded.mediciones,
+        total_mm = reporte_usuario.total_mm + excluded.total_mm
+    """),
+    "reporte_dia": text("""
+      INSERT INTO reporte_dia (dia, fotos, mediciones, total_mm)
+      VALUES (:k, :fotos, :n, :mm)
+      ON CONFLICT (dia) DO UPDATE SET
+        fotos = reporte_dia.fotos + excluded.fotos,
+        mediciones = reporte_dia.mediciones + excluded.mediciones,
+        total_mm = reporte_dia.total_mm + excluded.total_mm
+    """),
+    "reporte_tamano": text("""
+      INSERT INTO reporte_tamano (bucket, mediciones, total_mm)
+      VALUES (:k, :n, :mm)
+      ON CONFLICT (bucket) DO UPDATE SET
+        mediciones = reporte_tamano.mediciones + excluded.mediciones,
+        total_mm = reporte_tamano.total_mm + excluded.total_mm
+    """),
+}
+
+def _apply_delta(db, creado_por, created_at, old_mm, new_mm, fotos=0):
+    """Suma a los agregados la diferencia entre dos listas de largos (mm o None)."""
+    n, mm = len(new_mm) - len(old_mm), sum(v or 0 for v in new_mm) - sum(v or 0 for v in old_mm)
+    if n or mm or fotos:
+        params = {"fotos": fotos, "n": n, "mm": mm}
+        db.execute(_UPSERT["reporte_usuario"], dict(params, k=creado_por))
+        db.execute(_UPSERT["reporte_dia"], dict(params, k=_day(created_at)))
+    by_bucket = defaultdict(lambda: [0, 0.0])
+    for sign, values in ((-1, old_mm), (1, new_mm)):
+        for v in values:
+            b = by_bucket[bucket(v)]
+            b[0] += sign
+            b[1] += sign * (v or 0)
+    for name, (bn, bmm) in by_bucket.items():
+        if bn or bmm:
+            db.execute(_UPSERT["reporte_tamano"], {"k": name, "n": bn, "mm": bmm})
+
+# ---------- por foto ----------
+_FOTO      = text("SELECT creado_por, created_at, anotaciones_json FROM fotos WHERE id = :id")
+_OLD       = text("SELECT length_mm FROM mediciones WHERE foto_id = :id")
+_DELETE    = text("DELETE FROM mediciones WHERE foto_id = :id")
+_INSERT    = text("""
+  INSERT INTO mediciones (foto_id, idx, label, length_px, length_mm, mm_per_px)
+  VALUES (:foto_id, :idx, :label, :length_px, :length_mm, :mm_per_px)
+""")
+
+def sync_foto(db, fid, shapes=None, new_foto=False):
+    """Reemplaza las mediciones de la foto y actualiza los agregados por diferencia.
+
+    `shapes` None = leerlas de anotaciones_json. new_foto=True cuenta la foto en los agregados.
+    """
+    foto = db.execute(_FOTO, {"id": fid}).first()
+    if not foto:
+        return
+    if shapes is None:
+        try:
+            shapes = parse_annotations(foto[2]) if foto[2] else []
+        except (ValueError, KeyError, TypeError):
+            shapes = []
+    old_mm = list(db.execute(_OLD, {"id": fid}).scalars())
+    rows = rows_from_shapes(shapes)
+    db.execute(_DELETE, {"id": fid})
+    if rows:
+        db.execute(_INSERT, [dict(r, foto_id=fid) for r in rows])
+    _apply_delta(db, foto[0], foto[1], old_mm, [r["length_mm"] for r in rows], fotos=1 if new_foto else 0)
+
+def add_fotos(db, items):
+    """Alta en lote de fotos NUEVAS: items = [(id, creado_por, created_at, shapes)].
+
+    Un executemany para las mediciones y uno por tabla de agregados (deltas sumados en Python).
+    """
+    rows = []
+    per_user = defaultdict(lambda: [0, 0, 0.0])
+    per_day  = defaultdict(lambda: [0, 0, 0.0])
+    per_size = defaultdict(lambda: [0, 0.0])
+    for fid, creado_por, created_at, shapes in items:
+        ms = rows_from_shapes(shapes)
+        rows.extend(dict(m, foto_id=fid) for m in ms)
+        mm = sum(m["length_mm"] or 0 for m in ms)
+        for acc in (per_user[creado_por], per_day[_day(created_at)]):
+            acc[0] += 1; acc[1] += len(ms); acc[2] += mm
+        for m in ms:
+            b = per_size[bucket(m["length_mm"])]
+            b[0] += 1; b[1] += m["length_mm"] or 0
+    if rows:
+        db.execute(_INSERT, rows)
+    for table, acc in (("reporte_usuario", per_user), ("reporte_dia", per_day)):
+        if acc:
+            db.execute(_UPSERT[table], [{"k": k, "fotos": f, "n": n, "mm": mm} for k, (f, n, mm) in acc.items()])
+    if per_size:
+        db.execute(_UPSERT["reporte_tamano"], [{"k": k, "n": n, "mm": mm} for k, (n, mm) in per_size.items()])
+
+def remove_foto(db, fid):
+    """Antes de borrar la fila de fotos: quita sus mediciones y la descuenta de los agregados."""
+    foto = db.execute(_FOTO, {"id": fid}).first()
+    if not foto:
+        return
+    old_mm = list(db.execute(_OLD, {"id": fid}).scalars())
+    db.execute(_DELETE, {"id": fid})
+    _apply_delta(db, foto[0], foto[1], old_mm, [], fotos=-1)
+
+# ---------- reconstrucción ----------
+def rebuild(db, batch=500, progress=None):
+    """Recalcula mediciones y agregados desde cero dentro de la transacción `db`.
+
+    Todo en una transacción: los reportes nunca ven un estado a medias. Devuelve cuántas fotos.
+    """
+    for table in ("mediciones", "reporte_usuario", "reporte_dia", "reporte_tamano"):
+        db.execute(text(f"DELETE FROM {table}"))
+    done, last_id = 0, 0
+    while True:
+        ids = db.execute(text("SELECT id FROM fotos WHERE id > :last ORDER BY id LIMIT :n"),
+                         {"last": last_id, "n": batch}).scalars().all()
+        if not ids:
+            return done
+        for fid in ids:
+            sync_foto(db, fid, new_foto=True)
+        done += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(done, last_id)
+
+# ---------- consultas de Reportes ----------
+def report(db, users_limit=20, days=30):
+    """Datos del módulo Reportes, solo desde las tablas agregadas."""
+    totals = db.execute(text("""
+      SELECT COALESCE(SUM(fotos), 0), COALESCE(SUM(mediciones), 0), COALESCE(SUM(total_mm), 0)
+      FROM reporte_usuario
+    """)).first()
+    by_user = db.execute(text("""
+      SELECT creado_por, fotos, mediciones, total_mm FROM reporte_usuario
+      WHERE fotos > 0 OR mediciones > 0
+      ORDER BY mediciones DESC, fotos DESC LIMIT :n
+    """), {"n": users_limit}).mappings().all()
+    by_day = db.execute(text("""
+      SELECT dia, fotos, mediciones, total_mm FROM reporte_dia
+      WHERE fotos > 0 OR mediciones > 0
+      ORDER BY dia DESC LIMIT :n
+    """), {"n": days}).mappings().all()
+    sizes = {r["bucket"]: r for r in db.execute(text(
+        "SELECT bucket, mediciones, total_mm FROM reporte_tamano")).mappings()}
+    by_size = [{"bucket": name, "mediciones": sizes[name]["mediciones"] if name in sizes else 0,
+                "total_mm": sizes[name]["total_mm"] if name in sizes else 0}
+               for name in [b[0] for b in SIZE_BUCKETS] + [NO_MM]]
+    return {"fotos": totals[0], "mediciones": totals[1], "total_mm": totals[2],
+            "por_usuario": [dict(r) for r in by_user], "por_dia": [dict(r) for r in by_day],
+            "por_tamano": by_size}
@@ -0,0 +1,225 @@
+# app/metrics.py
+# Métricas del proceso en formato de texto de Prometheus (GET /__metrics).
+#
+#   vidrio_http_request_duration_seconds   latencia por endpoint (histograma)
+#   vidrio_http_request_size_bytes         tamaño del cuerpo recibido
+#   vidrio_http_response_size_bytes        tamaño de la respuesta (si se conoce; streaming no)
+#   vidrio_http_requests_total             peticiones por endpoint, método y status
+#   vidrio_db_query_duration_seconds       cada consulta SQL (eventos del engine de app/db.py)
+#   vidrio_db_queries_per_request          consultas por petición, por endpoint
+#   vidrio_db_time_per_request_seconds     tiempo en SQL por petición, por endpoint
+#   vidrio_db_pool_checkout_seconds        espera para obtener conexión del pool (get_conn)
+#   vidrio_db_pool_*                       estado del pool al momento del scrape
+#   process_resident_memory_bytes          RSS del worker
+#
+# Son contadores en memoria de CADA proceso: con varios workers de gunicorn cada scrape
+# ve el worker que lo atendió (label `pid` en las métricas del proceso).
+#
+# SLOW_REQUEST_MS > 0 escribe en el log "vidrio.slow" las peticiones más lentas que eso,
+# con sus consultas más costosas (agrupadas por sentencia). /__metrics exige METRICS_TOKEN
+# como "Authorization: Bearer <token>"; sin METRICS_TOKEN solo responde en debug o pruebas
+# (en producción, 401: un deploy que olvide la variable no expone las métricas).
+import os, re, time, bisect, logging, threading
+from collections import defaultdict
+from flask import g, request, current_app, has_request_context
+from sqlalchemy import event
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 0))
+SLOW_TOP_QUERIES = int(os.environ.get("SLOW_TOP_QUERIES", 5))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_BUCKETS   = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+SIZE_BUCKETS    = tuple(256 * 4 ** i for i in range(10))   # 256 B … 64 MB
+COUNT_BUCKETS   = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+slow_log = logging.getLogger("vidrio.slow")
+_lock = threading.Lock()
+_START = time.time()
+
+# ---------- registro ----------
+class Histogram:
+    def __init__(self, name, help, buckets, labels=()):
+        self.name, self.help, self.buckets, self.labels = name, help, buckets, labels
+        self._series = {}   # valores de labels -> [cuentas por bucket..., +Inf], suma
+
+    def observe(self, value, *labels):
+        with _lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            s[0][bisect.bisect_left(self.buckets, value)] += 1
+            s[1] += value
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            series = [(k, list(c), total) for k, (c, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            base = _labels(self.labels, labels)
+            acc = 0
+            for le, n in zip(self.buckets + ("+Inf",), counts):
+                acc += n
+                out.append(f"{self.name}_bucket{_labels(self.labels + ('le',), labels + (_num(le),))} {acc}")
+            out.append(f"{self.name}_sum{base} {_num(total)}")
+            out.append(f"{self.name}_count{base} {acc}")
+        return out
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self._series = defaultdict(int)
+
+    def inc(self, *labels, by=1):
+        with _lock:
+            self._series[labels] += by
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _lock:
+            series = sorted(self._series.items())
+        out.extend(f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in series)
+        return out
+
+def _num(v):
+    return v if isinstance(v, str) else repr(float(v)) if isinstance(v, float) else str(v)
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+REQUEST_SECONDS = Histogram("vidrio_http_request_duration_seconds", "Latencia de la petición.",
+                            LATENCY_BUCKETS, ("endpoint", "method"))
+REQUEST_BYTES   = Histogram("vidrio_http_request_size_bytes", "Tamaño del cuerpo de la petición.",
+                            SIZE_BUCKETS, ("endpoint",))
+RESPONSE_BYTES  = Histogram("vidrio_http_response_size_bytes", "Tamaño de la respuesta (sin streaming).",
+                            SIZE_BUCKETS, ("endpoint",))
+REQUESTS        = Counter("vidrio_http_requests_total", "Peticiones atendidas.",
+                          ("endpoint", "method", "status"))
+QUERY_SECONDS   = Histogram("vidrio_db_query_duration_seconds", "Duración de cada consulta SQL.",
+                            QUERY_BUCKETS, ("op",))
+REQUEST_QUERIES = Histogram("vidrio_db_queries_per_request", "Consultas SQL por petición.",
+                            COUNT_BUCKETS, ("endpoint",))
+REQUEST_DB_SECONDS = Histogram("vidrio_db_time_per_request_seconds", "Tiempo en SQL por petición.",
+                               LATENCY_BUCKETS, ("endpoint",))
+CHECKOUT_SECONDS = Histogram("vidrio_db_pool_checkout_seconds", "Espera por una conexión del pool.",
+                             QUERY_BUCKETS)
+SLOW_REQUESTS   = Counter("vidrio_http_slow_requests_total", "Peticiones sobre SLOW_REQUEST_MS.", ("endpoint",))
+
+METRICS = [REQUEST_SECONDS, REQUEST_BYTES, RESPONSE_BYTES, REQUESTS, SLOW_REQUESTS,
+           QUERY_SECONDS, REQUEST_QUERIES, REQUEST_DB_SECONDS, CHECKOUT_SECONDS]
+
+# ---------- SQL ----------
+_OP_RE = re.compile(r"\s*(?:WITH\b.*?\)\s*)?(\w+)", re.S)
+
+def _op(statement):
+    m = _OP_RE.match(statement)
+    op = m.group(1).lower() if m else "other"
+    return op if op in ("select", "insert", "update", "delete") else "other"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_t0 = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    dt = time.perf_counter() - context._metrics_t0
+    QUERY_SECONDS.observe(dt, _op(statement))
+    if has_request_context():
+        stats = g.get("_metrics")
+        if stats is not None:
+            q = stats["queries"][statement]
+            q[0] += 1
+            q[1] += dt
+
+def observe_checkout(seconds):
+    """Espera de get_conn() por una conexión (app/db.py)."""
+    CHECKOUT_SECONDS.observe(seconds)
+
+# ---------- peticiones ----------
+def _endpoint():
+    return request.endpoint or "sin_ruta"   # 404: un solo label, no uno por URL
+
+def _before_request():
+    g._metrics = {"t0": time.perf_counter(), "queries": defaultdict(lambda: [0, 0.0])}
+
+def _after_request(response):
+    stats = g.get("_metrics")
+    if stats is not None:
+        stats["status"] = response.status_code
+        stats["size"] = None if response.is_streamed else response.calculate_content_length()
+    return response
+
+def _teardown_request(exc=None):
+    stats = g.pop("_metrics", None)
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - stats["t0"]
+    endpoint, method = _endpoint(), request.method
+    status = stats.get("status", 500)
+    REQUEST_SECONDS.observe(elapsed, endpoint, method)
+    REQUESTS.inc(endpoint, method, str(status))
+    if request.content_length:
+        REQUEST_BYTES.observe(request.content_length, endpoint)
+    if stats.get("size") is not None:
+        RESPONSE_BYTES.observe(stats["size"], endpoint)
+    queries = stats["queries"]
+    n = sum(c for c, _ in queries.values())
+    db_time = sum(t for _, t in queries.values())
+    REQUEST_QUERIES.observe(n, endpoint)
+    REQUEST_DB_SECONDS.observe(db_time, endpoint)
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        SLOW_REQUESTS.inc(endpoint)
+        top = sorted(queries.items(), key=lambda kv: kv[1][1], reverse=True)[:SLOW_TOP_QUERIES]
+        slow_log.warning(
+            "%s %s -> %s en %.0f ms (%d consultas, %.0f ms en SQL)%s",
+            method, request.full_path.rstrip("?"), status, elapsed * 1000, n, db_time * 1000,
+            "".join(f"\n  {t * 1000:7.1f} ms  x{c:<4d} {' '.join(sql.split())[:300]}"
+                    for sql, (c, t) in top))
+
+# ---------- proceso / pool ----------
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource   # macOS/BSD: pico (ru_maxrss), no el actual
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if os.uname().sysname == "Darwin" else rss * 1024
+
+def _gauges(engine):
+    pid = (("pid",), (os.getpid(),))
+    out = [("process_resident_memory_bytes", "RSS del worker.", rss_bytes(), pid),
+           ("process_start_time_seconds", "Inicio del proceso (epoch).", _START, pid)]
+    pool = engine.pool
+    for name, attr, help in (("size", "size", "Tamaño configurado del pool."),
+                             ("checked_out", "checkedout", "Conexiones en uso."),
+                             ("checked_in", "checkedin", "Conexiones libres en el pool."),
+                             ("overflow", "overflow", "Conexiones por encima de pool_size.")):
+        fn = getattr(pool, attr, None)
+        if callable(fn):
+            out.append((f"vidrio_db_pool_{name}", help, fn(), ((), ())))
+    return out
+
+def render(engine):
+    """Texto de exposición de Prometheus (text/plain; version=0.0.4)."""
+    lines = []
+    for name, help, value, (names, values) in _gauges(engine):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name}{_labels(names, values)} {_num(value)}"]
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+def authorized():
+    if not METRICS_TOKEN:
+        return current_app.debug or current_app.testing
+    return request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+
+def init_app_metrics(app, engine):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
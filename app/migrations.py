@@ -0,0 +1,305 @@
+# app/migrations.py
+# Migraciones versionadas del esquema.
+#
+#   flask --app main db upgrade      # en el deploy (render.yaml: preDeployCommand; Procfile: release)
+#   flask --app main db status
+#
+# Cada migración es (versión, descripción, paso); `paso` es SQL (se separa por ";") o una
+# función que recibe la conexión. La versión aplicada queda en schema_migrations.
+# ensure_schema() verifica el esquema al servir, no al importar la app (así la CLI, y
+# sobre todo `db upgrade`, corre con el esquema atrasado): en el master de gunicorn al
+# arrancar (gunicorn.conf.py: when_ready), en la primera petición de cada proceso
+# (app/db.py) y al arrancar el worker de trabajos. Hace UNA consulta (MAX(version)) y no
+# toca nada si el esquema está al día; nunca corre DDL salvo con DB_AUTO_MIGRATE=1
+# (default solo en desarrollo con SQLite).
+#
+# Nunca edites una migración ya publicada: agrega una nueva al final de MIGRATIONS.
+import os, fcntl, logging
+from datetime import datetime
+import click
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.db import engine, DATABASE_URL
+
+log = logging.getLogger(__name__)
+
+AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE", "1" if DATABASE_URL.startswith("sqlite") else "0") == "1"
+LOCK_KEY     = 0x76696472   # pg_advisory_xact_lock: "vidr"
+
+# ---------- 1: esquema base (lo que antes corría init_app_db en cada arranque) ----------
+BASELINE_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+  id SERIAL PRIMARY KEY,
+  email TEXT UNIQUE NOT NULL,
+  password_hash TEXT NOT NULL,
+  first_name TEXT NOT NULL,
+  last_name  TEXT NOT NULL,
+  address TEXT,
+  phone TEXT UNIQUE,
+  company TEXT,
+  created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS medidas (
+  id SERIAL PRIMARY KEY,
+  nombre TEXT NOT NULL,
+  unidad TEXT NOT NULL,
+  descripcion TEXT,
+  creado_por TEXT NOT NULL,
+  created_at TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fotos (
+  id SERIAL PRIMARY KEY,
+  nombre TEXT NOT NULL,
+  creado_por TEXT NOT NULL,
+  created_at TIMESTAMP NOT NULL,
+  original_png BYTEA,     -- (heredado) los bytes ahora viven en el blobstore
+  anotada_png BYTEA,      -- (heredado)
+  anotaciones_json TEXT,  -- lista de anotaciones (JSON)
+  original_sha256 TEXT,   -- llave en el blobstore (y ETag)
+  original_size INTEGER,
+  anotada_sha256 TEXT,
+  anotada_size INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS foto_thumbs (
+  foto_id INTEGER PRIMARY KEY,  -- = fotos.id (se borra junto con la foto)
+  mime TEXT NOT NULL,
+  width INTEGER NOT NULL,
+  height INTEGER NOT NULL,
+  data BYTEA NOT NULL,          -- miniatura comprimida (JPEG)
+  sha256 TEXT
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+  id TEXT PRIMARY KEY,          -- uuid hex
+  kind TEXT NOT NULL,
+  payload TEXT NOT NULL,        -- JSON
+  idem_key TEXT UNIQUE,         -- encolar dos veces la misma llave = un solo trabajo
+  owner TEXT,
+  status TEXT NOT NULL,         -- queued | running | done | failed
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL,
+  run_after TIMESTAMP NOT NULL,
+  locked_by TEXT,
+  locked_at TIMESTAMP,
+  result TEXT,                  -- JSON
+  error TEXT,
+  created_at TIMESTAMP NOT NULL,
+  updated_at TIMESTAMP NOT NULL
+);
+
+"""
+
+# Columnas agregadas después de la primera versión de cada tabla.
+# CREATE TABLE IF NOT EXISTS no las añade a tablas existentes.
+BASELINE_COLUMNS = {
+    "fotos":       {"original_sha256": "TEXT", "anotada_sha256": "TEXT",
+                    "original_size": "INTEGER", "anotada_size": "INTEGER"},
+    "foto_thumbs": {"sha256": "TEXT"},
+}
+
+# Índices (después de BASELINE_COLUMNS, pueden usar columnas recién agregadas)
+BASELINE_INDEXES = """
+CREATE INDEX IF NOT EXISTS fotos_original_sha256_idx ON fotos (original_sha256);
+CREATE INDEX IF NOT EXISTS fotos_anotada_sha256_idx ON fotos (anotada_sha256);
+CREATE INDEX IF NOT EXISTS jobs_status_run_after_idx ON jobs (status, run_after);
+"""
+
+def _baseline(conn):
+    # Idempotente: bases creadas antes del control de versiones ya tienen parte del esquema
+    run_sql(conn, BASELINE_SQL)
+    for table, cols in BASELINE_COLUMNS.items():
+        have = {c["name"] for c in inspect(conn).get_columns(table)}
+        for name, ddl in cols.items():
+            if name not in have:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+    run_sql(conn, BASELINE_INDEXES)
+
+def _fotos_search(conn):
+    # Índice de texto completo (app/search.py) + carga inicial con las fotos existentes
+    from app import search
+    search.create_index(conn)
+    last_id = 0
+    while True:
+        n, last_id = search.reindex(conn, last_id)
+        if not n:
+            break
+
+def _mediciones(conn):
+    run_sql(conn, """
+CREATE TABLE IF NOT EXISTS mediciones (
+  id SERIAL PRIMARY KEY,
+  foto_id INTEGER NOT NULL,     -- = fotos.id
+  idx INTEGER NOT NULL,         -- posición en anotaciones_json
+  label TEXT,
+  length_px DOUBLE PRECISION NOT NULL,
+  length_mm DOUBLE PRECISION,   -- NULL si la etiqueta no trae medida
+  mm_per_px DOUBLE PRECISION    -- calibración de la foto según esta medida
+);
+CREATE INDEX IF NOT EXISTS mediciones_foto_id_idx ON mediciones (foto_id);
+
+CREATE TABLE IF NOT EXISTS reporte_usuario (
+  creado_por TEXT PRIMARY KEY,
+  fotos INTEGER NOT NULL DEFAULT 0,
+  mediciones INTEGER NOT NULL DEFAULT 0,
+  total_mm DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS reporte_dia (
+  dia TEXT PRIMARY KEY,         -- YYYY-MM-DD (UTC, de fotos.created_at)
+  fotos INTEGER NOT NULL DEFAULT 0,
+  mediciones INTEGER NOT NULL DEFAULT 0,
+  total_mm DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS reporte_tamano (
+  bucket TEXT PRIMARY KEY,
+  mediciones INTEGER NOT NULL DEFAULT 0,
+  total_mm DOUBLE PRECISION NOT NULL DEFAULT 0
+)
+""")
+    from app.mediciones import rebuild
+    rebuild(conn)
+
+# ---------- lista ----------
+MIGRATIONS = [
+    (1, "esquema base", _baseline),
+    # Listado por usuario (keyset sobre id), búsqueda por nombre y reportes por fecha
+    (2, "índices de fotos", """
+CREATE INDEX IF NOT EXISTS fotos_creado_por_id_idx ON fotos (creado_por, id);
+CREATE INDEX IF NOT EXISTS fotos_created_at_idx ON fotos (created_at);
+CREATE INDEX IF NOT EXISTS fotos_nombre_idx ON fotos (nombre);
+"""),
+    (3, "búsqueda de fotos (FTS5 / tsvector)", _fotos_search),
+    (4, "mediciones y agregados de reportes", _mediciones),
+    # Tablas de precios de Cotizaciones (app/cotizaciones.py); precios_version invalida su caché
+    (5, "precios de cotizaciones", """
+CREATE TABLE IF NOT EXISTS precios_vidrio (
+  tipo TEXT NOT NULL,                      -- "claro", "filtrasol", "templado claro", ...
+  espesor_mm DOUBLE PRECISION NOT NULL,
+  precio_m2 NUMERIC(12, 2) NOT NULL,
+  minimo_m2 DOUBLE PRECISION NOT NULL DEFAULT 0,   -- área mínima cobrable por pieza
+  PRIMARY KEY (tipo, espesor_mm)
+);
+CREATE TABLE IF NOT EXISTS precios_cargo (
+  clave TEXT PRIMARY KEY,                  -- "canto_pulido", "instalacion", ...
+  descripcion TEXT,
+  unidad TEXT NOT NULL,                    -- ml (perímetro), m2 o pieza
+  precio NUMERIC(12, 2) NOT NULL
+);
+CREATE TABLE IF NOT EXISTS precios_regla (
+  clave TEXT PRIMARY KEY,                  -- iva, redondeo_mm
+  valor DOUBLE PRECISION NOT NULL
+);
+CREATE TABLE IF NOT EXISTS precios_version (
+  id INTEGER PRIMARY KEY,                  -- una sola fila (id = 1)
+  version INTEGER NOT NULL
+);
+INSERT INTO precios_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
+INSERT INTO precios_regla (clave, valor) VALUES ('iva', 0.16), ('redondeo_mm', 0) ON CONFLICT (clave) DO NOTHING
+"""),
+]
+LATEST = MIGRATIONS[-1][0]
+
+# ---------- ejecución ----------
+def run_sql(conn, sql):
+    """Ejecuta un bloque de DDL separado por ";" adaptando tipos al dialecto."""
+    if conn.dialect.name == "sqlite":
+        # SERIAL no existe en SQLite: la columna quedaría sin autoincremento (ids NULL)
+        sql = sql.replace("SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY")
+    for stmt in sql.split(";"):
+        if stmt.strip():
+            conn.execute(text(stmt.strip()))
+
+def current_version(conn):
+    try:
+        return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+    except (OperationalError, ProgrammingError):   # la tabla aún no existe
+        conn.rollback()
+        return 0
+
+class _Lock:
+    """Un solo proceso migra a la vez: advisory lock en Postgres, flock junto al archivo en SQLite."""
+    def __init__(self, conn):
+        self.conn, self.fh = conn, None
+
+    def __enter__(self):
+        if self.conn.dialect.name == "postgresql":
+            self.conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": LOCK_KEY})  # se suelta al COMMIT
+        else:
+            path = (engine.url.database or "memoria") + ".migrate.lock"
+            self.fh = open(path, "w")
+            fcntl.flock(self.fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fh:
+            fcntl.flock(self.fh, fcntl.LOCK_UN)
+            self.fh.close()
+
+def upgrade(target=None, echo=print):
+    """Aplica las migraciones pendientes hasta `target` (default: la última). Devuelve cuántas."""
+    target = LATEST if target is None else target
+    with engine.connect() as conn:
+        if current_version(conn) >= target:   # camino rápido, sin lock
+            return 0
+    applied = 0
+    with engine.begin() as conn, _Lock(conn):
+        conn.execute(text("""
+          CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+          )
+        """))
+        done = current_version(conn)   # releer con el lock: otro proceso pudo adelantarse
+        for version, name, step in MIGRATIONS:
+            if version <= done or version > target:
+                continue
+            echo(f"  {version:3d}  {name}")
+            if callable(step):
+                step(conn)
+            else:
+                run_sql(conn, step)
+            conn.execute(text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                         {"v": version, "n": name, "t": datetime.utcnow()})
+            applied += 1
+    return applied
+
+_schema_ok = False   # por proceso; se hereda al hacer fork después de verificar
+
+def ensure_schema():
+    """Verificación al servir: una consulta la primera vez, nada después."""
+    global _schema_ok
+    if _schema_ok:
+        return
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < LATEST and AUTO_MIGRATE:
+        upgrade(echo=log.info)
+    elif version < LATEST:
+        raise RuntimeError(f"Esquema en versión {version}, se esperaba {LATEST}: "
+                           "corre 'flask --app main db upgrade' (o DB_AUTO_MIGRATE=1).")
+    _schema_ok = True
+
+# ---------- CLI ----------
+@click.group("db")
+def db_cli():
+    """Migraciones del esquema."""
+
+@db_cli.command("upgrade")
+@click.option("--to", "target", type=int, default=None, help="Versión destino (default: la última).")
+def upgrade_cmd(target):
+    """Aplica las migraciones pendientes."""
+    n = upgrade(target, echo=click.echo)
+    click.echo(f"Migraciones aplicadas: {n}" if n else "El esquema ya está al día.")
+
+@db_cli.command("status")
+def status_cmd():
+    """Versión aplicada y migraciones pendientes."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    click.echo(f"Versión actual: {version}  ·  última: {LATEST}")
+    for v, name, _ in MIGRATIONS:
+        if v > version:
+            click.echo(f"  pendiente {v:3d}  {name}")
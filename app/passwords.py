@@ -0,0 +1,64 @@
+# app/passwords.py
+# Hash de contraseñas fuera del hilo de la petición.
+# El KDF (pbkdf2/scrypt) es lento a propósito: se ejecuta en un pool acotado de hilos
+# (hashlib suelta el GIL mientras calcula) y con control de admisión: si ya hay
+# KDF_WORKERS + KDF_QUEUE cálculos en curso, la petición espera a lo sumo KDF_WAIT s y
+# luego se rechaza con KdfBusy (503), en vez de acaparar workers de gunicorn.
+#
+# PASSWORD_HASH_METHOD usa el formato completo de werkzeug, con parámetros
+# ("pbkdf2:sha256:600000", "scrypt:32768:8:1", ...).
+# Si cambia, los hashes viejos se rehacen al iniciar sesión.
+import os, threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", 16))
+KDF_WORKERS = int(os.environ.get("KDF_WORKERS", 2))
+KDF_QUEUE   = int(os.environ.get("KDF_QUEUE", 8))
+KDF_WAIT    = float(os.environ.get("KDF_WAIT", 2.0))
+
+class KdfBusy(Exception):
+    """Demasiados cálculos de hash en curso; reintentar más tarde."""
+
+_pool = None
+_slots = threading.BoundedSemaphore(KDF_WORKERS + KDF_QUEUE)
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+    return _pool
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=KDF_WAIT):
+        raise KdfBusy()
+    try:
+        return _get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+def hash_password(password):
+    return _run(generate_password_hash, password, HASH_METHOD, SALT_LENGTH)
+
+def needs_rehash(pw_hash):
+    """True si el hash se generó con parámetros distintos a HASH_METHOD."""
+    return pw_hash.split("$", 1)[0] != HASH_METHOD
+
+def verify_password(pw_hash, password):
+    """(ok, hash_nuevo). hash_nuevo no es None si hay que guardarlo (parámetros cambiaron).
+
+    Solo la verificación puede lanzar KdfBusy: si el pool está lleno para el rehash, la
+    contraseña ya es correcta, así que se omite y se reintenta en el siguiente inicio de sesión.
+    """
+    if not pw_hash or not _run(check_password_hash, pw_hash, password):
+        return False, None
+    if not needs_rehash(pw_hash):
+        return True, None
+    try:
+        return True, hash_password(password)
+    except KdfBusy:
+        return True, None
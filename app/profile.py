@@ -0,0 +1,44 @@
+# app/profile.py
+# Perfil del usuario en sesión (nombre, empresa) cacheado en la cookie de sesión.
+# Las páginas autenticadas lo leen de ahí sin consultar `users`. Se recarga:
+#   - al iniciar sesión (load_profile),
+#   - al cambiar el perfil o la contraseña (invalidate_profile + siguiente lectura),
+#   - pasado PROFILE_TTL, para que cambios hechos desde otra sesión se vean.
+import os, time
+from flask import session
+
+from app.db import get_conn
+from app.repo import users
+
+PROFILE_TTL     = int(os.environ.get("PROFILE_TTL", 3600))   # s
+PROFILE_VERSION = 1    # súbelo si cambian los campos cacheados
+PROFILE_FIELDS  = ("first_name", "last_name", "company")
+
+def load_profile(email, row=None):
+    """Guarda en sesión el perfil de `email` (reutiliza `row` si ya se leyó) y lo devuelve."""
+    row = row or users.by_email(get_conn(), email)
+    if not row:
+        session.pop("profile", None)
+        return None
+    profile = {k: row[k] for k in PROFILE_FIELDS}
+    profile["_v"], profile["_ts"] = PROFILE_VERSION, int(time.time())
+    session["profile"] = profile
+    return profile
+
+def current_profile():
+    """Perfil del usuario en sesión (sin tocar la BD si la caché es vigente) o None."""
+    email = session.get("user_email")
+    if not email:
+        return None
+    p = session.get("profile")
+    if p and p.get("_v") == PROFILE_VERSION and time.time() - p.get("_ts", 0) < PROFILE_TTL:
+        return p
+    return load_profile(email)
+
+def invalidate_profile():
+    session.pop("profile", None)
+
+def display_name(profile, email):
+    if not profile:
+        return email
+    return f"{profile['first_name']} {profile['last_name']}".upper()
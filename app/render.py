@@ -0,0 +1,248 @@
+# app/render.py
+# Render en servidor de la imagen anotada: original + anotaciones_json.
+# anotaciones_json es la fuente de verdad; la imagen anotada se genera bajo demanda
+# (codificada con la política "anotada" de app/transcode.py) y se guarda en una caché
+# acotada (memoria LRU + disco) con llave (hash foto, hash anotaciones).
+#
+# Formato canónico (coordenadas en píxeles de la imagen original):
+#   {"type": "dim",  "x1":…, "y1":…, "x2":…, "y2":…, "label": "123.4 mm"}
+#   {"type": "text", "x":…,  "y":…,  "label": "Texto"}
+import io, os, json, math, hashlib, tempfile, threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+from sqlalchemy import text
+
+from app.blobstore import foto_bytes
+from app.transcode import encode
+
+RENDER_VERSION = 2   # súbelo si cambia el dibujo o el formato: invalida la caché y los ETag
+MAX_SHAPES     = 500
+MAX_LABEL      = 80
+
+LINE_COLOR  = "#ffe600"
+LABEL_FILL  = "#ffd400"
+LABEL_LINE  = "#333333"
+LABEL_TEXT  = "#111111"
+
+# ---------- anotaciones ----------
+def _num(v):
+    v = float(v)
+    if not math.isfinite(v):
+        raise ValueError("coordenada inválida")
+    return round(v, 2)
+
+def parse_annotations(raw):
+    """Valida y normaliza anotaciones (str JSON o lista). Lanza ValueError si no son válidas.
+
+    Acepta el formato del editor de anotación ({x1,y1,x2,y2,label} sin "type").
+    """
+    shapes = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    if shapes is None:
+        return []
+    if not isinstance(shapes, list) or len(shapes) > MAX_SHAPES:
+        raise ValueError("anotaciones inválidas")
+    out = []
+    for s in shapes:
+        if not isinstance(s, dict):
+            raise ValueError("anotaciones inválidas")
+        label = str(s.get("label") or "")[:MAX_LABEL]
+        kind = s.get("type", "dim")
+        if kind == "dim":
+            out.append({"type": "dim", "x1": _num(s["x1"]), "y1": _num(s["y1"]),
+                        "x2": _num(s["x2"]), "y2": _num(s["y2"]), "label": label})
+        elif kind == "text":
+            out.append({"type": "text", "x": _num(s["x"]), "y": _num(s["y"]), "label": label or "Texto"})
+        else:
+            raise ValueError(f"tipo de anotación desconocido: {kind!r}")
+    return out
+
+def scale_annotations(shapes, f):
+    """Ajusta coordenadas cuando la foto se reescala (p. ej. al transcodificar)."""
+    keys = ("x1", "y1", "x2", "y2", "x", "y")
+    return [{k: (round(v * f, 2) if k in keys else v) for k, v in s.items()} for s in shapes]
+
+def dump_annotations(shapes):
+    return json.dumps(shapes, ensure_ascii=False, separators=(",", ":"))
+
+def annotated_key(original_sha, shapes):
+    """Llave de caché y ETag de la imagen anotada."""
+    h = hashlib.sha256(f"v{RENDER_VERSION}:{original_sha}:".encode())
+    h.update(dump_annotations(shapes).encode())
+    return h.hexdigest()
+
+# ---------- dibujo ----------
+_fonts = {}
+def _font(size):
+    if size not in _fonts:
+        try:
+            _fonts[size] = ImageFont.truetype("DejaVuSans.ttf", size)
+        except OSError:
+            _fonts[size] = ImageFont.load_default(size=size)
+    return _fonts[size]
+
+def _arrow(d, p1, p2, size, width):
+    # Punta en p1, abriendo hacia p2 (igual que arrow() en medidas_capture.html)
+    ang = math.atan2(p2[1] - p1[1], p2[0] - p1[0])
+    for da in (math.pi / 6, -math.pi / 6):
+        d.line([p1, (p1[0] + size * math.cos(ang + da), p1[1] + size * math.sin(ang + da))],
+               fill=LINE_COLOR, width=width)
+
+def _label(d, center, label, font_size):
+    font = _font(font_size)
+    pad = round(font_size * 0.5)
+    h = round(font_size * 1.6)
+    w = max(round(font_size * 4), round(d.textlength(label, font=font) + pad * 2))
+    x, y = center[0] - w / 2, center[1] - h / 2
+    d.rounded_rectangle([x, y, x + w, y + h], radius=round(font_size * 0.35),
+                        fill=LABEL_FILL, outline=LABEL_LINE, width=2)
+    d.text(center, label, fill=LABEL_TEXT, font=font, anchor="mm")
+
+def render_annotated(img_bytes, shapes):
+    """Imagen (WebP/JPEG/PNG según transcode.encode) con las anotaciones a resolución completa."""
+    with Image.open(io.BytesIO(img_bytes)) as im:
+        im = im.convert("RGB")
+    w, h = im.size
+    d = ImageDraw.Draw(im)
+    line_w = max(2, round(min(w, h) * 0.003))      # grosor relativo, como el editor
+    font_size = max(14, round(min(w, h) * 0.02))
+    head = max(8, font_size * 0.6)
+    for s in shapes:
+        if s["type"] == "dim":
+            a, b = (s["x1"], s["y1"]), (s["x2"], s["y2"])
+            d.line([a, b], fill=LINE_COLOR, width=line_w)
+            _arrow(d, a, b, head, line_w)
+            _arrow(d, b, a, head, line_w)
+            if s["label"].strip():
+                _label(d, ((a[0] + b[0]) / 2, (a[1] + b[1]) / 2), s["label"], font_size)
+        else:
+            _label(d, (s["x"], s["y"]), s["label"], font_size)
+    return encode(im, "anotada")[0]
+
+# ---------- caché ----------
+class RenderCache:
+    """LRU en memoria (por bytes) respaldada por un directorio en disco también acotado."""
+    def __init__(self, mem_bytes, disk_dir, disk_bytes):
+        self.mem_bytes, self.disk_dir, self.disk_bytes = mem_bytes, disk_dir, disk_bytes
+        self._mem, self._mem_size = OrderedDict(), 0
+        self._lock = threading.Lock()
+        self._puts = 0
+        os.makedirs(disk_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + ".img")
+
+    def _mem_put(self, key, data):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return
+            self._mem[key] = data
+            self._mem_size += len(data)
+            while self._mem_size > self.mem_bytes and self._mem:
+                _, old = self._mem.popitem(last=False)
+                self._mem_size -= len(old)
+
+    def get(self, key):
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                return data
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))   # mtime = último uso (LRU en disco)
+        except FileNotFoundError:
+            return None
+        self._mem_put(key, data)
+        return data
+
+    def put(self, key, data):
+        self._mem_put(key, data)
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        self._puts += 1
+        if self._puts % 20 == 0:
+            self.prune()
+
+    def prune(self):
+        """Borra los archivos menos usados hasta quedar bajo disk_bytes."""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            try:
+                st = os.stat(os.path.join(self.disk_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_size = 0
+        for name in os.listdir(self.disk_dir):
+            try: os.remove(os.path.join(self.disk_dir, name))
+            except FileNotFoundError: pass
+
+_cache = None
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = RenderCache(
+            mem_bytes=int(os.environ.get("RENDER_CACHE_MEM_MB", 64)) * 1024 * 1024,
+            disk_dir=os.environ.get("RENDER_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "vidrio-render"),
+            disk_bytes=int(os.environ.get("RENDER_CACHE_DISK_MB", 1024)) * 1024 * 1024,
+        )
+    return _cache
+
+# ---------- fotos ----------
+def foto_annotated(db, fid):
+    """(llave, shapes) de la versión anotada de una foto, o None si no tiene anotaciones.
+
+    Las fotos capturadas antes del render en servidor pueden tener un PNG anotado
+    guardado sin JSON; esas siguen sirviéndose desde anotada_sha256.
+    """
+    row = db.execute(text("SELECT original_sha256, anotaciones_json FROM fotos WHERE id=:id"),
+                     {"id": fid}).first()
+    if not row or not row[1]:
+        return None
+    try:
+        shapes = parse_annotations(row[1])
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not shapes:
+        return None
+    orig_sha = row[0]
+    if not orig_sha:   # fila sin migrar: el hash se calcula de los bytes heredados
+        data = foto_bytes(db, fid, "original")
+        if not data:
+            return None
+        orig_sha = hashlib.sha256(data).hexdigest()
+    return annotated_key(orig_sha, shapes), shapes
+
+def render_foto(db, fid, key=None, shapes=None):
+    """Bytes de la foto anotada (desde caché o renderizando). None si no aplica."""
+    if key is None:
+        found = foto_annotated(db, fid)
+        if not found:
+            return None
+        key, shapes = found
+    cache = get_cache()
+    data = cache.get(key)
+    if data is None:
+        original = foto_bytes(db, fid, "original")
+        if not original:
+            return None
+        data = render_annotated(original, shapes)
+        cache.put(key, data)
+    return data
@@ -0,0 +1,10 @@
+# app/repo/__init__.py
+# Acceso a datos por tabla. Cada función recibe la conexión (`db`) como primer argumento:
+# en una vista es get_conn()/get_db() de app/db.py; en CLI/worker, la de engine.begin().
+#
+#   from app.repo import users, fotos
+#   users.by_email(get_conn(), email)
+#
+# Las sentencias se construyen una sola vez al importar el módulo; SQLAlchemy guarda su
+# forma compilada en la caché del engine, así que cada llamada solo enlaza parámetros.
+from . import users, fotos  # noqa: F401
@@ -0,0 +1,102 @@
+# app/repo/fotos.py
+# Metadatos de fotos. Los bytes viven en el blobstore (app/blobstore.py) y las
+# miniaturas en foto_thumbs (app/thumbs.py).
+from datetime import datetime
+from sqlalchemy import text, insert, Table, Column, MetaData, Integer, Text, DateTime
+
+# Solo para INSERT en lote (insert_many): el esquema real vive en app/migrations.py
+FOTOS = Table(
+    "fotos", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("nombre", Text), Column("creado_por", Text), Column("created_at", DateTime),
+    Column("original_sha256", Text), Column("original_size", Integer), Column("anotaciones_json", Text),
+)
+# Un solo INSERT multi-VALUES (insertmanyvalues); los ids vuelven en el orden de los parámetros
+_INSERT_MANY = insert(FOTOS).returning(FOTOS.c.id, sort_by_parameter_order=True)
+
+# Listado: solo columnas livianas + hash de la miniatura (nunca BYTEA)
+_PAGE_COLS = """
+  SELECT f.id, f.nombre, f.creado_por, f.created_at, f.anotaciones_json IS NOT NULL AS tiene_anotada,
+         t.foto_id IS NOT NULL AS tiene_thumb, t.sha256 AS thumb_sha256
+  FROM fotos f
+  LEFT JOIN foto_thumbs t ON t.foto_id = f.id
+"""
+_PAGE_FIRST  = text(_PAGE_COLS + " ORDER BY f.id DESC LIMIT :n")
+_PAGE_BEFORE = text(_PAGE_COLS + " WHERE f.id < :before ORDER BY f.id DESC LIMIT :n")
+
+# Búsqueda (app/search.py): mismo orden y cursor que el listado
+_SEARCH = {
+    "sqlite": _PAGE_COLS + """
+      JOIN fotos_search s ON s.rowid = f.id
+      WHERE fotos_search MATCH :match {before}
+      ORDER BY f.id DESC LIMIT :n
+    """,
+    "postgresql": _PAGE_COLS + """
+      JOIN fotos_search s ON s.foto_id = f.id
+      WHERE s.doc @@ to_tsquery('simple', :match) {before}
+      ORDER BY f.id DESC LIMIT :n
+    """,
+}
+_SEARCH = {(dialect, paged): text(sql.format(before="AND f.id < :before" if paged else ""))
+           for dialect, sql in _SEARCH.items() for paged in (False, True)}
+
+_GET = text("""
+  SELECT id, nombre, creado_por, created_at, anotaciones_json,
+         original_sha256, anotada_sha256,
+         original_sha256 IS NOT NULL OR original_png IS NOT NULL AS has_original,
+         anotada_sha256 IS NOT NULL OR anotada_png IS NOT NULL AS has_anotada
+  FROM fotos WHERE id = :id
+""")
+
+_INSERT = text("""
+  INSERT INTO fotos (nombre, creado_por, created_at, original_sha256, original_size, anotaciones_json)
+  VALUES (:n, :by, :ts, :sha, :size, :jn)
+  RETURNING id
+""")
+
+_SHAS = text("SELECT original_sha256, anotada_sha256 FROM fotos WHERE id = :id")
+
+# El PNG anotado heredado (si lo había) queda reemplazado por el render desde el JSON
+_SET_ANNOTATIONS = text("""
+  UPDATE fotos SET anotada_png=NULL, anotada_sha256=NULL, anotada_size=NULL, anotaciones_json=:jn
+  WHERE id = :id
+""")
+
+_DELETE = text("DELETE FROM fotos WHERE id = :id")
+
+def page(db, before=None, limit=24):
+    """Filas (mapping) de fotos con id < before, de la más nueva a la más vieja."""
+    if before is None:
+        return db.execute(_PAGE_FIRST, {"n": limit}).mappings().all()
+    return db.execute(_PAGE_BEFORE, {"before": before, "n": limit}).mappings().all()
+
+def search_page(db, match, before=None, limit=24):
+    """Como page(), pero solo fotos que cumplen `match` (ver app.search.match_expr)."""
+    stmt = _SEARCH[(db.dialect.name, before is not None)]
+    return db.execute(stmt, {"match": match, "before": before, "n": limit}).mappings().all()
+
+def get(db, fid):
+    return db.execute(_GET, {"id": fid}).mappings().first()
+
+def insert(db, nombre, creado_por, sha, size, anotaciones_json=None):
+    """Inserta la foto (bytes ya en el blobstore) y devuelve su id."""
+    return db.execute(_INSERT, {"n": nombre, "by": creado_por, "ts": datetime.utcnow(),
+                                "sha": sha, "size": size, "jn": anotaciones_json}).scalar()
+
+def insert_many(db, rows):
+    """Inserta varias fotos de una vez; rows = dicts con las llaves de insert(). Devuelve los ids en orden."""
+    now = datetime.utcnow()
+    params = [{"nombre": r["nombre"], "creado_por": r["creado_por"], "created_at": r.get("created_at") or now,
+               "original_sha256": r["sha"], "original_size": r["size"], "anotaciones_json": r.get("anotaciones_json")}
+              for r in rows]
+    return db.execute(_INSERT_MANY, params).scalars().all()
+
+def shas(db, fid):
+    """(original_sha256, anotada_sha256) o None si no existe."""
+    return db.execute(_SHAS, {"id": fid}).first()
+
+def set_annotations(db, fid, anotaciones_json):
+    db.execute(_SET_ANNOTATIONS, {"jn": anotaciones_json, "id": fid})
+
+def delete(db, fid):
+    db.execute(_DELETE, {"id": fid})
@@ -0,0 +1,64 @@
+# app/repo/precios.py
+# Tablas de precios de Cotizaciones. Toda escritura sube precios_version en la misma
+# transacción: así cada proceso sabe que su caché (app/cotizaciones.py) quedó vieja.
+from sqlalchemy import text
+
+_VERSION = text("SELECT version FROM precios_version WHERE id = 1")
+_BUMP = text("UPDATE precios_version SET version = version + 1 WHERE id = 1")
+
+_VIDRIOS = text("SELECT tipo, espesor_mm, precio_m2, minimo_m2 FROM precios_vidrio ORDER BY tipo, espesor_mm")
+_CARGOS = text("SELECT clave, descripcion, unidad, precio FROM precios_cargo ORDER BY clave")
+_REGLAS = text("SELECT clave, valor FROM precios_regla ORDER BY clave")
+
+_UPSERT_VIDRIO = text("""
+  INSERT INTO precios_vidrio (tipo, espesor_mm, precio_m2, minimo_m2)
+  VALUES (:tipo, :espesor, :precio, COALESCE(:minimo, 0))
+  ON CONFLICT (tipo, espesor_mm) DO UPDATE SET precio_m2 = excluded.precio_m2,
+                                               minimo_m2 = COALESCE(:minimo, precios_vidrio.minimo_m2)
+""")
+_DELETE_VIDRIO = text("DELETE FROM precios_vidrio WHERE tipo = :tipo AND espesor_mm = :espesor")
+
+_UPSERT_CARGO = text("""
+  INSERT INTO precios_cargo (clave, descripcion, unidad, precio)
+  VALUES (:clave, :descripcion, :unidad, :precio)
+  ON CONFLICT (clave) DO UPDATE SET descripcion = COALESCE(:descripcion, precios_cargo.descripcion),
+                                    unidad = excluded.unidad, precio = excluded.precio
+""")
+_DELETE_CARGO = text("DELETE FROM precios_cargo WHERE clave = :clave")
+
+_UPSERT_REGLA = text("""
+  INSERT INTO precios_regla (clave, valor) VALUES (:clave, :valor)
+  ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor
+""")
+
+def version(db):
+    return db.execute(_VERSION).scalar() or 0
+
+def load(db):
+    """(versión, vidrios, cargos, reglas) como listas de mappings."""
+    return (version(db),
+            db.execute(_VIDRIOS).mappings().all(),
+            db.execute(_CARGOS).mappings().all(),
+            db.execute(_REGLAS).mappings().all())
+
+def save(db, vidrios=(), cargos=(), reglas=None):
+    """Inserta o actualiza en lote; precio None borra la entrada y minimo/descripcion None
+    conservan el valor actual. Devuelve la nueva versión."""
+    upsert = [v for v in vidrios if v["precio_m2"] is not None]
+    delete = [v for v in vidrios if v["precio_m2"] is None]
+    if upsert:
+        db.execute(_UPSERT_VIDRIO, [{"tipo": v["tipo"], "espesor": v["espesor_mm"], "precio": v["precio_m2"],
+                                     "minimo": v.get("minimo_m2")} for v in upsert])
+    if delete:
+        db.execute(_DELETE_VIDRIO, [{"tipo": v["tipo"], "espesor": v["espesor_mm"]} for v in delete])
+    upsert = [c for c in cargos if c["precio"] is not None]
+    delete = [c for c in cargos if c["precio"] is None]
+    if upsert:
+        db.execute(_UPSERT_CARGO, [{"clave": c["clave"], "descripcion": c.get("descripcion"),
+                                    "unidad": c["unidad"], "precio": c["precio"]} for c in upsert])
+    if delete:
+        db.execute(_DELETE_CARGO, [{"clave": c["clave"]} for c in delete])
+    if reglas:
+        db.execute(_UPSERT_REGLA, [{"clave": k, "valor": v} for k, v in reglas.items()])
+    db.execute(_BUMP)
+    return version(db)
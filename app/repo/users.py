@@ -0,0 +1,44 @@
+# app/repo/users.py
+from datetime import datetime
+from sqlalchemy import text
+
+_BY_EMAIL = text("""
+  SELECT id, email, password_hash, first_name, last_name, company
+  FROM users WHERE email = :email
+""")
+
+# Una sola consulta para los dos UNIQUE (email y teléfono) del registro
+_TAKEN = text("""
+  SELECT email = :email AS email_taken, phone = :phone AS phone_taken
+  FROM users WHERE email = :email OR phone = :phone
+""")
+
+_INSERT = text("""
+  INSERT INTO users
+    (email, password_hash, first_name, last_name, address, phone, company, created_at)
+  VALUES
+    (:email, :pw, :fn, :ln, :addr, :phone, :company, :ts)
+""")
+
+_SET_PASSWORD = text("UPDATE users SET password_hash = :pw WHERE email = :email")
+
+def by_email(db, email):
+    """Fila del usuario (mapping) o None."""
+    return db.execute(_BY_EMAIL, {"email": email}).mappings().first()
+
+def taken(db, email, phone=None):
+    """(email_ocupado, telefono_ocupado)."""
+    email_taken = phone_taken = False
+    for row in db.execute(_TAKEN, {"email": email, "phone": phone or None}):
+        email_taken |= bool(row[0])
+        phone_taken |= bool(row[1])
+    return email_taken, phone_taken
+
+def create(db, email, password_hash, first_name, last_name, address=None, phone=None, company=None):
+    db.execute(_INSERT, dict(
+        email=email, pw=password_hash, fn=first_name, ln=last_name,
+        addr=address, phone=phone or None, company=company, ts=datetime.utcnow().isoformat()
+    ))
+
+def set_password_hash(db, email, password_hash):
+    db.execute(_SET_PASSWORD, {"email": email, "pw": password_hash})
@@ -0,0 +1,133 @@
+# app/search.py
+# Búsqueda de fotos por nombre, autor (creado_por) y texto de las etiquetas de anotaciones_json.
+#
+# Índice de texto completo en la tabla fotos_search:
+#   SQLite   -> tabla virtual FTS5 (rowid = fotos.id)
+#   Postgres -> (foto_id, doc tsvector) con índice GIN
+# El texto se normaliza en Python (minúsculas, sin acentos, solo letras/números) antes de
+# indexar y de consultar, así "lopez" encuentra "López" en los dos motores.
+#
+# Se mantiene al día en la misma transacción que el cambio (index_foto / unindex_foto en
+# medidas.new_post, annotate_save y delete). Reconstrucción completa:
+#   flask --app main medidas reindex-search
+import json, re, unicodedata
+from sqlalchemy import text
+
+MAX_TERMS = 8
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# ---------- normalización ----------
+def normalize(s):
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    return _NON_WORD.sub(" ", s).strip()
+
+def labels_text(anotaciones_json):
+    """Texto de las etiquetas; tolera JSON heredado o mal formado (se indexa vacío)."""
+    try:
+        shapes = json.loads(anotaciones_json) if anotaciones_json else []
+        return " ".join(str(s.get("label") or "") for s in shapes if isinstance(s, dict))
+    except (ValueError, TypeError, AttributeError):
+        return ""
+
+def match_expr(db, q):
+    """Expresión MATCH / tsquery para `q` (todas las palabras, por prefijo). None si q está vacío."""
+    terms = normalize(q).split()[:MAX_TERMS]
+    if not terms:
+        return None
+    if db.dialect.name == "postgresql":
+        return " & ".join(f"{t}:*" for t in terms)
+    return " AND ".join(f'"{t}"*' for t in terms)
+
+# ---------- índice ----------
+_SQL = {
+    "sqlite": {
+        "create": """
+          CREATE VIRTUAL TABLE IF NOT EXISTS fotos_search USING fts5(
+            nombre, creado_por, etiquetas, tokenize='unicode61 remove_diacritics 2'
+          )
+        """,
+        "delete": text("DELETE FROM fotos_search WHERE rowid = :id"),
+        "insert": text("""
+          INSERT INTO fotos_search (rowid, nombre, creado_por, etiquetas)
+          VALUES (:id, :nombre, :creado_por, :etiquetas)
+        """),
+        "prune": text("DELETE FROM fotos_search WHERE rowid NOT IN (SELECT id FROM fotos)"),
+    },
+    "postgresql": {
+        "create": """
+          CREATE TABLE IF NOT EXISTS fotos_search (
+            foto_id INTEGER PRIMARY KEY,
+            doc TSVECTOR NOT NULL
+          );
+          CREATE INDEX IF NOT EXISTS fotos_search_doc_idx ON fotos_search USING GIN (doc)
+        """,
+        "delete": text("DELETE FROM fotos_search WHERE foto_id = :id"),
+        "insert": text("""
+          INSERT INTO fotos_search (foto_id, doc)
+          VALUES (:id, setweight(to_tsvector('simple', :nombre), 'A')
+                    || setweight(to_tsvector('simple', :etiquetas), 'B')
+                    || setweight(to_tsvector('simple', :creado_por), 'C'))
+          ON CONFLICT (foto_id) DO UPDATE SET doc = excluded.doc
+        """),
+        "prune": text("DELETE FROM fotos_search WHERE foto_id NOT IN (SELECT id FROM fotos)"),
+    },
+}
+
+def _sql(db, key):
+    return _SQL[db.dialect.name][key]
+
+def create_index(db):
+    """DDL del índice (la usa la migración correspondiente en app/migrations.py)."""
+    for stmt in _sql(db, "create").split(";"):
+        if stmt.strip():
+            db.execute(text(stmt))
+
+def index_foto(db, fid, nombre, creado_por, anotaciones_json):
+    """Alta o actualización de una foto en el índice, dentro de la transacción `db`."""
+    params = {"id": fid, "nombre": normalize(nombre), "creado_por": normalize(creado_por),
+              "etiquetas": normalize(labels_text(anotaciones_json))}
+    if db.dialect.name == "sqlite":   # FTS5 no tiene upsert
+        db.execute(_sql(db, "delete"), {"id": fid})
+    db.execute(_sql(db, "insert"), params)
+
+def index_many(db, items):
+    """Como index_foto para varias fotos (executemany). items = [(id, nombre, creado_por, anotaciones_json)]."""
+    params = [{"id": fid, "nombre": normalize(nombre), "creado_por": normalize(by),
+               "etiquetas": normalize(labels_text(anot))} for fid, nombre, by, anot in items]
+    if not params:
+        return
+    if db.dialect.name == "sqlite":
+        db.execute(_sql(db, "delete"), [{"id": p["id"]} for p in params])
+    db.execute(_sql(db, "insert"), params)
+
+def unindex_foto(db, fid):
+    db.execute(_sql(db, "delete"), {"id": fid})
+
+def reindex(db, last_id=0, batch=500):
+    """Indexa un lote de fotos con id > last_id. Devuelve (cuántas, último id)."""
+    rows = db.execute(text("""
+      SELECT id, nombre, creado_por, anotaciones_json FROM fotos
+      WHERE id > :last ORDER BY id LIMIT :n
+    """), {"last": last_id, "n": batch}).fetchall()
+    for fid, nombre, creado_por, anot in rows:
+        index_foto(db, fid, nombre, creado_por, anot)
+    return len(rows), (rows[-1][0] if rows else last_id)
+
+def rebuild(engine, batch=500, progress=None):
+    """Reindexa todas las fotos en lotes (una transacción por lote) y quita entradas huérfanas.
+
+    No vacía el índice antes: la búsqueda sigue funcionando mientras corre. Devuelve cuántas fotos.
+    """
+    total, last_id = 0, 0
+    while True:
+        with engine.begin() as db:
+            n, last_id = reindex(db, last_id, batch)
+        if not n:
+            break
+        total += n
+        if progress:
+            progress(total, last_id)
+    with engine.begin() as db:
+        db.execute(_sql(db, "prune"))
+    return total
@@ -0,0 +1,67 @@
+# app/tasks.py
+# Trabajos en segundo plano de Medidas (ver app/jobs.py).
+# Todos son idempotentes: si se ejecutan dos veces (reintento, worker recuperado) el
+# resultado es el mismo.
+from sqlalchemy import text
+
+from app.db import get_db
+from app.jobs import task, enqueue
+from app.blobstore import get_store, gc_blobs, foto_bytes, GC_GRACE
+from app.render import parse_annotations, scale_annotations, dump_annotations, render_foto
+from app.thumbs import save_thumb
+from app.transcode import transcode
+from app.mediciones import sync_foto
+
+@task("medidas.process_upload")
+def process_upload(fid, raw_sha):
+    """Transcodifica la subida cruda, ajusta anotaciones y genera la miniatura."""
+    store = get_store()
+    with get_db() as db:   # inline en una petición: la conexión de la petición
+        row = db.execute(text("SELECT original_sha256 FROM fotos WHERE id=:id"), {"id": fid}).first()
+    if not row or row[0] != raw_sha:
+        return {"skipped": True}   # borrada o ya procesada
+
+    raw = store.get(raw_sha)
+    stored, _, scale = transcode(raw, "original")
+    sha, size = store.put(stored)
+    with get_db() as db:
+        # Leer y reescribir las anotaciones en la misma transacción con la fila bloqueada: un
+        # annotate_save concurrente espera a este COMMIT en vez de perderse (en SQLite la
+        # escritura ya es exclusiva)
+        lock = " FOR UPDATE" if db.dialect.name == "postgresql" else ""
+        row = db.execute(text(f"SELECT original_sha256, anotaciones_json FROM fotos WHERE id=:id{lock}"),
+                         {"id": fid}).first()
+        if not row or row[0] != raw_sha:
+            return {"skipped": True}
+        jn = row[1]
+        shapes = parse_annotations(jn) if jn else []
+        if scale < 1.0 and shapes:
+            shapes = scale_annotations(shapes, scale)
+        res = db.execute(text("""
+          UPDATE fotos SET original_sha256=:sha, original_size=:size, anotaciones_json=:jn
+          WHERE id=:id AND original_sha256=:raw
+        """), {"sha": sha, "size": size, "jn": dump_annotations(shapes) if shapes else None,
+               "id": fid, "raw": raw_sha})
+        if res.rowcount == 0:
+            return {"skipped": True}
+        if scale < 1.0 and shapes:
+            sync_foto(db, fid, shapes)   # cambian los px (y la calibración), no los mm
+        save_thumb(db, fid, render_foto(db, fid) if shapes else raw)
+    if sha != raw_sha:
+        # La subida cruda ya no se usa; se borra pasado el periodo de gracia de la GC
+        enqueue("blobs.gc", {"shas": [raw_sha]}, delay=GC_GRACE + 5)
+    return {"sha256": sha, "bytes_in": len(raw), "bytes_out": size}
+
+@task("medidas.refresh_thumb")
+def refresh_thumb(fid):
+    """Renderiza la versión anotada (queda en caché) y regenera la miniatura."""
+    with get_db() as db:
+        img = render_foto(db, fid) or foto_bytes(db, fid, "original")
+        if img:
+            save_thumb(db, fid, img)
+    return {"ok": bool(img)}
+
+@task("blobs.gc")
+def gc(shas):
+    with get_db() as db:
+        return {"removed": gc_blobs(db, shas)}
@@ -0,0 +1,62 @@
+# app/thumbs.py
+# Miniaturas para el listado de Medidas.
+# Se guardan aparte (tabla foto_thumbs) para que el listado nunca lea los PNG completos.
+import io, os, hashlib
+from PIL import Image
+from sqlalchemy import text
+
+from app.blobstore import foto_bytes
+from app.render import render_foto
+
+THUMB_MAX_PX  = int(os.environ.get("THUMB_MAX_PX", 320))     # lado mayor
+THUMB_QUALITY = int(os.environ.get("THUMB_QUALITY", 70))     # calidad JPEG
+THUMB_MIME    = "image/jpeg"
+
+def make_thumb(img_bytes):
+    """Devuelve (jpeg_bytes, ancho, alto) de una miniatura de img_bytes."""
+    with Image.open(io.BytesIO(img_bytes)) as im:
+        im.draft("RGB", (THUMB_MAX_PX, THUMB_MAX_PX))   # decodificación reducida si el formato lo permite
+        im = im.convert("RGB")
+        im.thumbnail((THUMB_MAX_PX, THUMB_MAX_PX), Image.LANCZOS)
+        out = io.BytesIO()
+        im.save(out, "JPEG", quality=THUMB_QUALITY, optimize=True, progressive=True)
+        return out.getvalue(), im.width, im.height
+
+def save_thumb(db, foto_id, img_bytes):
+    """Genera y guarda (upsert) la miniatura de una foto dentro de la transacción `db`."""
+    if not img_bytes:
+        return
+    data, w, h = make_thumb(img_bytes)
+    db.execute(text("""
+      INSERT INTO foto_thumbs (foto_id, mime, width, height, data, sha256)
+      VALUES (:id, :mime, :w, :h, :data, :sha)
+      ON CONFLICT (foto_id) DO UPDATE
+        SET mime=excluded.mime, width=excluded.width, height=excluded.height,
+            data=excluded.data, sha256=excluded.sha256
+    """), {"id": foto_id, "mime": THUMB_MIME, "w": w, "h": h, "data": data,
+           "sha": hashlib.sha256(data).hexdigest()})
+
+def delete_thumb(db, foto_id):
+    db.execute(text("DELETE FROM foto_thumbs WHERE foto_id=:id"), {"id": foto_id})
+
+def backfill_thumbs(engine, batch=25, rebuild=False):
+    """Crea miniaturas faltantes (o todas si rebuild) en lotes pequeños; devuelve cuántas."""
+    done, last_id = 0, 0
+    while True:
+        with engine.begin() as db:
+            ids = db.execute(text(f"""
+              SELECT f.id FROM fotos f
+              {"" if rebuild else "LEFT JOIN foto_thumbs t ON t.foto_id = f.id"}
+              WHERE f.id > :last {"" if rebuild else "AND t.foto_id IS NULL"}
+              ORDER BY f.id LIMIT :n
+            """), {"last": last_id, "n": batch}).scalars().all()
+            if not ids:
+                return done
+            for fid in ids:
+                # un blob a la vez para no tener el lote completo en memoria
+                img = (render_foto(db, fid) or foto_bytes(db, fid, "anotada")
+                       or foto_bytes(db, fid, "original"))
+                if img:
+                    save_thumb(db, fid, img)
+                    done += 1
+            last_id = ids[-1]
@@ -0,0 +1,142 @@
+# app/transcode.py
+# Transcodificación de imágenes antes de guardarlas.
+# Las capturas llegan como PNG sin pérdida (canvas); para fotos de cámara eso es 5-10x
+# más grande que un WebP/JPEG con pérdida de buena calidad.
+#
+# Política por variante:
+#   original -> WebP con pérdida (JPEG si Pillow no trae WebP), lado mayor <= TRANSCODE_MAX_PX
+#   anotada  -> igual pero con más calidad (las líneas y etiquetas se ven nítidas);
+#               sin pérdida solo si la imagen es "line art" (pocos colores: diagramas, capturas)
+# Siempre se descartan los metadatos (EXIF/GPS), aplicando antes la orientación.
+import io, os
+from PIL import Image, ImageOps, features
+
+MAX_SIDE  = int(os.environ.get("TRANSCODE_MAX_PX", 2560))
+HAS_WEBP  = features.check("webp")
+LINE_ART_MAX_COLORS = 256
+
+POLICIES = {
+    "original": {"quality": int(os.environ.get("TRANSCODE_QUALITY", 80))},
+    "anotada":  {"quality": int(os.environ.get("TRANSCODE_QUALITY_ANOTADA", 90))},
+}
+
+# ---------- tipos ----------
+def sniff_mime(head):
+    """MIME a partir de los primeros bytes (12 bastan)."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+ACCEPTED_MIMES = {"image/png", "image/jpeg", "image/webp"}
+
+# ---------- codificación ----------
+def is_line_art(im):
+    # getcolors devuelve None si hay más de maxcolors colores distintos
+    small = im.copy()
+    small.thumbnail((256, 256))
+    return small.getcolors(maxcolors=LINE_ART_MAX_COLORS) is not None
+
+def encode(im, variant):
+    """Codifica una imagen PIL según la política de la variante. Devuelve (bytes, mime)."""
+    q = POLICIES[variant]["quality"]
+    out = io.BytesIO()
+    if is_line_art(im):
+        if HAS_WEBP:
+            im.save(out, "WEBP", lossless=True, method=4)
+            return out.getvalue(), "image/webp"
+        im.save(out, "PNG", optimize=True)
+        return out.getvalue(), "image/png"
+    if HAS_WEBP:
+        im.save(out, "WEBP", quality=q, method=4)
+        return out.getvalue(), "image/webp"
+    im.save(out, "JPEG", quality=q, optimize=True, progressive=True)
+    return out.getvalue(), "image/jpeg"
+
+def transcode(data, variant="original"):
+    """(bytes, mime, escala). `escala` < 1 si se redujo la resolución (para ajustar anotaciones).
+
+    Si el archivo viene sin metadatos, no hay que reducirlo y recodificar no lo achica, se
+    deja igual (también los PNG: un PNG bien comprimido puede pesar menos que su WebP).
+    """
+    src_mime = sniff_mime(data[:12])
+    with Image.open(io.BytesIO(data)) as im:
+        has_meta = any(k in im.info for k in ("exif", "xmp", "XML:com.adobe.xmp"))
+        im = ImageOps.exif_transpose(im)        # respeta la orientación antes de tirar el EXIF
+        im = im.convert("RGB")
+    w, h = im.size
+    scale = min(1.0, MAX_SIDE / max(w, h))
+    if scale < 1.0:
+        im = im.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS)
+    out, mime = encode(im, variant)
+    if scale == 1.0 and not has_meta and len(out) >= len(data):
+        return data, src_mime, 1.0
+    return out, mime, scale
+
+# ---------- recompresión de lo ya guardado ----------
+def recompress_fotos(engine, batch=20, dry_run=False, progress=None):
+    """Recodifica original/anotada de las fotos en el blobstore por lotes (keyset sobre id).
+
+    Solo reemplaza un blob si el resultado es más chico. Devuelve estadísticas de bytes.
+    """
+    from sqlalchemy import text
+    from app.blobstore import get_store, gc_blobs
+    from app.render import parse_annotations, scale_annotations, dump_annotations
+    from app.mediciones import sync_foto
+
+    store = get_store()
+    st = {"fotos": 0, "converted": 0, "bytes_before": 0, "bytes_after": 0,
+          "skipped_legacy": 0, "last_id": 0}
+    while True:
+        old = []
+        with engine.begin() as db:
+            rows = db.execute(text("""
+              SELECT id, original_sha256, anotada_sha256, anotaciones_json,
+                     original_png IS NOT NULL OR anotada_png IS NOT NULL
+              FROM fotos WHERE id > :last ORDER BY id LIMIT :n
+            """), {"last": st["last_id"], "n": batch}).fetchall()
+            if not rows:
+                return st
+            for fid, orig_sha, anot_sha, anot_json, legacy in rows:
+                st["fotos"] += 1
+                if legacy:
+                    st["skipped_legacy"] += 1
+                    continue
+                for variant, sha in (("original", orig_sha), ("anotada", anot_sha)):
+                    if not sha:
+                        continue
+                    try:
+                        data = store.get(sha)
+                    except FileNotFoundError:
+                        continue
+                    new, _, scale = transcode(data, variant)
+                    st["bytes_before"] += len(data)
+                    if new is data or len(new) >= len(data):
+                        st["bytes_after"] += len(data)
+                        continue
+                    st["bytes_after"] += len(new)
+                    st["converted"] += 1
+                    if dry_run:
+                        continue
+                    new_sha, new_size = store.put(new)
+                    params = {"sha": new_sha, "size": new_size, "id": fid}
+                    extra = ""
+                    if variant == "original" and scale < 1.0 and anot_json:
+                        # las anotaciones están en píxeles de la foto: se reescalan con ella
+                        params["jn"] = dump_annotations(scale_annotations(parse_annotations(anot_json), scale))
+                        extra = ", anotaciones_json=:jn"
+                    db.execute(text(f"""
+                      UPDATE fotos SET {variant}_sha256=:sha, {variant}_size=:size{extra} WHERE id=:id
+                    """), params)
+                    if extra:
+                        sync_foto(db, fid)
+                    old.append(sha)
+            st["last_id"] = rows[-1][0]
+        if old:
+            with engine.connect() as db:
+                gc_blobs(db, old)   # después del commit
+        if progress:
+            progress(st)
@@ -0,0 +1,137 @@
+# app/uploads.py
+# Subidas de imágenes: binario (multipart o cuerpo crudo) con límite de tamaño,
+# y subidas reanudables por trozos para conexiones móviles inestables.
+#
+# Protocolo reanudable (ver rutas en blueprints/medidas.py):
+#   POST /medidas/uploads        {"size": N}           -> {"id", "offset": 0, "chunk"}
+#   PUT  /medidas/uploads/<id>   Upload-Offset: k      -> {"offset": k + len(body)}
+#   GET  /medidas/uploads/<id>                         -> {"offset", "size"}   (para reanudar)
+# Cuando offset == size, el formulario se envía con upload_id=<id> en lugar del archivo.
+import os, re, json, time, uuid, base64, fcntl, tempfile
+
+from app.transcode import sniff_mime, ACCEPTED_MIMES
+
+MAX_IMAGE_BYTES = int(os.environ.get("MAX_IMAGE_BYTES", 25 * 1024 * 1024))
+CHUNK_BYTES     = int(os.environ.get("UPLOAD_CHUNK_BYTES", 512 * 1024))
+UPLOAD_DIR      = os.environ.get("UPLOAD_DIR") or os.path.join(tempfile.gettempdir(), "vidrio-uploads")
+UPLOAD_TTL      = 24 * 3600   # subidas abandonadas se borran después de un día
+COPY_BUF        = 64 * 1024
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+class UploadError(Exception):
+    def __init__(self, msg, status=400):
+        super().__init__(msg)
+        self.status = status
+
+# ---------- validación ----------
+def check_image(data):
+    if not data:
+        raise UploadError("No se recibió imagen.")
+    if sniff_mime(data[:12]) not in ACCEPTED_MIMES:
+        raise UploadError("La imagen debe ser PNG, JPEG o WebP.", 415)
+    return data
+
+def read_image(stream, limit=MAX_IMAGE_BYTES):
+    """Lee un stream por bloques sin pasar de `limit` bytes."""
+    chunks, n = [], 0
+    while True:
+        buf = stream.read(COPY_BUF)
+        if not buf:
+            break
+        n += len(buf)
+        if n > limit:
+            raise UploadError("La imagen excede el tamaño máximo.", 413)
+        chunks.append(buf)
+    return check_image(b"".join(chunks))
+
+def decode_dataurl(dataurl, limit=MAX_IMAGE_BYTES):
+    """Formato anterior: data:image/png;base64,... en un campo de formulario."""
+    if not dataurl.startswith("data:image/png;base64,"):
+        raise UploadError("No se recibió imagen.")
+    b64 = dataurl.split(",", 1)[1]
+    if len(b64) * 3 // 4 > limit:
+        raise UploadError("La imagen excede el tamaño máximo.", 413)
+    return check_image(base64.b64decode(b64))
+
+# ---------- subidas reanudables ----------
+def _paths(uid):
+    if not _ID_RE.match(uid or ""):
+        raise UploadError("Subida inválida.", 404)
+    return os.path.join(UPLOAD_DIR, uid + ".json"), os.path.join(UPLOAD_DIR, uid + ".part")
+
+def _meta(uid, user):
+    meta_p, part_p = _paths(uid)
+    try:
+        with open(meta_p) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise UploadError("Subida no encontrada o expirada.", 404)
+    if meta["user"] != user:
+        raise UploadError("Subida no encontrada o expirada.", 404)
+    return meta, part_p
+
+def cleanup_stale(now=None):
+    now = now or time.time()
+    try:
+        names = os.listdir(UPLOAD_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        p = os.path.join(UPLOAD_DIR, name)
+        try:
+            if now - os.path.getmtime(p) > UPLOAD_TTL:
+                os.remove(p)
+        except OSError:
+            pass
+
+def start(user, size):
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("Tamaño inválido.")
+    if size > MAX_IMAGE_BYTES:
+        raise UploadError("La imagen excede el tamaño máximo.", 413)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    cleanup_stale()
+    uid = uuid.uuid4().hex
+    meta_p, part_p = _paths(uid)
+    open(part_p, "wb").close()
+    with open(meta_p, "w") as f:
+        json.dump({"user": user, "size": size, "created": time.time()}, f)
+    return {"id": uid, "offset": 0, "size": size, "chunk": CHUNK_BYTES}
+
+def status(uid, user):
+    meta, part_p = _meta(uid, user)
+    return {"id": uid, "offset": os.path.getsize(part_p), "size": meta["size"]}
+
+def append(uid, user, offset, stream):
+    """Agrega el cuerpo de la petición en `offset`. Devuelve el nuevo offset."""
+    meta, part_p = _meta(uid, user)
+    with open(part_p, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)   # dos PUT del mismo trozo (reintento) no se mezclan
+        have = f.seek(0, os.SEEK_END)
+        if offset != have:
+            # El cliente debe consultar el estado (GET) y reanudar desde ahí
+            raise UploadError("Offset incorrecto; consulta el estado de la subida.", 409)
+        room = meta["size"] - have
+        while True:
+            buf = stream.read(COPY_BUF)
+            if not buf:
+                break
+            if len(buf) > room:
+                f.truncate(have)
+                raise UploadError("El trozo excede el tamaño declarado.", 413)
+            f.write(buf)
+            room -= len(buf)
+        return meta["size"] - room
+
+def take(uid, user):
+    """Devuelve los bytes de una subida completa y la elimina."""
+    meta, part_p = _meta(uid, user)
+    if os.path.getsize(part_p) != meta["size"]:
+        raise UploadError("La subida está incompleta.", 409)
+    with open(part_p, "rb") as f:
+        data = f.read()
+    for p in _paths(uid):
+        try: os.remove(p)
+        except OSError: pass
+    return check_image(data)
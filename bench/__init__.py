@@ -0,0 +1,17 @@
+# bench/
+# Benchmarks reproducibles de la app (sin red: SQLite temporal o un Postgres local).
+#
+#   python -m bench run                                   # siembra + test client, compara con bench/baseline.json
+#   python -m bench run --mode both --concurrency 8       # además bajo gunicorn con clientes concurrentes
+#   python -m bench run --mode gunicorn --gunicorn-mode sync   # otro modo de gunicorn.conf.py
+#   python -m bench run --database-url postgresql+psycopg://localhost/vidrio_bench
+#   python -m bench run --save-baseline                   # guarda el resultado como nueva línea base
+#   python -m bench compare bench/results/latest.json bench/baseline.json
+#   python -m bench cortes                                # optimizador de cortes vs first-fit (sin base)
+#
+# Cada escenario (ver bench/run.py: SCENARIOS) reporta p50/p95/p99, throughput, bytes por
+# respuesta y errores; cada modo, el pico de RSS. La comparación falla (exit 1) si algo
+# empeora más que --tolerance respecto a la línea base, y con exit 2 si no hay línea base
+# (los números dependen de la máquina: cada entorno guarda la suya con --save-baseline).
+#
+# Con Postgres usa una base dedicada y vacía: la siembra agrega usuarios y fotos.
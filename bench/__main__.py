@@ -0,0 +1,158 @@
+# python -m bench run | compare | cortes   (ver bench/__init__.py)
+import os, sys, json, argparse, platform, subprocess, tempfile
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(HERE, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+def _size(s):
+    w, h = s.lower().split("x")
+    return int(w), int(h)
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def cmd_run(args):
+    # La configuración de app/ se lee al importar: el entorno va antes de cualquier import de la app
+    workdir = tempfile.mkdtemp(prefix="vidrio-bench-")
+    env = os.environ.copy()
+    env.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "BLOB_DIR": args.blob_dir or os.path.join(workdir, "blobs"),
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "JOBS_INLINE": "0",   # el upload mide la petición; process_upload queda encolado
+    })
+    os.environ.update(env, JOBS_INLINE="1")   # la siembra sí procesa (miniaturas, WebP)
+
+    from app.migrations import upgrade
+    from bench.seed import seed
+    from bench.run import SCENARIOS, run_inprocess, run_server, GUNICORN_CMD
+    from bench.compare import compare, load
+
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        sys.exit(f"escenarios desconocidos: {', '.join(unknown)} (hay: {', '.join(SCENARIOS)})")
+
+    print(f"Base: {env['DATABASE_URL']}")
+    upgrade(echo=lambda msg: None)
+    print(f"Sembrando {args.users} usuarios, {args.photos} fotos de {args.photo_size}…")
+    ctx = seed(args.users, args.photos, _size(args.photo_size), rng_seed=args.seed)
+    import app.jobs
+    app.jobs.JOBS_INLINE = False
+
+    result = {
+        "meta": {"created_at": datetime.utcnow().isoformat(timespec="seconds"), "git": _git_rev(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "database": env["DATABASE_URL"].split(":", 1)[0], "users": args.users,
+                 "photos": args.photos, "photo_size": args.photo_size, "requests": args.requests,
+                 "warmup": args.warmup, "seed": args.seed},
+        "modes": {},
+    }
+    if args.mode in ("inprocess", "both"):
+        print("[inprocess]")
+        result["modes"]["inprocess"] = run_inprocess(ctx, scenarios, args.requests, args.warmup)
+    if args.mode in ("gunicorn", "both"):
+        print(f"[gunicorn] {args.gunicorn_mode}, {args.workers} workers x {args.threads} hilos, "
+              f"{args.concurrency} clientes")
+        result["modes"]["gunicorn"] = run_server(ctx, scenarios, args.requests, args.warmup, args.concurrency,
+                                                 env, args.server_cmd or GUNICORN_CMD, args.workers, args.threads,
+                                                 args.gunicorn_mode)
+
+    for path in [args.out] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"Guardado: {path}")
+    if args.save_baseline or args.no_compare:
+        return 0
+    if not os.path.exists(args.baseline):
+        return _no_baseline(args.baseline)
+    regressions = compare(result, load(args.baseline), args.tolerance)
+    return _verdict(regressions)
+
+def cmd_compare(args):
+    from bench.compare import compare, load
+    if not os.path.exists(args.baseline):
+        return _no_baseline(args.baseline)
+    return _verdict(compare(load(args.result), load(args.baseline), args.tolerance))
+
+def _no_baseline(path):
+    # Sin línea base no hay comparación: fallar, no pasar en silencio como "sin regresiones"
+    print(f"ERROR: no existe la línea base {path}; no se comparó nada.\n"
+          "  Genera una en esta máquina con: python -m bench run --save-baseline\n"
+          "  (o usa --no-compare para solo medir)", file=sys.stderr)
+    return 2
+
+def cmd_cortes(args):
+    from bench.cortes import run
+    print(f"Cortes: plan ({args.time_budget} s por pedido) vs first-fit, kerf {args.kerf} mm")
+    result = {"meta": {"created_at": datetime.utcnow().isoformat(timespec="seconds"), "git": _git_rev(),
+                       "python": platform.python_version(), "time_budget": args.time_budget,
+                       "kerf": args.kerf, "seed": args.seed},
+              "orders": run(time_budget=args.time_budget, kerf=args.kerf, rng_seed=args.seed)}
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"Guardado: {args.out}")
+    return 0
+
+def _verdict(regressions):
+    if regressions:
+        print("Regresiones:\n  " + "\n  ".join(regressions))
+        return 1
+    print("Sin regresiones.")
+    return 0
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench", description="Benchmarks de vidrio-mexicano.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="Siembra una base, corre los escenarios y compara con la línea base.")
+    r.add_argument("--database-url", help="Postgres local (base vacía). Default: SQLite temporal.")
+    r.add_argument("--blob-dir", help="Default: directorio temporal.")
+    r.add_argument("--users", type=int, default=5)
+    r.add_argument("--photos", type=int, default=100, help="Cada foto pasa por process_upload (WebP): ~1 s.")
+    r.add_argument("--photo-size", default="1600x1200")
+    r.add_argument("--seed", type=int, default=1, help="Semilla de los datos generados.")
+    r.add_argument("--mode", choices=("inprocess", "gunicorn", "both"), default="inprocess")
+    r.add_argument("--scenarios", help="Lista separada por comas (default: todos).")
+    r.add_argument("--requests", type=int, default=200, help="Peticiones medidas por escenario.")
+    r.add_argument("--warmup", type=int, default=10)
+    r.add_argument("--concurrency", type=int, default=8, help="Clientes simultáneos (modo gunicorn).")
+    r.add_argument("--workers", type=int, default=2)
+    r.add_argument("--threads", type=int, default=4, help="Hilos por worker (modo gthread).")
+    r.add_argument("--gunicorn-mode", choices=("gthread", "sync", "gevent"), default="gthread",
+                   help="GUNICORN_MODE de gunicorn.conf.py (gevent necesita --database-url de Postgres).")
+    r.add_argument("--server-cmd", help="Comando del servidor con {port} (y opcionalmente {workers}, {threads}).")
+    r.add_argument("--out", default=DEFAULT_OUT)
+    r.add_argument("--baseline", default=DEFAULT_BASELINE)
+    r.add_argument("--save-baseline", action="store_true", help="Guarda también este resultado como línea base.")
+    r.add_argument("--no-compare", action="store_true", help="Solo mide; no compara con la línea base.")
+    r.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo permitido (0.2 = 20%%).")
+    r.set_defaults(fn=cmd_run)
+
+    c = sub.add_parser("compare", help="Compara dos resultados JSON.")
+    c.add_argument("result")
+    c.add_argument("baseline", nargs="?", default=DEFAULT_BASELINE)
+    c.add_argument("--tolerance", type=float, default=0.2)
+    c.set_defaults(fn=cmd_compare)
+
+    k = sub.add_parser("cortes", help="Optimizador de cortes contra first-fit en pedidos sintéticos.")
+    k.add_argument("--time-budget", type=float, default=2.0, help="Segundos por pedido para plan().")
+    k.add_argument("--kerf", type=float, default=0)
+    k.add_argument("--seed", type=int, default=1)
+    k.add_argument("--out", help="Guarda el resultado en JSON.")
+    k.set_defaults(fn=cmd_cortes)
+
+    args = p.parse_args(argv)
+    return args.fn(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# bench/compare.py
+# Comparación de un resultado contra la línea base. Una métrica empeora si pasa la
+# tolerancia relativa Y la holgura absoluta (para que 0.3 ms -> 0.4 ms no cuente).
+import json
+
+# métrica -> (más alto es peor, holgura absoluta)
+CHECKS = {
+    "p50_ms":             (True,  1.0),
+    "p95_ms":             (True,  2.0),
+    "rps":                (False, 1.0),
+    "bytes_per_response": (True,  256),
+    "errors":             (True,  0),
+}
+RSS_SLACK = 16 * 1024 * 1024
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def _worse(cur, base, higher_is_worse, slack, tolerance):
+    if cur is None or base is None:
+        return False
+    delta = cur - base if higher_is_worse else base - cur
+    return delta > slack and delta > abs(base) * tolerance
+
+def compare(current, baseline, tolerance=0.2, echo=print):
+    """Imprime la comparación; devuelve la lista de regresiones (vacía = OK)."""
+    regressions = []
+    for mode, cur_mode in current["modes"].items():
+        base_mode = baseline.get("modes", {}).get(mode)
+        if not base_mode:
+            echo(f"[{mode}] sin línea base")
+            continue
+        echo(f"[{mode}]")
+        for name, cur in cur_mode["scenarios"].items():
+            base = base_mode["scenarios"].get(name)
+            if not base:
+                echo(f"  {name:16s} (nuevo)")
+                continue
+            cells = []
+            for metric, (higher_is_worse, slack) in CHECKS.items():
+                c, b = cur.get(metric), base.get(metric)
+                bad = _worse(c, b, higher_is_worse, slack, tolerance)
+                if bad:
+                    regressions.append(f"{mode}/{name}: {metric} {b} -> {c}")
+                pct = f"{(c - b) / b * 100:+.0f}%" if c is not None and b else "  —"
+                cells.append(f"{metric} {pct}{' ✗' if bad else ''}")
+            echo(f"  {name:16s} " + "  ".join(cells))
+        c, b = cur_mode.get("peak_rss_bytes"), base_mode.get("peak_rss_bytes")
+        if _worse(c, b, True, RSS_SLACK, tolerance):
+            regressions.append(f"{mode}: peak_rss_bytes {b} -> {c}")
+        if c and b:
+            echo(f"  {'peak RSS':16s} {b / 2**20:.0f} MB -> {c / 2**20:.0f} MB")
+    return regressions
@@ -0,0 +1,50 @@
+# bench/cortes.py
+# Optimizador de cortes (app/cortes.py: plan) contra la referencia ingenua (first_fit) en
+# pedidos sintéticos reproducibles: medidas típicas de ventanería, pocas o muchas distintas.
+# No usa base de datos ni la app web.
+import random, time
+
+from app.cortes import plan, first_fit, validate, CorteError
+
+# (nombre, piezas totales, medidas distintas)
+ORDERS = [
+    ("chico", 20, 6),
+    ("obra", 100, 12),
+    ("edificio", 500, 30),
+    ("surtido", 2000, 400),
+]
+
+def order(total, kinds, rng):
+    """Pedido de `total` piezas repartidas en `kinds` medidas (mm, múltiplos de 5)."""
+    sizes = [(rng.randrange(200, 1800, 5), rng.randrange(200, 2200, 5)) for _ in range(kinds)]
+    counts = [1] * kinds
+    for _ in range(total - kinds):
+        counts[rng.randrange(kinds)] += 1
+    return [{"ref": f"P{i}", "ancho": w, "alto": h, "cantidad": n}
+            for i, ((w, h), n) in enumerate(zip(sizes, counts))]
+
+def _row(result, seconds):
+    return {"hojas": result["total_hojas"], "area_hojas_m2": result["area_hojas_m2"],
+            "desperdicio_pct": result["desperdicio_pct"], "sin_colocar": len(result["sin_colocar"]),
+            "segundos": round(seconds, 3)}
+
+def run(orders=ORDERS, time_budget=2.0, kerf=0, rng_seed=1, echo=print):
+    """{nombre: {"piezas", "medidas", "plan": {...}, "first_fit": {...}}}."""
+    out = {}
+    for name, total, kinds in orders:
+        pieces = order(total, kinds, random.Random(f"{rng_seed}:{name}"))
+        row = {"piezas": total, "medidas": kinds}
+        for label, fn in (("plan", lambda: plan(pieces, kerf=kerf, time_budget=time_budget, seed=rng_seed)),
+                          ("first_fit", lambda: first_fit(pieces, kerf=kerf))):
+            t0 = time.perf_counter()
+            result = fn()
+            row[label] = _row(result, time.perf_counter() - t0)
+            problems = validate(result, kerf)
+            if problems:
+                raise CorteError(f"{name}/{label}: plan inválido: {problems[0]}")
+        out[name] = row
+        p, f = row["plan"], row["first_fit"]
+        echo(f"  {name:9s} {total:5d} piezas/{kinds:<4d} plan {p['hojas']:4d} hojas {p['area_hojas_m2']:9.2f} m²"
+             f" {p['desperdicio_pct']:5.1f}% {p['segundos']:6.2f} s  |  first-fit {f['hojas']:4d} hojas"
+             f" {f['area_hojas_m2']:9.2f} m² {f['desperdicio_pct']:5.1f}% {f['segundos']:6.2f} s")
+    return out
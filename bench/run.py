@@ -0,0 +1,225 @@
+# bench/run.py
+# Escenarios y los dos modos de ejecución:
+#   inprocess  test client de Flask, secuencial: costo de la app sin red ni servidor
+#   gunicorn   servidor real en un puerto local + `concurrency` clientes HTTP (keep-alive)
+# Las peticiones se arman como bytes (urlencoded / multipart) para que los dos modos
+# manden exactamente lo mismo.
+import os, re, sys, time, uuid, shlex, socket, threading, subprocess
+import http.client
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.seed import PASSWORD
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Workers, hilos y modo van por entorno a gunicorn.conf.py: se mide la configuración de producción
+GUNICORN_CMD = "gunicorn -c gunicorn.conf.py main:app --bind 127.0.0.1:{port}"
+
+# ---------- peticiones ----------
+def form(fields):
+    return urlencode(fields).encode(), {"Content-Type": "application/x-www-form-urlencoded"}
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for k, v in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode())
+    for k, (filename, data, mime) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"; filename="{filename}"\r\n'
+                     f"Content-Type: {mime}\r\n\r\n".encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+# Cada escenario: (autenticado, fn(ctx, i) -> (método, ruta, cuerpo, headers), status esperados)
+def _login(ctx, i):
+    body, headers = form({"email": ctx["users"][i % len(ctx["users"])], "password": PASSWORD})
+    return "POST", "/login", body, headers
+
+def _upload(ctx, i):
+    body, headers = multipart(
+        {"nombre": f"Bench {i}", "anotaciones": '[{"type":"dim","x1":10,"y1":10,"x2":400,"y2":10,"label":"1200 mm"}]'},
+        {"foto": ("foto.jpg", ctx["upload"], "image/jpeg")})
+    return "POST", "/medidas/new", body, dict(headers, Accept="application/json")
+
+def _foto(ctx, i):
+    return ctx["fotos"][(i * 7919) % len(ctx["fotos"])]   # recorre ids sin patrón secuencial
+
+SCENARIOS = {
+    "login_page":     (False, lambda ctx, i: ("GET", "/login", None, {}), {200}),
+    "login":          (False, _login, {302}),
+    "medidas_list":   (True,  lambda ctx, i: ("GET", "/medidas/", None, {}), {200}),
+    "medidas_page":   (True,  lambda ctx, i: ("GET", f"/medidas/page?before={_foto(ctx, i)}", None, {}), {200}),
+    "medidas_search": (True,  lambda ctx, i: ("GET", f"/medidas/page?q=obra+{i % 17}", None, {}), {200}),
+    "medidas_view":   (True,  lambda ctx, i: ("GET", f"/medidas/{_foto(ctx, i)}", None, {}), {200}),
+    "image_original": (True,  lambda ctx, i: ("GET", f"/medidas/{_foto(ctx, i)}/image/original", None, {}), {200}),
+    "image_thumb":    (True,  lambda ctx, i: ("GET", f"/medidas/{_foto(ctx, i)}/image/thumb", None, {}), {200}),
+    "upload":         (True,  _upload, {200}),
+    "cotizar_300":    (True,  lambda ctx, i: ("POST", "/cotizaciones/api/cotizar", ctx["cotizacion"],
+                                              {"Content-Type": "application/json"}), {200}),
+}
+
+# ---------- estadísticas ----------
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+def summarize(samples, wall):
+    """samples = [(segundos, bytes, ok)]."""
+    lat = sorted(s[0] * 1000 for s in samples)
+    ok = [s for s in samples if s[2]]
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "p50_ms": round(percentile(lat, 50), 3) if lat else None,
+        "p95_ms": round(percentile(lat, 95), 3) if lat else None,
+        "p99_ms": round(percentile(lat, 99), 3) if lat else None,
+        "rps": round(len(samples) / wall, 2) if wall else None,
+        "bytes_per_response": round(sum(s[1] for s in ok) / len(ok)) if ok else None,
+    }
+
+# ---------- modo: test client ----------
+def run_inprocess(ctx, scenarios, requests, warmup, echo=print):
+    from main import app
+    from app.metrics import rss_bytes
+
+    anon = app.test_client()
+    auth = app.test_client()
+    body, headers = _login(ctx, 0)[2:]
+    rv = auth.post("/login", data=body, headers=headers)
+    if rv.status_code != 302:
+        raise RuntimeError(f"login falló ({rv.status_code})")
+
+    out, peak = {}, rss_bytes()
+    for name in scenarios:
+        needs_auth, build, expected = SCENARIOS[name]
+        client = auth if needs_auth else anon
+        samples = []
+        for i in range(warmup + requests):
+            method, path, body, headers = build(ctx, i)
+            t0 = time.perf_counter()
+            rv = client.open(path, method=method, data=body, headers=headers)
+            data = rv.get_data()
+            dt = time.perf_counter() - t0
+            if i >= warmup:
+                samples.append((dt, len(data), rv.status_code in expected))
+            peak = max(peak, rss_bytes())
+        out[name] = summarize(samples, sum(s[0] for s in samples))
+        echo(_line(name, out[name]))
+    return {"scenarios": out, "peak_rss_bytes": peak}
+
+# ---------- modo: gunicorn ----------
+class _Client:
+    """Una conexión keep-alive con la cookie de sesión de un usuario."""
+    def __init__(self, port, ctx=None, user=0):
+        self.port, self.cookie = port, None
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        if ctx is not None:
+            body, headers = _login(ctx, user)[2:]
+            status, _, resp = self.request("POST", "/login", body, headers)
+            cookie = SimpleCookie(resp.getheader("Set-Cookie") or "")
+            if status != 302 or "session" not in cookie:
+                raise RuntimeError(f"login falló ({status})")
+            self.cookie = f"session={cookie['session'].value}"
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            return resp.status, resp.read(), resp
+        except (OSError, http.client.HTTPException):
+            self.conn.close()   # se reconecta en la siguiente petición
+            return None, b"", None
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _proc_status(pid, field):
+    """kB de /proc/<pid>/status (VmHWM = pico de RSS) en bytes, o None fuera de Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            m = re.search(rf"^{field}:\s+(\d+) kB", f.read(), re.M)
+        return int(m.group(1)) * 1024 if m else None
+    except OSError:
+        return None
+
+def _children(pid):
+    kids = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        kids.append(int(entry))
+            except (OSError, ValueError, IndexError):
+                pass
+    return kids
+
+def start_server(cmd, env, workers, threads, timeout=30):
+    port = _free_port()
+    args = shlex.split(cmd.format(port=port, workers=workers, threads=threads))
+    proc = subprocess.Popen(args, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=sys.stderr)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"el servidor terminó al arrancar: {' '.join(args)}")
+        status, _, _ = _Client(port).request("GET", "/login")
+        if status == 200:
+            return proc, port
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("el servidor no respondió a tiempo")
+
+def run_server(ctx, scenarios, requests, warmup, concurrency, env, cmd=GUNICORN_CMD,
+               workers=2, threads=4, mode="gthread", echo=print):
+    env = dict(env, GUNICORN_MODE=mode, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads))
+    proc, port = start_server(cmd, env, workers, threads)
+    try:
+        out = {}
+        anon = [_Client(port) for _ in range(concurrency)]
+        auth = [_Client(port, ctx, user=n) for n in range(concurrency)]
+        for name in scenarios:
+            needs_auth, build, expected = SCENARIOS[name]
+            clients = auth if needs_auth else anon
+            for i in range(warmup):
+                clients[i % concurrency].request(*build(ctx, i))
+            counter, lock, samples = iter(range(warmup, warmup + requests)), threading.Lock(), []
+
+            def worker(client):
+                while True:
+                    with lock:
+                        i = next(counter, None)
+                    if i is None:
+                        return
+                    t0 = time.perf_counter()
+                    status, data, _ = client.request(*build(ctx, i))
+                    dt = time.perf_counter() - t0
+                    with lock:
+                        samples.append((dt, len(data), status in expected))
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                list(pool.map(worker, clients))
+            out[name] = summarize(samples, time.perf_counter() - t0)
+            echo(_line(name, out[name]))
+        pids = _children(proc.pid) or [proc.pid]   # sin workers hijos (p. ej. flask run): el proceso mismo
+        workers_hwm = [v for v in (_proc_status(p, "VmHWM") for p in pids) if v]
+        return {"scenarios": out, "peak_rss_bytes": max(workers_hwm) if workers_hwm else None,
+                "workers": workers, "threads": threads, "mode": mode, "concurrency": concurrency}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def _line(name, r):
+    return (f"  {name:16s} p50 {r['p50_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms"
+            f"  {r['rps']:>8.1f} req/s  {r['bytes_per_response'] or 0:>9d} B  errores {r['errors']}")
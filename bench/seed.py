@@ -0,0 +1,93 @@
+# bench/seed.py
+# Datos de prueba: usuarios y fotos con imágenes de tamaño real (JPEG de cámara con ruido,
+# no colores planos que comprimen a nada) y anotaciones. Las fotos pasan por el mismo camino
+# que una importación (app/importer.py): blobstore, índice, mediciones y process_upload.
+import io, json, random
+from PIL import Image, ImageDraw
+
+PASSWORD = "bench-password"
+
+def user_email(i):
+    return f"bench{i}@vidrio.test"
+
+def photo(rng, size=(1600, 1200), quality=88):
+    """JPEG parecido a una foto de celular: degradado + ruido + formas."""
+    w, h = size
+    base = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+    noise = Image.effect_noise((w, h), rng.uniform(20, 40)).convert("RGB")
+    img = Image.blend(base, noise, 0.35)
+    draw = ImageDraw.Draw(img)
+    for _ in range(rng.randint(3, 8)):
+        x, y = rng.randrange(w), rng.randrange(h)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + rng.randint(40, w // 3), y + rng.randint(40, h // 3)], outline=color, width=6)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+def annotations(rng, size):
+    w, h = size
+    shapes = []
+    for _ in range(rng.randint(0, 4)):
+        x1, y1 = rng.randrange(w), rng.randrange(h)
+        shapes.append({"type": "dim", "x1": x1, "y1": y1, "x2": rng.randrange(w), "y2": y1,
+                       "label": f"{rng.randrange(300, 3200, 10)} mm"})
+    return shapes
+
+PRECIOS = {
+    "vidrios": [{"tipo": t, "espesor": e, "precio_m2": p, "minimo_m2": 0.25}
+                for t, base in (("claro", 90), ("filtrasol", 120), ("templado", 210)) for e, p in
+                ((4, base * 4), (6, base * 6), (9, base * 9))],
+    "cargos": [{"clave": "canto_pulido", "unidad": "ml", "precio": 85},
+               {"clave": "instalacion", "unidad": "pieza", "precio": 150},
+               {"clave": "pelicula", "unidad": "m2", "precio": 320}],
+}
+
+def quote_body(rng, lines=300):
+    """Cotización de obra grande (JSON): medidas repetidas, varios vidrios y cargos."""
+    sizes = [(rng.randrange(300, 2400, 50), rng.randrange(300, 2400, 50)) for _ in range(60)]
+    lineas = [{"ref": f"V{n}", "ancho": w, "alto": h, "cantidad": rng.randint(1, 12),
+               "vidrio": rng.choice(("claro", "filtrasol", "templado")), "espesor": rng.choice((4, 6, 9)),
+               "cargos": rng.sample(("canto_pulido", "instalacion", "pelicula"), rng.randint(0, 2))}
+              for n, (w, h) in enumerate(rng.choice(sizes) for _ in range(lines))]
+    return json.dumps({"lineas": lineas}).encode()
+
+def seed(users=5, photos=100, size=(1600, 1200), variants=8, rng_seed=1, echo=print):
+    """Siembra la base configurada (DATABASE_URL). Devuelve {"users": [...], "fotos": [ids]}."""
+    from app.db import engine
+    from app.repo import users as users_repo
+    from app.passwords import hash_password
+    from app.importer import import_items
+    from app.cotizaciones import save_precios
+    import app.tasks   # registra medidas.process_upload
+
+    rng = random.Random(rng_seed)
+    pw_hash = hash_password(PASSWORD)   # un solo KDF para todos
+    emails = [user_email(i) for i in range(users)]
+    with engine.begin() as db:
+        for i, email in enumerate(emails):
+            if not users_repo.by_email(db, email):
+                users_repo.create(db, email, pw_hash, "Bench", str(i), None, None, "Vidrio Bench")
+        save_precios(db, PRECIOS)
+
+    # Pocas imágenes base + una marca distinta por foto: blobs distintos sin codificar N fotos grandes
+    bases = [Image.open(io.BytesIO(photo(rng, size))) for _ in range(min(variants, photos) or 1)]
+
+    def items(owner_index):
+        for n in range(owner_index, photos, users):
+            img = bases[n % len(bases)].copy()
+            ImageDraw.Draw(img).text((20, 20), f"foto {n}", fill=(255, 255, 0))
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=88)
+            meta = {"nombre": f"Ventana {n} obra {n % 17}", "anotaciones": annotations(rng, size)}
+            yield f"foto{n}.jpg", (lambda b=buf.getvalue(): b), (lambda m=meta: m), f"foto{n}"
+
+    ids = []
+    for i, email in enumerate(emails):
+        results = import_items(items(i), email)
+        failed = [r for r in results if not r.get("ok")]
+        if failed:
+            raise RuntimeError(f"siembra: {failed[0]['archivo']}: {failed[0]['error']}")
+        ids += [r["foto_id"] for r in results]
+        echo(f"  {email}: {len(results)} fotos")
+    return {"users": emails, "fotos": sorted(ids), "upload": photo(rng, size), "cotizacion": quote_body(rng)}
@@ -0,0 +1,96 @@
+# gunicorn.conf.py
+# Configuración del servidor web (Procfile / render.yaml: gunicorn -c gunicorn.conf.py main:app).
+#
+#   GUNICORN_MODE      gthread (default) | sync | gevent
+#   WEB_CONCURRENCY    procesos worker (default: 2 por CPU, mínimo 2)
+#   GUNICORN_THREADS   hilos por worker en gthread (default 4)
+#   GEVENT_CONNECTIONS peticiones simultáneas por worker en gevent (default 100)
+#   GUNICORN_TIMEOUT   s sin latido antes de reiniciar un worker (default 30)
+#   GUNICORN_MAX_REQUESTS  reinicia cada worker tras N peticiones (default 0 = nunca)
+#   PORT               puerto (lo pone Render)
+#
+# Modos:
+#   gthread  N hilos por worker. Las vistas pasan casi todo el tiempo esperando E/S (subida
+#            del cliente, Postgres, blobstore, send_file) o en código que suelta el GIL
+#            (KDF de contraseñas, Pillow), así que un upload lento o un login ya no
+#            bloquean el worker entero. El pool de app/db.py se dimensiona a un hilo = una
+#            conexión (DB_POOL_SIZE = GUNICORN_THREADS si no se fija).
+#   sync     un hilo por worker; la referencia (y lo más simple para depurar).
+#   gevent   greenlets (pip install gevent): muchas conexiones lentas por worker. Solo con
+#            Postgres (psycopg 3 coopera con gevent; SQLite bloquearía el worker) y sin
+#            --preload: psycopg elige cómo esperar al importarse, y eso tiene que pasar
+#            después del monkey-patching del worker. El trabajo de CPU (KDF, Pillow con
+#            JOBS_INLINE=1 o el hilo de JOBS_IN_WEB, planes de corte) sigue bloqueando a
+#            todo el worker.
+#
+# Trabajos en segundo plano (app/jobs.py): con JOBS_IN_WEB=1 (default) cada worker corre la
+# cola en un hilo; el disco del blobstore solo lo monta este servicio.
+#
+# Benchmark (python -m bench run --mode gunicorn --gunicorn-mode <modo> --photos 40: 2 workers,
+# 8 clientes keep-alive, SQLite, 1 CPU; p50 ms / req/s):
+#                    sync           gthread x4
+#   medidas_list     38.7 / 205     35.7 / 229
+#   image_original   19.9 / 391     14.6 / 526
+#   image_thumb      17.0 / 417     13.4 / 570
+#   upload          107.2 / 74      80.9 / 81     (p95 121 -> 215 ms)
+#   login            2467 / 3.2     2496 / 3.2    (lo limita KDF_WORKERS, no el servidor)
+#   pico RSS/worker  52 MB          59 MB
+# Con un solo CPU los hilos no agregan cómputo: la ganancia viene de solapar la espera
+# (envío de imágenes, lectura del cuerpo, SQL) y crece con la latencia real de la red y de
+# Postgres. Por eso gthread x4 es el default. gevent no se midió aquí (necesita Postgres).
+import os, sys, multiprocessing
+
+MODES = ("gthread", "sync", "gevent")
+mode = os.environ.get("GUNICORN_MODE", "gthread")
+if mode not in MODES:
+    raise RuntimeError(f"GUNICORN_MODE={mode!r}: usa {', '.join(MODES)}")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, 2 * multiprocessing.cpu_count())))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5   # detrás del proxy de Render: reutiliza conexiones entre peticiones
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"   # el latido del worker no depende del disco
+
+if mode == "gevent":
+    if os.environ.get("DATABASE_URL", "").startswith("sqlite") or not os.environ.get("DATABASE_URL"):
+        raise RuntimeError("GUNICORN_MODE=gevent necesita Postgres (DATABASE_URL)")
+    worker_class = "gevent"
+    worker_connections = int(os.environ.get("GEVENT_CONNECTIONS", 100))
+    preload_app = False
+    # Muchas peticiones por worker comparten el pool: que esperen conexión en vez de abrir N
+    os.environ.setdefault("DB_POOL_SIZE", "10")
+else:
+    worker_class = mode
+    threads = int(os.environ.get("GUNICORN_THREADS", 4)) if mode == "gthread" else 1
+    # App cargada una vez en el master: arranque más rápido y páginas compartidas entre workers
+    preload_app = True
+    os.environ.setdefault("DB_POOL_SIZE", str(threads))
+
+def when_ready(server):
+    # Con preload el master ya importó la app: verifica el esquema una vez al arrancar (si
+    # falta `db upgrade` el servidor no levanta; los workers heredan la verificación) y
+    # cierra la conexión que usó antes de crear workers, para que ninguno herede el socket.
+    # Sin preload (gevent) la verificación es la de la primera petición (app/db.py).
+    db = sys.modules.get("app.db")
+    if db is not None:
+        from app.migrations import ensure_schema
+        ensure_schema()
+        db.engine.dispose()
+
+def post_fork(server, worker):
+    # Cada worker arranca con su propio pool. close=False: no cerrar conexiones que
+    # todavía pudiera estar usando el master (solo se olvidan en este proceso).
+    # Sin preload app.db aún no está importado y no hay nada que soltar.
+    db = sys.modules.get("app.db")
+    if db is not None:
+        db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    # Después de cargar la app en el worker (con o sin preload; en gevent el hilo es un greenlet)
+    jobs = sys.modules.get("app.jobs")
+    if jobs is not None and jobs.JOBS_IN_WEB:
+        jobs.start_web_worker()
@@ -1,45 +1,67 @@
 # main.py
 import os, re
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import text
+from flask import Flask, Request, Response, abort, render_template, request, redirect, url_for, session, flash
 from sqlalchemy.exc import IntegrityError
 
-from app.db import init_app_db, get_db          # <- usa SQLAlchemy (engine/conn) definido en app/db.py
+from app.db import init_app_db, get_conn, engine  # <- conexión de la petición (SQLAlchemy, app/db.py)
+from app import metrics                          # <- GET /__metrics (Prometheus)
+from app.repo import users
+from app.passwords import hash_password, verify_password, KdfBusy
+from app.profile import load_profile, invalidate_profile
 from app.blueprints import register_blueprints   # <- registra core + módulos (p.ej. medidas)
+from app.jobs import jobs_cli                     # <- flask --app main jobs worker
+from app.migrations import db_cli                 # <- flask --app main db upgrade
+from app.assets import init_app_assets, assets_cli  # <- asset_url() + /assets (build: python -m app.assets build)
+
+class VidrioRequest(Request):
+    # La importación en lote (medidas.import_batch) sube muchas fotos en una sola petición
+    @property
+    def max_content_length(self):
+        if self.endpoint == "medidas.import_batch":
+            return app.config["IMPORT_MAX_CONTENT_LENGTH"]
+        return app.config["MAX_CONTENT_LENGTH"]
 
 app = Flask(__name__)
+app.request_class = VidrioRequest
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-change-this")
-app.config["ASSET_VERSION"] = os.environ.get("ASSET_VERSION", "1")  # <- añade esto
+# Tope duro por petición (413). El límite por imagen está en app/uploads.py (MAX_IMAGE_BYTES);
+# aquí se deja margen para el formato anterior en base64 (+33%).
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_CONTENT_LENGTH", 40 * 1024 * 1024))
+app.config["IMPORT_MAX_CONTENT_LENGTH"] = int(os.environ.get("IMPORT_MAX_CONTENT_LENGTH", 500 * 1024 * 1024))
 
 
-# Inicializar DB y blueprints
+# Inicializar métricas, DB y blueprints
+metrics.init_app_metrics(app, engine)
 init_app_db(app)
+init_app_assets(app)
 register_blueprints(app)
+app.cli.add_command(jobs_cli)
+app.cli.add_command(db_cli)
+app.cli.add_command(assets_cli)
 
 # -------------------- HELPERS --------------------
 EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
 def create_user(email, password, first_name, last_name, address, phone, company):
-    pw_hash = generate_password_hash(password)
-    with get_db() as db:
-        db.execute(text("""
-            INSERT INTO users
-              (email, password_hash, first_name, last_name, address, phone, company, created_at)
-            VALUES
-              (:email, :pw, :fn, :ln, :addr, :phone, :company, :ts)
-        """), dict(
-            email=email, pw=pw_hash, fn=first_name, ln=last_name,
-            addr=address, phone=phone, company=company, ts=datetime.utcnow().isoformat()
-        ))
+    users.create(get_conn(), email, hash_password(password),
+                 first_name, last_name, address, phone, company)
 
 def authenticate(email, password):
-    with get_db() as db:
-        row = db.execute(text(
-            "SELECT password_hash FROM users WHERE email = :email"
-        ), {"email": email}).mappings().first()
-    return bool(row and check_password_hash(row["password_hash"], password))
+    """Fila del usuario si la contraseña es correcta, si no None. Puede lanzar KdfBusy."""
+    row = users.by_email(get_conn(), email)
+    if not row:
+        return None
+    ok, new_hash = verify_password(row["password_hash"], password)
+    if not ok:
+        return None
+    if new_hash:   # PASSWORD_HASH_METHOD cambió: se guarda con los parámetros actuales
+        users.set_password_hash(get_conn(), email, new_hash)
+    return row
+
+def kdf_busy(template, message):
+    # Control de admisión del hash (app/passwords.py): 503 en lugar de encolar sin límite
+    flash(message, "warning")
+    return render_template(template), 503, {"Retry-After": "5"}
 
 def get_current_user():
     return session.get("user_email")
@@ -69,15 +91,20 @@ def register():
         if not accept:
             flash("Debes aceptar las políticas para continuar.", "warning"); return redirect(url_for("register"))
 
-        with get_db() as db:
-            if db.execute(text("SELECT 1 FROM users WHERE email = :e"), {"e": email}).first():
-                flash("Ese correo ya está registrado.", "danger"); return redirect(url_for("register"))
-            if phone and db.execute(text("SELECT 1 FROM users WHERE phone = :p"), {"p": phone}).first():
-                flash("Ese teléfono ya está registrado.", "danger"); return redirect(url_for("register"))
+        # Verificación + alta en la misma conexión y transacción (COMMIT al terminar la vista)
+        email_taken, phone_taken = users.taken(get_conn(), email, phone)
+        if email_taken:
+            flash("Ese correo ya está registrado.", "danger"); return redirect(url_for("register"))
+        if phone_taken:
+            flash("Ese teléfono ya está registrado.", "danger"); return redirect(url_for("register"))
 
         try:
             create_user(email, password, first_name, last_name, address, phone, company)
+        except KdfBusy:
+            return kdf_busy("register.html",
+                            "Hay muchos registros en este momento. Intenta de nuevo en unos segundos.")
         except IntegrityError:
+            get_conn().rollback()
             flash("Correo o teléfono ya registrados.", "danger"); return redirect(url_for("register"))
 
         flash("Cuenta creada. Inicia sesión.", "success")
@@ -90,8 +117,14 @@ def login():
     if request.method == "POST":
         email    = request.form.get("email","").strip().lower()
         password = request.form.get("password","")
-        if authenticate(email, password):
+        try:
+            row = authenticate(email, password)
+        except KdfBusy:
+            return kdf_busy("login.html",
+                            "Hay muchos inicios de sesión en este momento. Intenta de nuevo en unos segundos.")
+        if row:
             session["user_email"] = email
+            load_profile(email, row)   # el dashboard ya no consulta `users`
             flash("Has iniciado sesión.", "success")
             return redirect(url_for("core.dashboard"))  # endpoint del blueprint core
         flash("Correo o contraseña incorrectos.", "danger")
@@ -101,6 +134,7 @@ def login():
 @app.route("/logout")
 def logout():
     session.pop("user_email", None)
+    invalidate_profile()
     flash("Sesión cerrada.", "info")
     return redirect(url_for("login"))
 
@@ -112,6 +146,12 @@ def __routes():
         lines.append(f"{r.endpoint:25s}  {','.join(sorted(r.methods)):20s}  {r.rule}")
     return "<pre>" + "\n".join(sorted(lines)) + "</pre>"
 
+@app.route("/__metrics")
+def __metrics():
+    if not metrics.authorized():
+        abort(401)
+    return Response(metrics.render(engine), mimetype="text/plain; version=0.0.4")
+
 # ===== Placeholders mientras migras a blueprints =====
 @app.route("/clientes")
 def clientes():
@@ -125,18 +165,10 @@ def productos():
 def pedidos():
     return render_template("module_blank.html", title="Pedidos")
 
-@app.route("/cotizaciones")
-def cotizaciones():
-    return render_template("module_blank.html", title="Cotizaciones")
-
 @app.route("/inventario")
 def inventario():
     return render_template("module_blank.html", title="Inventario")
 
-@app.route("/reportes")
-def reportes():
-    return render_template("module_blank.html", title="Reportes")
-
 # -------------------- DEV LOCAL --------------------
 if __name__ == "__main__":
     # En Render te levanta gunicorn por Procfile; esto es solo para local
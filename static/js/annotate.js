@@ -0,0 +1,180 @@
+/* static/js/annotate.js — editor de anotaciones (medidas_annotate.html) */
+const board = document.getElementById('board');
+// Datos de la foto en atributos del canvas (el script es un archivo estático cacheable)
+const baseImageURL = JSON.parse(board.dataset.baseImage);
+const initialAnnotations = JSON.parse(board.dataset.anotaciones);
+const ctx = board.getContext('2d');
+
+const mmppInput = document.getElementById('mmpp');
+const refmmInput = document.getElementById('refmm');
+const useRefBtn = document.getElementById('useRef');
+
+const labelInput = document.getElementById('labelInput');
+const applyLabelBtn = document.getElementById('applyLabel');
+
+const undoBtn = document.getElementById('undoBtn');
+const clearBtn = document.getElementById('clearBtn');
+const saveBtn = document.getElementById('saveBtn');
+
+const anotEl = document.getElementById('anotaciones');
+
+let baseImg = new Image();
+baseImg.onload = () => { fitAndRender(); };
+if (baseImageURL) baseImg.src = baseImageURL;
+
+let scaleFit = 1, offsetX = 0, offsetY = 0;
+
+// flechas: {type:'dim',x1,y1,x2,y2,label}; también conserva {type:'text',x,y,label} de la captura
+let arrows = Array.isArray(initialAnnotations) ? initialAnnotations : [];
+let current = null;
+let selectedIndex = -1;
+let isDragging = false;
+let mmpp = 0; // mm por píxel
+
+function fitAndRender() {
+  // Ajustamos la foto a canvas manteniendo aspecto
+  const w = board.width, h = board.height;
+  ctx.fillStyle = "#eee"; ctx.fillRect(0,0,w,h);
+  const iw = baseImg.width, ih = baseImg.height;
+  const s = Math.min(w/iw, h/ih);
+  scaleFit = s;
+  offsetX = (w - iw*s)/2; offsetY = (h - ih*s)/2;
+  draw();
+}
+
+function drawText(a, color) {
+  ctx.font = "16px sans-serif"; ctx.fillStyle = color;
+  ctx.fillText(a.label || "Texto", offsetX + a.x*scaleFit, offsetY + a.y*scaleFit);
+}
+
+function drawArrow(a, color, lineW=2) {
+  if (a.type === 'text') { drawText(a, color); return; }
+  const x1 = offsetX + a.x1*scaleFit, y1 = offsetY + a.y1*scaleFit;
+  const x2 = offsetX + a.x2*scaleFit, y2 = offsetY + a.y2*scaleFit;
+  // línea
+  ctx.lineWidth = lineW; ctx.strokeStyle = color;
+  ctx.beginPath(); ctx.moveTo(x1,y1); ctx.lineTo(x2,y2); ctx.stroke();
+  // cabeza de flecha
+  const ang = Math.atan2(y2-y1, x2-x1);
+  const len = 12;
+  ctx.beginPath();
+  ctx.moveTo(x2,y2);
+  ctx.lineTo(x2 - len*Math.cos(ang - Math.PI/6), y2 - len*Math.sin(ang - Math.PI/6));
+  ctx.lineTo(x2 - len*Math.cos(ang + Math.PI/6), y2 - len*Math.sin(ang + Math.PI/6));
+  ctx.closePath();
+  ctx.fillStyle = color; ctx.fill();
+  // etiqueta
+  if (a.label) {
+    ctx.font = "16px sans-serif"; ctx.fillStyle = color;
+    const mx = (x1+x2)/2, my = (y1+y2)/2;
+    ctx.fillText(a.label, mx+6, my-6);
+  }
+}
+
+function draw() {
+  ctx.fillStyle = "#eee"; ctx.fillRect(0,0,board.width,board.height);
+  if (baseImg) ctx.drawImage(baseImg, offsetX, offsetY, baseImg.width*scaleFit, baseImg.height*scaleFit);
+  // todas las flechas
+  arrows.forEach((a,i)=> drawArrow(a, i===selectedIndex ? "#d33" : "#0a58ca", i===selectedIndex ? 3 : 2));
+  // actual (en curso)
+  if (current) drawArrow(current, "#198754", 2);
+}
+
+function canvasToImageCoords(px, py) {
+  // inversa del fit
+  const x = (px - offsetX)/scaleFit;
+  const y = (py - offsetY)/scaleFit;
+  return {x,y};
+}
+
+board.addEventListener('pointerdown', (e)=>{
+  const rect = board.getBoundingClientRect();
+  const p = canvasToImageCoords(e.clientX - rect.left, e.clientY - rect.top);
+  current = {type:'dim', x1:p.x, y1:p.y, x2:p.x, y2:p.y, label:""};
+  isDragging = true;
+  selectedIndex = -1;
+  draw();
+});
+board.addEventListener('pointermove', (e)=>{
+  if (!isDragging || !current) return;
+  const rect = board.getBoundingClientRect();
+  const p = canvasToImageCoords(e.clientX - rect.left, e.clientY - rect.top);
+  current.x2 = p.x; current.y2 = p.y;
+  draw();
+});
+board.addEventListener('pointerup', (e)=>{
+  if (!current) return;
+  isDragging = false;
+  // calcular largo en píxeles
+  const dx = current.x2 - current.x1, dy = current.y2 - current.y1;
+  const pxLen = Math.sqrt(dx*dx + dy*dy);
+  let label = "";
+  if (mmpp > 0) {
+    const mm = pxLen * mmpp;
+    label = mm.toFixed(1) + " mm";
+  }
+  current.label = label;
+  arrows.push(current);
+  selectedIndex = arrows.length - 1;
+  labelInput.value = label || "";
+  current = null;
+  draw();
+});
+
+undoBtn.onclick = ()=> {
+  if (current) { current=null; draw(); return; }
+  if (arrows.length>0) {
+    arrows.pop(); selectedIndex=-1; draw();
+  }
+};
+clearBtn.onclick = ()=> { arrows = []; selectedIndex=-1; draw(); };
+
+board.addEventListener('click', (e)=>{
+  // seleccionar flecha cercana al click para editar etiqueta
+  const rect = board.getBoundingClientRect();
+  const p = canvasToImageCoords(e.clientX - rect.left, e.clientY - rect.top);
+  let best=-1, bestd=9999;
+  arrows.forEach((a,i)=>{
+    // distancia al punto medio (o al punto del texto)
+    const mx = a.type==='text' ? a.x : (a.x1+a.x2)/2, my = a.type==='text' ? a.y : (a.y1+a.y2)/2;
+    const d = Math.hypot(mx-p.x, my-p.y);
+    if (d<bestd && d<30/scaleFit) { best=i; bestd=d; }
+  });
+  selectedIndex = best;
+  if (best>=0) labelInput.value = arrows[best].label || "";
+  draw();
+});
+
+applyLabelBtn.onclick = ()=> {
+  if (selectedIndex<0) return;
+  arrows[selectedIndex].label = labelInput.value || "";
+  draw();
+};
+
+// calibración por referencia
+useRefBtn.onclick = ()=> {
+  if (!arrows.length) { alert("Dibuja primero una línea de referencia."); return; }
+  const a = arrows[arrows.length-1];
+  const dx = a.x2-a.x1, dy=a.y2-a.y1;
+  const pxLen = Math.sqrt(dx*dx + dy*dy);
+  const mm = parseFloat(refmmInput.value || "0");
+  if (pxLen>0 && mm>0) {
+    mmpp = mm / pxLen;
+    mmppInput.value = mmpp.toFixed(6);
+    // actualiza etiqueta de la referencia
+    a.label = mm.toFixed(1) + " mm";
+    draw();
+  } else {
+    alert("Ingresa una longitud válida (mm) y dibuja la referencia.");
+  }
+};
+mmppInput.addEventListener('change', ()=>{
+  mmpp = parseFloat(mmppInput.value || "0") || 0;
+});
+
+saveBtn.onclick = ()=> {
+  // Solo JSON (pocos KB): el servidor dibuja la imagen anotada a resolución completa
+  saveBtn.disabled = true;
+  anotEl.value = JSON.stringify(arrows);
+  document.getElementById('saveForm').submit();
+};
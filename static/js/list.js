@@ -0,0 +1,49 @@
+/* static/js/list.js — scroll infinito del listado de Medidas (medidas_list.html) */
+(function(){
+  const more = document.getElementById('more');
+  const grid = document.getElementById('fotosGrid');
+  if (!more || !('IntersectionObserver' in window)) return;
+
+  let next = more.dataset.next, loading = false;
+  const pageURL = more.dataset.page;
+
+  function esc(s){ const d=document.createElement('div'); d.textContent = s==null ? '' : String(s); return d.innerHTML; }
+  function card(f){
+    const el = document.createElement('div');
+    el.className = 'foto-card';
+    el.innerHTML =
+      `<a class="thumb" href="${f.view_url}">${f.thumb_url ? `<img src="${f.thumb_url}" alt="${esc(f.nombre)}" loading="lazy" decoding="async">` : ''}</a>
+       <div class="meta"><strong>${esc(f.nombre)}</strong>${f.tiene_anotada ? ' ✏️' : ''}<br>
+         <small>${esc(f.creado_por)} · ${esc(f.created_at)}</small></div>
+       <div class="acts"><a href="${f.annotate_url}">Anotar</a>
+         <form method="post" action="${f.delete_url}" onsubmit="return confirm('¿Eliminar esta foto?');">
+           <button type="submit">🗑️</button></form></div>`;
+    return el;
+  }
+
+  async function load(){
+    if (loading || !next) return;
+    loading = true; more.textContent = 'Cargando…';
+    try {
+      const qs = new URLSearchParams({before: next, limit: more.dataset.size});
+      if (more.dataset.q) qs.set('q', more.dataset.q);
+      const r = await fetch(`${pageURL}?${qs}`, {credentials:'same-origin'});
+      if (!r.ok) throw new Error(r.status);
+      const data = await r.json();
+      const frag = document.createDocumentFragment();
+      data.items.forEach(f => frag.appendChild(card(f)));
+      grid.appendChild(frag);
+      next = data.next;
+      if (!next) { io.disconnect(); more.remove(); return; }
+      qs.set('before', next); qs.delete('limit');
+      more.href = `?${qs}`;
+      more.textContent = 'Cargar más…';
+    } catch (e) {
+      more.textContent = 'Error al cargar. Toca para reintentar.';
+    } finally { loading = false; }
+  }
+
+  const io = new IntersectionObserver(es => { if (es.some(e => e.isIntersecting)) load(); }, {rootMargin: '600px'});
+  io.observe(more);
+  more.addEventListener('click', e => { e.preventDefault(); load(); });
+})();
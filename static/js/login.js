@@ -0,0 +1,10 @@
+/* static/js/login.js — mostrar/ocultar contraseña (login.html) */
+const btn = document.getElementById('togglePass');
+const input = document.getElementById('password');
+if (btn && input) {
+  btn.addEventListener('click', () => {
+    const isPass = input.type === 'password';
+    input.type = isPass ? 'text' : 'password';
+    btn.textContent = isPass ? 'Ocultar' : 'Mostrar';
+  });
+}
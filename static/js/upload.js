@@ -0,0 +1,86 @@
+/* static/js/upload.js
+ * Envío binario de imágenes (canvas.toBlob) para Medidas.
+ *  - Imágenes chicas: un solo POST multipart.
+ *  - Imágenes grandes: subida reanudable por trozos (ver app/uploads.py) y luego
+ *    el formulario se envía con upload_id. Si la red se cae, reintenta y continúa
+ *    desde el último byte confirmado por el servidor.
+ */
+(function (global) {
+  const DIRECT_MAX = 512 * 1024;   // por debajo de esto no vale la pena trocear
+  const RETRIES = 8;
+
+  const sleep = ms => new Promise(r => setTimeout(r, ms));
+
+  function canvasToBlob(canvas, type, quality) {
+    return new Promise((resolve, reject) =>
+      canvas.toBlob(b => b ? resolve(b) : reject(new Error('No se pudo generar la imagen')), type || 'image/png', quality));
+  }
+
+  async function json(r) {
+    let data = {};
+    try { data = await r.json(); } catch (_) {}
+    if (!r.ok) { const e = new Error(data.error || ('HTTP ' + r.status)); e.status = r.status; throw e; }
+    return data;
+  }
+
+  async function withRetry(fn, onRetry) {
+    for (let i = 0; ; i++) {
+      try { return await fn(); }
+      catch (e) {
+        // errores del cliente (4xx salvo 409/408) no se arreglan reintentando
+        if (i >= RETRIES || (e.status && e.status < 500 && e.status !== 409 && e.status !== 408)) throw e;
+        if (onRetry) onRetry(i + 1, e);
+        await sleep(Math.min(15000, 500 * 2 ** i));
+      }
+    }
+  }
+
+  async function resumable(uploadsURL, blob, onProgress, onRetry) {
+    const up = await withRetry(() => fetch(uploadsURL, {
+      method: 'POST', credentials: 'same-origin',
+      headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+      body: JSON.stringify({ size: blob.size })
+    }).then(json), onRetry);
+
+    const url = uploadsURL + '/' + up.id;
+    let offset = 0;
+    while (offset < blob.size) {
+      offset = await withRetry(async () => {
+        try {
+          const r = await fetch(url, {
+            method: 'PUT', credentials: 'same-origin',
+            headers: { 'Upload-Offset': String(offset), 'Content-Type': 'application/octet-stream', 'Accept': 'application/json' },
+            body: blob.slice(offset, offset + up.chunk)
+          });
+          return (await json(r)).offset;
+        } catch (e) {
+          // Corte de red o desfase: preguntamos al servidor dónde quedó
+          try { offset = (await fetch(url, { credentials: 'same-origin' }).then(json)).offset; } catch (_) {}
+          throw e;
+        }
+      }, onRetry);
+      if (onProgress) onProgress(offset / blob.size);
+    }
+    return up.id;
+  }
+
+  /** Envía `fields` + la imagen a `action`. Devuelve la URL a la que hay que ir.
+   *  opts: {uploadsURL, onProgress(fraccion), onRetry(intento, error)} */
+  async function send(action, blob, fields, opts) {
+    opts = opts || {};
+    const fd = new FormData();
+    Object.entries(fields || {}).forEach(([k, v]) => fd.append(k, v));
+    if (blob.size <= DIRECT_MAX) {
+      fd.append('foto', blob, 'foto.png');
+    } else {
+      fd.append('upload_id', await resumable(opts.uploadsURL || '/medidas/uploads', blob, opts.onProgress, opts.onRetry));
+    }
+    // El POST final no se reintenta: si llegó al servidor y se perdió la respuesta, se duplicaría la foto
+    const data = await fetch(action, {
+      method: 'POST', credentials: 'same-origin', body: fd, headers: { 'Accept': 'application/json' }
+    }).then(json);
+    return data.redirect;
+  }
+
+  global.VidrioUpload = { canvasToBlob, send };
+})(window);
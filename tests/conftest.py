@@ -0,0 +1,34 @@
+# tests/conftest.py
+# La app lee la configuración del entorno al importarse: BD SQLite y blobstore temporales,
+# trabajos inline. Una sola BD por sesión de pytest; cada prueba crea sus propios datos.
+import io, os, sys, tempfile
+
+_tmp = tempfile.mkdtemp(prefix="vidrio-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "test.db")
+os.environ["BLOB_DIR"] = os.path.join(_tmp, "blobs")
+os.environ["JOBS_INLINE"] = "1"
+os.environ.setdefault("SECRET_KEY", "test")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from PIL import Image
+
+import main
+
+@pytest.fixture(scope="session")
+def app():
+    main.app.testing = True
+    return main.app
+
+@pytest.fixture
+def client(app):
+    """Cliente con sesión de un usuario normal."""
+    cl = app.test_client()
+    with cl.session_transaction() as s:
+        s["user_email"] = "usuario@example.com"
+    return cl
+
+def png(w=64, h=48, color=(200, 30, 30)):
+    b = io.BytesIO()
+    Image.new("RGB", (w, h), color).save(b, "PNG")
+    return b.getvalue()
@@ -0,0 +1,18 @@
+import main
+from app.passwords import KdfBusy
+
+def _busy(*args, **kwargs):
+    raise KdfBusy()
+
+def test_register_busy_message(app, monkeypatch):
+    monkeypatch.setattr(main, "hash_password", _busy)
+    rv = app.test_client().post("/register", data={
+        "email": "nuevo@example.com", "password": "secreto123", "confirm": "secreto123",
+        "first_name": "Ana", "last_name": "López", "accept": "1"})
+    assert rv.status_code == 503 and rv.headers["Retry-After"] == "5"
+    assert "muchos registros" in rv.get_data(as_text=True)
+
+def test_login_busy_message(app, monkeypatch):
+    monkeypatch.setattr(main, "authenticate", _busy)
+    rv = app.test_client().post("/login", data={"email": "a@b.c", "password": "secreto123"})
+    assert rv.status_code == 503 and "muchos inicios de sesión" in rv.get_data(as_text=True)
@@ -0,0 +1,33 @@
+import random, time
+
+import pytest
+
+from app.cortes import plan, validate, CorteError, MAX_PIECES
+from app.blueprints import cortes as cortes_api
+
+def _random_pieces(n, seed=1):
+    rng = random.Random(seed)
+    return [{"ancho": rng.randint(150, 1800), "alto": rng.randint(150, 1500)} for _ in range(n)]
+
+def test_plan_respects_time_budget_with_max_pieces():
+    started = time.perf_counter()
+    result = plan(_random_pieces(MAX_PIECES), time_budget=0.5)
+    assert time.perf_counter() - started < 5
+    assert sum(h["repeticiones"] * h["piezas"] for h in result["hojas"]) == MAX_PIECES
+    assert not result["sin_colocar"] and not validate(result)
+
+def test_small_order_still_searches():
+    result = plan([{"ancho": 1200, "alto": 800, "cantidad": 7}, {"ancho": 600, "alto": 450, "cantidad": 12}])
+    assert result["estrategia"] != "estantes" and not validate(result)
+
+def test_http_piece_cap(client):
+    rv = client.post("/cortes/plan", json={"piezas": [{"ancho": 500, "alto": 400,
+                                                        "cantidad": cortes_api.MAX_PIECES + 1}]})
+    assert rv.status_code == 400 and str(cortes_api.MAX_PIECES) in rv.get_json()["error"]
+
+@pytest.mark.parametrize("field", ["kerf", "margen"])
+def test_negative_kerf_or_margin_rejected(client, field):
+    rv = client.post("/cortes/plan", json={"piezas": [{"ancho": 500, "alto": 400}], field: -5000})
+    assert rv.status_code == 400 and field in rv.get_json()["error"]
+    with pytest.raises(CorteError):
+        plan([{"ancho": 500, "alto": 400}], **{"kerf" if field == "kerf" else "margin": -1})
@@ -0,0 +1,16 @@
+from app.blueprints import cotizaciones as cotizaciones_api
+
+PRECIOS = {"vidrios": [{"tipo": "claro", "espesor": 6, "precio_m2": 450}]}
+
+def test_precios_put_requires_admin(client, monkeypatch):
+    monkeypatch.setattr(cotizaciones_api, "PRECIOS_ADMINS", set())
+    version = client.get("/cotizaciones/api/precios").get_json()["version"]
+    rv = client.put("/cotizaciones/api/precios", json=PRECIOS)
+    assert rv.status_code == 403
+    assert client.get("/cotizaciones/api/precios").get_json()["version"] == version
+
+def test_precios_put_as_admin(client, monkeypatch):
+    monkeypatch.setattr(cotizaciones_api, "PRECIOS_ADMINS", {"usuario@example.com"})
+    rv = client.put("/cotizaciones/api/precios", json=PRECIOS)
+    assert rv.status_code == 200
+    assert client.get("/cotizaciones/api/precios").get_json()["version"] == rv.get_json()["version"]
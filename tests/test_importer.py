@@ -0,0 +1,29 @@
+import io, json, zipfile
+
+from conftest import png
+
+def _zip(manifest_lines):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("fotos/1/original.png", png())
+        zf.writestr("manifest.ndjson", "\n".join(manifest_lines) + "\n")
+    return buf.getvalue()
+
+BAD_MANIFEST = [json.dumps({"nombre": "a", "archivos": {"original": "fotos/1/original.png"}}), "{no es json"]
+
+def test_cli_bad_manifest_is_a_clean_error(app, tmp_path):
+    path = tmp_path / "lote.zip"
+    path.write_bytes(_zip(BAD_MANIFEST))
+    res = app.test_cli_runner().invoke(args=["medidas", "import", str(path), "--usuario", "a@b.c"])
+    assert res.exit_code == 1 and "Traceback" not in res.output
+    assert "manifest.ndjson, línea 2" in res.output
+
+def test_http_bad_manifest_is_400(client):
+    rv = client.post("/medidas/import", data={"archivo": (io.BytesIO(_zip(BAD_MANIFEST)), "lote.zip")},
+                     content_type="multipart/form-data")
+    assert rv.status_code == 400 and "línea 2" in rv.get_json()["error"]
+
+def test_http_bad_anotaciones_is_400(client):
+    rv = client.post("/medidas/import", data={"fotos": (io.BytesIO(png()), "a.png"), "anotaciones": "{"},
+                     content_type="multipart/form-data")
+    assert rv.status_code == 400 and "anotaciones" in rv.get_json()["error"]
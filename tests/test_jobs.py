@@ -0,0 +1,35 @@
+import io
+
+from sqlalchemy import text
+
+from app.db import engine
+from conftest import png
+
+J = {"Accept": "application/json"}
+
+def _upload(client, data):
+    rv = client.post("/medidas/new", data={"nombre": "ventana", "foto": (io.BytesIO(data), "v.png")},
+                     headers=J, content_type="multipart/form-data")
+    assert rv.status_code == 200, rv.get_json()
+    return rv.get_json()
+
+def _foto(fid):
+    with engine.connect() as db:
+        sha, size = db.execute(text("SELECT original_sha256, original_size FROM fotos WHERE id=:id"),
+                               {"id": fid}).one()
+        thumb = db.execute(text("SELECT COUNT(*) FROM foto_thumbs WHERE foto_id=:id"), {"id": fid}).scalar()
+    return sha, size, thumb
+
+def test_reupload_after_delete_is_processed(client):
+    # En SQLite el id de la foto borrada se reutiliza: el trabajo nuevo no debe ser el viejo
+    raw = png(120, 90)
+    first = _upload(client, raw)
+    processed = _foto(first["foto_id"])
+    assert processed[1] != len(raw) and processed[2] == 1
+
+    client.post(f"/medidas/{first['foto_id']}/delete")
+    second = _upload(client, raw)
+    assert second["foto_id"] == first["foto_id"]
+    assert second["job"] != first["job"]
+    assert client.get(f"/medidas/jobs/{second['job']}").get_json()["status"] == "done"
+    assert _foto(second["foto_id"]) == processed
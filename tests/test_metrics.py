@@ -0,0 +1,13 @@
+from app import metrics
+
+def test_metrics_denied_without_token_in_production(app, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    monkeypatch.setattr(app, "testing", False)
+    assert app.test_client().get("/__metrics").status_code == 401
+
+def test_metrics_requires_token(app, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3creto")
+    cl = app.test_client()
+    assert cl.get("/__metrics").status_code == 401
+    rv = cl.get("/__metrics", headers={"Authorization": "Bearer s3creto"})
+    assert rv.status_code == 200 and b"vidrio_http_requests_total" in rv.data